@@ -0,0 +1,315 @@
+# bookwright/core/cast_analytics.py
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+from ..utils.change_feed import ChangeEvent
+from ..utils.record_cache import FrozenRecord
+
+# Past this many pending cast changes the co-occurrence matrix is rebuilt
+# with one product instead of patched change by change
+MAX_PENDING_DELTAS = 256
+
+# Power iteration for eigenvector centrality
+EIGENVECTOR_ITERATIONS = 200
+EIGENVECTOR_TOLERANCE = 1e-9
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _pairs(rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Every ordered (i, j) over one scene's cast, diagonal included"""
+    return np.repeat(rows, len(rows)), np.tile(rows, len(rows))
+
+
+class _Incidence:
+    """Characters as rows and scenes as columns; callers hold CastAnalytics' lock.
+
+    Rows and columns are handed out once per id and never reused, so a
+    deleted character or scene leaves an empty row or column behind until
+    the next full load.
+    """
+
+    def __init__(self):
+        self.row_of: Dict[str, int] = {}  # character name -> row
+        self.names: List[Optional[str]] = []  # row -> name, None once deleted
+        self.col_of: Dict[str, int] = {}  # scene title -> column
+        self.cast: Dict[int, np.ndarray] = {}  # column -> character rows
+        self.chapters: Dict[str, List[int]] = {}  # chapter title -> scene columns, in order
+        self.chapter_order: Dict[str, int] = {}  # chapter title -> id
+        self.scene_count = 0
+        # (old cast, new cast) of scenes changed since co-occurrence was last built
+        self.deltas: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.cooccurrence: Optional[sparse.csr_matrix] = None
+
+    def put_character(self, row: FrozenRecord) -> None:
+        if row["name"] not in self.row_of:
+            self.row_of[row["name"]] = len(self.names)
+            self.names.append(row["name"])
+
+    def drop_character(self, name: str) -> None:
+        row = self.row_of.pop(name, None)
+        if row is None:
+            return
+        self.names[row] = None
+        for col, cast in list(self.cast.items()):
+            if row in cast:
+                self._set_cast(col, cast[cast != row])
+
+    def put_scene(self, row: FrozenRecord) -> None:
+        col = self.col_of.get(row["title"])
+        if col is None:
+            col = self.col_of[row["title"]] = self.scene_count
+            self.scene_count += 1
+        rows = [self.row_of[name] for name in row.get("characters", ()) if name in self.row_of]
+        self._set_cast(col, np.unique(np.asarray(rows, dtype=np.int64)))
+
+    def drop_scene(self, title: str) -> None:
+        col = self.col_of.pop(title, None)
+        if col is not None:
+            self._set_cast(col, _EMPTY)
+            del self.cast[col]
+            for scenes in self.chapters.values():
+                if col in scenes:
+                    scenes.remove(col)
+
+    def put_chapter(self, row: FrozenRecord) -> None:
+        self.chapters[row["title"]] = [self.col_of[t] for t in row.get("scenes", ()) if t in self.col_of]
+        self.chapter_order[row["title"]] = row["id"]
+
+    def drop_chapter(self, title: str) -> None:
+        self.chapters.pop(title, None)
+        self.chapter_order.pop(title, None)
+
+    def _set_cast(self, col: int, rows: np.ndarray) -> None:
+        old = self.cast.get(col, _EMPTY)
+        if np.array_equal(old, rows):
+            return
+        self.cast[col] = rows
+        if self.cooccurrence is not None:
+            self.deltas.append((old, rows))
+
+    def matrix(self) -> sparse.csr_matrix:
+        """The 0/1 character x scene incidence matrix"""
+        cols = np.fromiter(self.cast.keys(), dtype=np.int64, count=len(self.cast))
+        casts = list(self.cast.values())
+        lengths = np.fromiter((len(c) for c in casts), dtype=np.int64, count=len(casts))
+        rows = np.concatenate(casts) if casts else _EMPTY
+        return sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, np.repeat(cols, lengths))),
+            shape=(len(self.names), self.scene_count)
+        )
+
+    def cooccurrences(self) -> sparse.csr_matrix:
+        """Shared-scene counts, C = A @ A.T; the diagonal is each character's scene count.
+
+        After the first build, cast changes are folded in as the difference
+        of the old and new cast's outer products rather than a new product.
+        """
+        size = len(self.names)
+        if self.cooccurrence is None or len(self.deltas) > MAX_PENDING_DELTAS:
+            incidence = self.matrix()
+            self.cooccurrence = (incidence @ incidence.T).tocsr()
+        elif self.deltas:
+            rows, cols, data = [], [], []
+            for old, new in self.deltas:
+                for cast, sign in ((old, -1), (new, 1)):
+                    r, c = _pairs(cast)
+                    rows.append(r)
+                    cols.append(c)
+                    data.append(np.full(len(r), sign, dtype=np.int32))
+            delta = sparse.csr_matrix(
+                (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                shape=(size, size)
+            )
+            current = self.cooccurrence
+            if current.shape != (size, size):
+                current = current.copy()
+                current.resize((size, size))
+            current = (current + delta).tocsr()
+            current.eliminate_zeros()
+            self.cooccurrence = current
+        elif self.cooccurrence.shape != (size, size):
+            self.cooccurrence = self.cooccurrence.copy()
+            self.cooccurrence.resize((size, size))
+        self.deltas = []
+        return self.cooccurrence
+
+    def live_rows(self) -> np.ndarray:
+        return np.fromiter((i for i, name in enumerate(self.names) if name is not None), dtype=np.int64)
+
+
+def _eigenvector(adjacency: sparse.csr_matrix) -> np.ndarray:
+    """Eigenvector centrality by power iteration, scaled so the top score is 1.
+
+    Iterating on A + I keeps the iteration from oscillating on bipartite
+    components without changing the leading eigenvector.
+    """
+    size = adjacency.shape[0]
+    if size == 0 or adjacency.nnz == 0:
+        return np.zeros(size)
+    x = np.full(size, 1.0 / size)
+    for _ in range(EIGENVECTOR_ITERATIONS):
+        following = adjacency @ x + x
+        following /= np.linalg.norm(following)
+        if np.abs(following - x).sum() < size * EIGENVECTOR_TOLERANCE:
+            x = following
+            break
+        x = following
+    return x / x.max()
+
+
+class CastAnalytics:
+    """Who appears with whom, computed from a sparse character x scene matrix.
+
+    The matrix is loaded once and then patched by the change feed: a scene
+    event rewrites only that scene's column. Statistics are vectorized
+    products over the matrix, cached until the next change, so asking again
+    is free and a change costs one sparse update instead of a rescan.
+    """
+
+    def __init__(self, story_db):
+        self.story_db = story_db
+        self._lock = threading.RLock()
+        self._index: Optional[_Incidence] = None
+        self._stats: Optional[Dict] = None
+        self.version = 0
+        self.unsubscribe = story_db.feed.subscribe(self.apply, ["character", "scene", "chapter"])
+
+    def _load(self) -> Tuple[List[FrozenRecord], List[FrozenRecord], List[FrozenRecord]]:
+        with self.story_db.session() as db:
+            return (self.story_db.get_characters(db), self.story_db.get_scenes(db),
+                    self.story_db.get_chapters(db))
+
+    def _ensure_loaded(self) -> _Incidence:
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            version = self.version
+        # Load outside the lock, as FeedMirror does: writers publish while holding the session
+        characters, scenes, chapters = self._load()
+        index = _Incidence()
+        for row in characters:
+            index.put_character(row)
+        for row in scenes:
+            index.put_scene(row)
+        for row in chapters:
+            index.put_chapter(row)
+        with self._lock:
+            if self._index is None and self.version == version:
+                self._index = index
+            elif self._index is not None:
+                return self._index
+        # A change raced with the load; answer from it and reload next time
+        return index
+
+    def apply(self, event: ChangeEvent) -> None:
+        with self._lock:
+            self.version += 1
+            self._stats = None
+            index = self._index
+            if event.op == "reset":
+                self._index = None
+                return
+            if index is None:
+                return  # Not loaded yet; the first query will include this change
+            if event.entity_type == "character":
+                if event.op == "delete":
+                    index.drop_character(event.key)
+                else:
+                    index.put_character(event.row)
+            elif event.entity_type == "scene":
+                if event.op == "delete":
+                    index.drop_scene(event.key)
+                else:
+                    index.put_scene(event.row)
+            elif event.entity_type == "chapter":
+                if event.op == "delete":
+                    index.drop_chapter(event.key)
+                else:
+                    index.put_chapter(event.row)
+
+    def _compute(self) -> Dict:
+        index = self._ensure_loaded()
+        with self._lock:
+            if self._stats is not None and self._index is index:
+                return self._stats
+            cooccurrence = index.cooccurrences()
+            live = index.live_rows()
+            names = [index.names[i] for i in live]
+            matrix = cooccurrence[live][:, live].tocsr()
+            scenes = matrix.diagonal()
+            adjacency = matrix - sparse.diags(scenes, dtype=matrix.dtype)
+            adjacency.eliminate_zeros()
+            stats = {
+                "names": names,
+                "scenes": scenes,
+                "co_characters": np.diff(adjacency.indptr),
+                "shared": np.asarray(adjacency.sum(axis=1)).ravel(),
+                "eigenvector": _eigenvector(adjacency.astype(np.float64)),
+                "pairs": sparse.triu(adjacency, k=1).tocoo()
+            }
+            if self._index is index:
+                self._stats = stats
+            return stats
+
+    # Queries
+
+    def top_pairs(self, limit: int = 10) -> List[Dict]:
+        """Pairs of characters sharing the most scenes"""
+        stats = self._compute()
+        pairs = stats["pairs"]
+        if pairs.nnz == 0:
+            return []
+        count = min(limit, pairs.nnz)
+        top = np.argpartition(-pairs.data, count - 1)[:count]
+        top = top[np.lexsort((pairs.col[top], pairs.row[top], -pairs.data[top]))]
+        names = stats["names"]
+        return [{"characters": (names[pairs.row[i]], names[pairs.col[i]]), "shared_scenes": int(pairs.data[i])}
+                for i in top]
+
+    def centrality(self, limit: Optional[int] = None) -> List[Dict]:
+        """Characters by eigenvector centrality: high when they share scenes with other central characters"""
+        stats = self._compute()
+        order = np.lexsort((-stats["co_characters"], -stats["eigenvector"]))
+        if limit is not None:
+            order = order[:limit]
+        return [{
+            "name": stats["names"][i],
+            "scenes": int(stats["scenes"][i]),
+            "co_characters": int(stats["co_characters"][i]),
+            "shared_scenes": int(stats["shared"][i]),
+            "eigenvector": round(float(stats["eigenvector"][i]), 4)
+        } for i in order]
+
+    def isolated(self) -> List[Dict]:
+        """Characters who never share a scene, with how many scenes they have alone"""
+        stats = self._compute()
+        alone = np.flatnonzero(stats["co_characters"] == 0)
+        return [{"name": stats["names"][i], "scenes": int(stats["scenes"][i])} for i in alone]
+
+    def presence(self, limit: Optional[int] = None) -> Tuple[List[str], List[str], np.ndarray]:
+        """Scenes per character per chapter, as (names, chapter titles, counts).
+
+        Rows are the characters in the most scenes first, cut to limit;
+        chapters are in the order they were created.
+        """
+        index = self._ensure_loaded()
+        with self._lock:
+            titles = sorted(index.chapters, key=index.chapter_order.__getitem__)
+            cols = [index.chapters[t] for t in titles]
+            lengths = np.fromiter((len(c) for c in cols), dtype=np.int64, count=len(cols))
+            scene_cols = np.fromiter((c for chapter in cols for c in chapter), dtype=np.int64)
+            # Scene x chapter incidence, so the heatmap is one product
+            chapters = sparse.csr_matrix(
+                (np.ones(len(scene_cols), dtype=np.int32), (scene_cols, np.repeat(np.arange(len(cols)), lengths))),
+                shape=(index.scene_count, len(cols))
+            )
+            incidence = index.matrix()
+            live = index.live_rows()
+            names = [index.names[i] for i in live]
+        counts = (incidence[live] @ chapters).toarray()
+        order = np.argsort(-counts.sum(axis=1), kind="stable")
+        if limit is not None:
+            order = order[:limit]
+        return [names[i] for i in order], titles, counts[order]
@@ -0,0 +1,118 @@
+# bookwright/core/jobs.py
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from ..models.base import BOOKWRIGHT_HOME
+from ..utils.job_queue import JobContext, JobQueue
+from ..utils.jsonl_io import export_jsonl
+from .llm_interface import get_llm_client
+from .manuscript import compile_manuscript
+
+EXPORTS_DIR = BOOKWRIGHT_HOME / "exports"
+
+# Kinds of job, as shown in the Jobs tab
+JOB_KINDS = {
+    "draft_scenes": "Draft scenes without a draft",
+    "export": "Export book (JSON Lines)",
+    "compile_manuscript": "Compile manuscript",
+    "reindex": "Re-index mentions and near duplicates",
+    "text_stats": "Text statistics",
+}
+
+
+def _scene_prompt(scene: Dict, characters: Dict[str, Dict]) -> str:
+    """Drafting prompt for one scene from its outline and cast"""
+    prompt = f"Write the first draft of a scene titled '{scene['title']}'.\n\n"
+    prompt += f"Setting: {scene['location'] or 'unspecified'}, {scene['day'] or ''} {scene['time'] or ''}\n\n"
+    prompt += f"Scene Outline:\n{scene['description'] or ''}\n\n"
+    if scene["notes"]:
+        prompt += f"Notes:\n{scene['notes']}\n\n"
+    cast = [characters[name] for name in scene["characters"] if name in characters]
+    if cast:
+        prompt += "Characters in the scene:\n"
+        for c in cast:
+            prompt += f"\n{c['name']} ({c['role'] or 'character'}):\n"
+            prompt += f"- Appearance: {c['physical_description'] or ''}\n"
+            prompt += f"- Personality: {c['personality_traits'] or ''}\n"
+            prompt += f"- Motivation: {c['motivation'] or ''}\n"
+    prompt += "\nPlease write in an engaging, vivid style with natural dialogue and action beats."
+    return prompt
+
+
+def draft_scenes(story_db, context: JobContext, titles: Optional[List[str]] = None,
+                 model: str = "deepseek") -> Dict:
+    """Generate a draft for each scene that has none; re-running skips scenes already drafted"""
+    llm = get_llm_client(model)
+    with story_db.session() as db:
+        drafted = set(story_db.get_draft_digests(db, "scene"))
+        characters = {c["name"]: c for c in story_db.get_characters(db)}
+        scenes = [s for s in story_db.get_scenes(db)
+                  if s["title"] not in drafted and (not titles or s["title"] in titles)]
+    for done, scene in enumerate(scenes):
+        context.check()
+        context.progress(done / len(scenes), f"Drafting {scene['title']} ({done + 1} of {len(scenes)})")
+        # Generate outside the session so saves from the UI aren't held up
+        text = llm.generate(_scene_prompt(scene, characters))
+        with story_db.session() as db:
+            story_db.save_draft(db, "scene", scene["title"], text)
+    story_db.flush()
+    return {"drafted": [s["title"] for s in scenes]}
+
+
+def export_book(story_db, context: JobContext) -> Dict:
+    EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = str(EXPORTS_DIR / f"bookwright_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+    context.progress(0, "Exporting")
+    counts = export_jsonl(story_db, path)
+    return {"path": path, "counts": counts}
+
+
+def build_manuscript(story_db, context: JobContext, fmt: str = "markdown") -> Dict:
+    context.progress(0, f"Compiling {fmt}")
+    return compile_manuscript(story_db, fmt)
+
+
+def reindex(story_db, context: JobContext) -> Dict:
+    """Bring the mention index and near-duplicate signatures up to date"""
+    context.progress(0, "Indexing mentions")
+    with story_db.session() as db:
+        mentions = story_db.refresh_mentions(db)
+    context.check()
+    context.progress(0.5, "Updating near-duplicate signatures")
+    with story_db.session() as db:
+        signatures = story_db.refresh_duplicates(db)
+    story_db.flush()
+    return {"mentions": mentions, "signatures_computed": signatures}
+
+
+def text_stats(story_db, context: JobContext) -> Dict:
+    from ..utils.text_processor import text_analyzer
+    context.progress(0, "Analyzing drafts")
+    stats = text_analyzer.analyze_book(story_db)
+    return {"book": stats["book"], "dialogue_share": stats["dialogue_share"]}
+
+
+_HANDLERS = {
+    "draft_scenes": draft_scenes,
+    "export": export_book,
+    "compile_manuscript": build_manuscript,
+    "reindex": reindex,
+    "text_stats": text_stats,
+}
+
+_queues: Dict[str, JobQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_job_queue(story_db) -> JobQueue:
+    """Return the running job queue of a book, starting it on first use"""
+    key = os.path.abspath(story_db.path)
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            queue = _queues[key] = JobQueue(story_db.path)
+            for kind, handler in _HANDLERS.items():
+                queue.register(kind, lambda context, _handler=handler, **params: _handler(story_db, context, **params))
+            queue.start()
+        return queue
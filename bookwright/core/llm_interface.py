@@ -1,6 +1,29 @@
 # bookwright/utils/prompt_builder.py
 # bookwright/core/llm_interface.py
-import requests
+import json
+import threading
+import time
+from typing import Dict, Tuple
+from ..utils.metrics import registry, RATE_BUCKETS
+from ..utils.tracing import tracer
+
+LLM_REQUESTS = registry.counter("bookwright_llm_requests_total", "LLM generations by model and outcome")
+LLM_SECONDS = registry.histogram("bookwright_llm_request_seconds", "Time for a whole LLM generation")
+LLM_TTFT = registry.histogram("bookwright_llm_ttft_seconds", "Time from sending a prompt to the first token")
+LLM_TOKENS = registry.counter("bookwright_llm_tokens_total", "Prompt and completion tokens by model")
+LLM_RATE = registry.histogram("bookwright_llm_tokens_per_second", "Completion tokens per second of generation",
+                              buckets=RATE_BUCKETS)
+
+_clients: Dict[Tuple[str, str], "OllamaClient"] = {}
+_clients_lock = threading.Lock()
+
+def get_llm_client(model: str = 'deepseek', host: str = 'http://localhost:11434') -> "OllamaClient":
+    """Return the shared client for a model, creating it on first use"""
+    with _clients_lock:
+        client = _clients.get((model, host))
+        if client is None:
+            client = _clients[(model, host)] = OllamaClient(model=model, host=host)
+        return client
 
 class OllamaClient:
     def __init__(self, model='deepseek', host='http://localhost:11434'):
@@ -8,14 +31,56 @@ class OllamaClient:
         self.api_url = f'{host}/api/generate'
 
     def generate(self, prompt, options=None):
+        import requests  # Deferred: only needed once something is generated
         data = {
             'model': self.model,
             'prompt': prompt,
-            'stream': False
+            # Streamed so the time to the first token can be measured; the text is joined here
+            'stream': True
         }
         if options:
             data['options'] = options
-        response = requests.post(self.api_url, json=data, timeout=120)
-        response.raise_for_status()
-        return response.json().get('response', '').strip()
+        with tracer.span('llm.generate', model=self.model, prompt_chars=len(prompt)) as span:
+            start = time.perf_counter()
+            try:
+                with requests.post(self.api_url, json=data, timeout=120, stream=True) as response:
+                    response.raise_for_status()
+                    parts = []
+                    final = {}
+                    for line in response.iter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get('error'):
+                            # Ollama reports failures mid-stream with HTTP 200
+                            raise RuntimeError(f"Ollama error: {chunk['error']}")
+                        if chunk.get('response'):
+                            if not parts:
+                                ttft = time.perf_counter() - start
+                                LLM_TTFT.observe(ttft, model=self.model)
+                                span.set(ttft_seconds=round(ttft, 4))
+                            parts.append(chunk['response'])
+                        if chunk.get('done'):
+                            final = chunk
+                    if not final:
+                        raise RuntimeError("Ollama stream ended before the generation was done")
+            except Exception:
+                LLM_REQUESTS.inc(model=self.model, outcome='error')
+                raise
+            LLM_SECONDS.observe(time.perf_counter() - start, model=self.model)
+            LLM_REQUESTS.inc(model=self.model, outcome='ok')
+            text = ''.join(parts).strip()
+            span.set(response_chars=len(text), **self._record_tokens(final))
+            return text
 
+    def _record_tokens(self, final: Dict) -> Dict:
+        """Token counts and speed from the summary Ollama sends with its last chunk"""
+        tokens = {'prompt_tokens': final.get('prompt_eval_count', 0),
+                  'completion_tokens': final.get('eval_count', 0)}
+        LLM_TOKENS.inc(tokens['prompt_tokens'], model=self.model, kind='prompt')
+        LLM_TOKENS.inc(tokens['completion_tokens'], model=self.model, kind='completion')
+        if final.get('eval_count') and final.get('eval_duration'):
+            rate = final['eval_count'] / (final['eval_duration'] / 1e9)
+            LLM_RATE.observe(rate, model=self.model)
+            tokens['tokens_per_second'] = round(rate, 2)
+        return tokens
@@ -0,0 +1,318 @@
+# bookwright/core/timeline.py
+import bisect
+import heapq
+import json
+import re
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from ..utils.change_feed import ChangeEvent
+from ..utils.record_cache import FrozenRecord
+
+MINUTES_PER_DAY = 24 * 60
+
+# A clock time like "14:30" covers this many minutes
+DEFAULT_SCENE_MINUTES = 60
+
+# Named parts of the day as [start, end) minutes after midnight
+DEFAULT_SLOTS: Dict[str, Tuple[int, int]] = {
+    "midnight": (0, 60),
+    "dawn": (300, 420),
+    "morning": (360, 720),
+    "noon": (720, 780),
+    "midday": (720, 780),
+    "afternoon": (720, 1020),
+    "dusk": (1080, 1200),
+    "evening": (1020, 1260),
+    "night": (1260, 1440),
+}
+
+_DAY_RE = re.compile(r"^(?:year\s*(\d+)\s*[,;/]?\s*)?day\s*(\d+)$")
+_CLOCK_RE = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?")
+# "to" only as a word, so "tonight" is not a range
+_RANGE_SPLIT_RE = re.compile(r"\s*[-–]\s*|\s+to\s+")
+# Between days the separator needs spaces around it: ISO dates have dashes
+_DAY_RANGE_SPLIT_RE = re.compile(r"\s+(?:-|–|to)\s+")
+
+# (day, start minute, end minute)
+TimeSlot = Tuple[int, int, int]
+
+
+class Calendar:
+    """Turns the free-text day and time of a scene into a sortable slot.
+
+    Days may be "Day 3", "3", "Year 2, Day 40" (with days_per_year), an ISO
+    date, or any alias the author defines ("Prologue" -> 0). Times may be a
+    named slot ("evening", "early morning"), a clock time ("2:30 pm") or a
+    range ("09:00-11:00"); an empty time spans the whole day, so the scene
+    sorts within it, though when in the day it happens is unknown.
+    """
+
+    def __init__(self, slots: Optional[Dict[str, Tuple[int, int]]] = None,
+                 day_aliases: Optional[Dict[str, int]] = None,
+                 days_per_year: Optional[int] = None,
+                 scene_minutes: int = DEFAULT_SCENE_MINUTES):
+        self.slots = {k.lower(): tuple(v) for k, v in (slots or DEFAULT_SLOTS).items()}
+        self.day_aliases = {k.lower(): v for k, v in (day_aliases or {}).items()}
+        self.days_per_year = days_per_year
+        self.scene_minutes = scene_minutes
+
+    @classmethod
+    def from_dict(cls, config: Dict) -> "Calendar":
+        slots = dict(DEFAULT_SLOTS)
+        slots.update(config.get("slots", {}))
+        return cls(slots=slots, day_aliases=config.get("day_aliases"),
+                   days_per_year=config.get("days_per_year"),
+                   scene_minutes=config.get("scene_minutes", DEFAULT_SCENE_MINUTES))
+
+    @classmethod
+    def load(cls, path: str) -> "Calendar":
+        """Read a calendar from JSON: {"slots": {...}, "day_aliases": {...}, "days_per_year": N}"""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def parse_day(self, text: Optional[str]) -> Optional[int]:
+        text = " ".join((text or "").lower().split())
+        if not text:
+            return None
+        if text in self.day_aliases:
+            return self.day_aliases[text]
+        if text.isdigit():
+            return int(text)
+        match = _DAY_RE.match(text)
+        if match:
+            year, day = match.groups()
+            if year is not None:
+                if not self.days_per_year:
+                    return None
+                return (int(year) - 1) * self.days_per_year + int(day)
+            return int(day)
+        try:
+            return date.fromisoformat(text).toordinal()
+        except ValueError:
+            return None
+
+    def _clock(self, text: str) -> Optional[int]:
+        match = _CLOCK_RE.fullmatch(text)
+        if not match:
+            return None
+        hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+        if meridiem == "pm" and hour < 12:
+            hour += 12
+        elif meridiem == "am" and hour == 12:
+            hour = 0
+        if hour > 24 or minute > 59:
+            return None
+        return min(hour * 60 + minute, MINUTES_PER_DAY)
+
+    def parse_time(self, text: Optional[str]) -> Optional[Tuple[int, int]]:
+        text = " ".join((text or "").lower().split())
+        if not text:
+            return 0, MINUTES_PER_DAY
+        if text in self.slots:
+            return self.slots[text]
+        modifier, _, rest = text.partition(" ")
+        if modifier in ("early", "late") and rest in self.slots:
+            start, end = self.slots[rest]
+            middle = (start + end) // 2
+            return (start, middle) if modifier == "early" else (middle, end)
+        parts = _RANGE_SPLIT_RE.split(text)
+        if len(parts) == 2:
+            start, end = self._clock(parts[0]), self._clock(parts[1])
+            if start is not None and end is not None and start < end:
+                return start, end
+            return None
+        start = self._clock(text)
+        if start is None:
+            return None
+        return start, min(start + self.scene_minutes, MINUTES_PER_DAY)
+
+    def parse(self, day: Optional[str], time: Optional[str]) -> Optional[TimeSlot]:
+        """Return (day, start, end) or None when the day or time is not understood"""
+        day_number = self.parse_day(day)
+        minutes = self.parse_time(time)
+        if day_number is None or minutes is None:
+            return None
+        return day_number, minutes[0], minutes[1]
+
+
+def calendar_path(story_db) -> Path:
+    """A book's own calendar lives next to its database"""
+    return Path(story_db.path).with_suffix(".calendar.json")
+
+
+class _Chronology:
+    """The sorted index itself; callers hold Timeline's lock"""
+
+    def __init__(self, calendar: Calendar):
+        self.calendar = calendar
+        self.entries: List[Tuple[int, int, int]] = []  # (start, end, scene id), sorted
+        self.scenes: Dict[int, FrozenRecord] = {}
+        self.slots: Dict[str, Tuple[int, int, int]] = {}  # title -> its entry
+        self.unscheduled: Dict[str, FrozenRecord] = {}
+        self.untimed = set()  # Ids of scenes with a day but no time
+        self.longest = 0
+
+    def add(self, scene: FrozenRecord) -> None:
+        slot = self.calendar.parse(scene.get("day"), scene.get("time"))
+        if slot is None:
+            self.unscheduled[scene["title"]] = scene
+            return
+        day, start, end = slot
+        entry = (day * MINUTES_PER_DAY + start, day * MINUTES_PER_DAY + end, scene["id"])
+        bisect.insort(self.entries, entry)
+        self.scenes[scene["id"]] = scene
+        self.slots[scene["title"]] = entry
+        if not (scene.get("time") or "").strip():
+            self.untimed.add(scene["id"])
+        self.longest = max(self.longest, end - start)
+
+    def remove(self, title: str) -> None:
+        self.unscheduled.pop(title, None)
+        entry = self.slots.pop(title, None)
+        if entry is None:
+            return
+        index = bisect.bisect_left(self.entries, entry)
+        if index < len(self.entries) and self.entries[index] == entry:
+            del self.entries[index]
+        self.scenes.pop(entry[2], None)
+        self.untimed.discard(entry[2])
+
+
+class Timeline:
+    """Scenes indexed by when they happen, kept current by the change feed.
+
+    Scenes are held in a list sorted by absolute start minute, so chronology
+    and range queries are a bisect away. Scenes whose day or time the calendar
+    can't read are listed as unscheduled.
+    """
+
+    def __init__(self, story_db, calendar: Optional[Calendar] = None):
+        self.story_db = story_db
+        if calendar is None:
+            path = calendar_path(story_db)
+            calendar = Calendar.load(str(path)) if path.exists() else Calendar()
+        self.calendar = calendar
+        self._lock = threading.RLock()
+        self._index: Optional[_Chronology] = None
+        self.version = 0
+        self.unsubscribe = story_db.feed.subscribe(self.apply, ["scene"])
+
+    def _ensure_loaded(self) -> _Chronology:
+        with self._lock:
+            if self._index is not None:
+                return self._index
+            version = self.version
+        # Load outside the lock, as FeedMirror does: writers publish while holding the session
+        with self.story_db.session() as db:
+            scenes = self.story_db.get_scenes(db)
+        index = _Chronology(self.calendar)
+        for scene in scenes:
+            index.add(scene)
+        with self._lock:
+            if self._index is None and self.version == version:
+                self._index = index
+            elif self._index is not None:
+                return self._index
+        # A change raced with the load; answer from it and reload next time
+        return index
+
+    def apply(self, event: ChangeEvent) -> None:
+        with self._lock:
+            self.version += 1
+            if event.op == "reset":
+                self._index = None
+            elif self._index is not None:
+                self._index.remove(event.key)
+                if event.op != "delete":
+                    self._index.add(event.row)
+
+    # Queries
+
+    def slot_of(self, title: str) -> Optional[TimeSlot]:
+        """(day, start, end) of a scene, or None if it is unscheduled"""
+        index = self._ensure_loaded()
+        with self._lock:
+            entry = index.slots.get(title)
+        if entry is None:
+            return None
+        day = entry[0] // MINUTES_PER_DAY
+        return day, entry[0] - day * MINUTES_PER_DAY, entry[1] - day * MINUTES_PER_DAY
+
+    def chronological(self) -> List[FrozenRecord]:
+        """All scheduled scenes, earliest first"""
+        index = self._ensure_loaded()
+        with self._lock:
+            return [index.scenes[scene_id] for _, _, scene_id in index.entries]
+
+    def unscheduled(self) -> List[FrozenRecord]:
+        index = self._ensure_loaded()
+        with self._lock:
+            return list(index.unscheduled.values())
+
+    def between(self, start: int, end: int) -> List[FrozenRecord]:
+        """Scenes overlapping [start, end) in absolute minutes, by start time"""
+        index = self._ensure_loaded()
+        with self._lock:
+            # Nothing starting before start - longest can still be running at start
+            lo = bisect.bisect_left(index.entries, (start - index.longest,))
+            hi = bisect.bisect_left(index.entries, (end,))
+            return [index.scenes[scene_id] for _, e, scene_id in index.entries[lo:hi] if e > start]
+
+    def on_days(self, first_day: int, last_day: Optional[int] = None) -> List[FrozenRecord]:
+        """Scenes on first_day..last_day inclusive"""
+        last_day = first_day if last_day is None else last_day
+        return self.between(first_day * MINUTES_PER_DAY, (last_day + 1) * MINUTES_PER_DAY)
+
+    def query(self, text: str) -> List[FrozenRecord]:
+        """Scenes on a day or day range written as text, e.g. "Day 3" or "Day 2 - Day 4" """
+        first = last = self.calendar.parse_day(text)
+        if first is None:
+            parts = _DAY_RANGE_SPLIT_RE.split(text.strip(), maxsplit=1)
+            first = self.calendar.parse_day(parts[0])
+            last = self.calendar.parse_day(parts[1]) if len(parts) == 2 else first
+        if first is None or last is None:
+            raise ValueError(f"Can't read day: {text}")
+        return self.on_days(min(first, last), max(first, last))
+
+    def conflicts(self) -> List[Dict]:
+        """Characters in two places at once.
+
+        A sweep over scenes in start order keeps, per character, a heap of
+        the scenes they are still in; a new scene conflicts with any of those
+        set somewhere else. O(n log n) plus the conflicts found.
+
+        A scene with no time only says which day it is on, so a clash with
+        it is marked possible (and has no overlap_minutes) rather than
+        treated as lasting the whole day.
+        """
+        index = self._ensure_loaded()
+        with self._lock:
+            entries = list(index.entries)
+            scenes = dict(index.scenes)
+            untimed = set(index.untimed)
+        active: Dict[str, List[Tuple[int, int]]] = {}  # character -> heap of (end, scene id)
+        found = []
+        for start, end, scene_id in entries:
+            scene = scenes[scene_id]
+            location = (scene.get("location") or "").strip().lower()
+            for name in scene.get("characters", ()):
+                heap = active.setdefault(name, [])
+                while heap and heap[0][0] <= start:
+                    heapq.heappop(heap)
+                for other_end, other_id in heap:
+                    other = scenes[other_id]
+                    other_location = (other.get("location") or "").strip().lower()
+                    if location and other_location and location != other_location:
+                        possible = scene_id in untimed or other_id in untimed
+                        found.append({
+                            "character": name,
+                            "scenes": (other["title"], scene["title"]),
+                            "locations": (other.get("location"), scene.get("location")),
+                            "day": start // MINUTES_PER_DAY,
+                            "overlap_minutes": None if possible else min(end, other_end) - start,
+                            "possible": possible
+                        })
+                heapq.heappush(heap, (end, scene_id))
+        return found
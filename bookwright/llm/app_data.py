@@ -2,6 +2,9 @@ from typing import Dict, Any, List
 from datetime import datetime
 import json
 from pathlib import Path
+from ..utils.jsonl_io import export_jsonl, read_jsonl
+from ..utils.snapshots import create_snapshot, restore_snapshot
+from ..utils.tracing import tracer
 
 class AppData:
     def __init__(self, db_manager):
@@ -9,69 +12,73 @@ class AppData:
         
     def get_current_state(self) -> Dict[str, Any]:
         """Get the current state of the application as JSON"""
-        return {
-            "timestamp": datetime.now().isoformat(),
-            "book_info": self.db_manager.get_book_info(),
-            "characters": self.db_manager.get_characters(),
-            "scenes": self.db_manager.get_scenes(),
-            "chapters": self.db_manager.get_chapters()
-        }
+        with self.db_manager.session() as db:
+            return {
+                "timestamp": datetime.now().isoformat(),
+                "book_info": self.db_manager.get_book_info(db),
+                "characters": self.db_manager.get_characters(db),
+                "scenes": self.db_manager.get_scenes(db),
+                "chapters": self.db_manager.get_chapters(db)
+            }
     
     def save_state(self, file_path: str) -> None:
-        """Save the current state to a JSON file"""
-        state = self.get_current_state()
-        with open(file_path, 'w') as f:
-            json.dump(state, f, indent=2)
+        """Stream the current state to a JSON Lines file"""
+        export_jsonl(self.db_manager, file_path)
     
     def load_state(self, file_path: str) -> Dict[str, Any]:
-        """Load application state from a JSON file"""
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        """Load application state saved by save_state"""
+        state = {"book_info": None, "characters": [], "scenes": [], "chapters": []}
+        for record in read_jsonl(file_path):
+            if record["type"] == "book":
+                state["book_info"] = record["data"]
+            elif record["type"] in ("character", "scene", "chapter"):
+                state[record["type"] + "s"].append(record["data"])
+        return state
     
-    def get_character_context(self, character_id: str) -> Dict[str, Any]:
+    def snapshot(self, label: str = None) -> str:
+        """Take a fast binary snapshot, e.g. before a batch generation"""
+        return create_snapshot(self.db_manager, label=label)
+    
+    def restore(self, snapshot_path: str) -> None:
+        """Roll the book back to a snapshot taken by snapshot()"""
+        restore_snapshot(self.db_manager, snapshot_path)
+    
+    def get_character_context(self, character_id: int) -> Dict[str, Any]:
         """Get detailed context for a specific character"""
-        characters = self.db_manager.get_characters()
-        character = next((c for c in characters if c["id"] == character_id), None)
-        if not character:
-            return {}
-            
-        # Get related scenes
-        scenes = self.db_manager.get_scenes()
-        character_scenes = [s for s in scenes if character["name"] in s.get("characters", [])]
-        
-        # Get related chapters
-        chapters = self.db_manager.get_chapters()
-        character_chapters = []
-        for chapter in chapters:
-            chapter_scenes = [s for s in scenes if s["title"] in chapter.get("scenes", [])]
-            if any(s in character_scenes for s in chapter_scenes):
-                character_chapters.append(chapter)
-        
-        return {
-            "character": character,
-            "scenes": character_scenes,
-            "chapters": character_chapters,
-            "book_info": self.db_manager.get_book_info()
-        }
+        # Answered from the relationship index in O(degree), without scanning the book
+        index = self.db_manager.relationships
+        with tracer.span("context.character", character_id=character_id,
+                         cache="warm" if index.loaded else "cold") as span:
+            character = index.character(character_id)
+            if not character:
+                span.set(found=False)
+                return {}
+            with self.db_manager.session() as db:
+                book_info = self.db_manager.get_book_info(db)
+            context = {
+                "character": character,
+                "scenes": index.scenes_of_character(character_id),
+                "chapters": index.chapters_of_character(character_id),
+                "book_info": book_info
+            }
+            span.set(found=True, scenes=len(context["scenes"]), chapters=len(context["chapters"]))
+            return context
     
-    def get_scene_context(self, scene_id: str) -> Dict[str, Any]:
+    def get_scene_context(self, scene_id: int) -> Dict[str, Any]:
         """Get detailed context for a specific scene"""
-        scenes = self.db_manager.get_scenes()
-        scene = next((s for s in scenes if s["id"] == scene_id), None)
-        if not scene:
-            return {}
-            
-        # Get related characters
-        characters = self.db_manager.get_characters()
-        scene_characters = [c for c in characters if c["name"] in scene.get("characters", [])]
-        
-        # Get related chapters
-        chapters = self.db_manager.get_chapters()
-        scene_chapters = [c for c in chapters if scene["title"] in c.get("scenes", [])]
-        
-        return {
-            "scene": scene,
-            "characters": scene_characters,
-            "chapters": scene_chapters,
-            "book_info": self.db_manager.get_book_info()
-        } 
\ No newline at end of file
+        index = self.db_manager.relationships
+        with tracer.span("context.scene", scene_id=scene_id, cache="warm" if index.loaded else "cold") as span:
+            scene = index.scene(scene_id)
+            if not scene:
+                span.set(found=False)
+                return {}
+            with self.db_manager.session() as db:
+                book_info = self.db_manager.get_book_info(db)
+            context = {
+                "scene": scene,
+                "characters": index.characters_in_scene(scene_id),
+                "chapters": index.chapters_of_scene(scene_id),
+                "book_info": book_info
+            }
+            span.set(found=True, characters=len(context["characters"]), chapters=len(context["chapters"]))
+            return context
@@ -1,12 +1,12 @@
 from typing import Dict, Any
 from .llm_service import LLMService
 from .app_data import AppData
-from ..utils.database_manager import StoryDatabase
+from ..utils.database_manager import get_story_database
 import json
 
 def main():
     # Initialize the database manager
-    db_manager = StoryDatabase()
+    db_manager = get_story_database()
     
     # Initialize the app data handler
     app_data = AppData(db_manager)
@@ -15,7 +15,7 @@ def main():
     llm_service = LLMService(prompts_dir="bookwright/llm/prompts")
     
     # Example 1: Character Development
-    character_id = "character_1"  # Replace with actual character ID
+    character_id = db_manager.relationships.character_id("Character Name")  # Replace with an actual character
     character_context = app_data.get_character_context(character_id)
     
     # Generate character development suggestions
@@ -28,7 +28,7 @@ def main():
     print(json.dumps(response, indent=2))
     
     # Example 2: Scene Analysis
-    scene_id = "scene_1"  # Replace with actual scene ID
+    scene_id = db_manager.relationships.scene_id("Scene Title")  # Replace with an actual scene
     scene_context = app_data.get_scene_context(scene_id)
     
     # Generate scene analysis
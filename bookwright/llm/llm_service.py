@@ -1,19 +1,30 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, TYPE_CHECKING
 import json
 import os
 from pathlib import Path
-from langgraph.graph import Graph
-from langgraph.prebuilt import ToolNode
-from langgraph.checkpoint.memory import MemorySaver
+from ..utils.tracing import tracer
+
+if TYPE_CHECKING:
+    from langgraph.graph import Graph
 
 class LLMService:
     def __init__(self, prompts_dir: str = "prompts"):
         self.prompts_dir = Path(prompts_dir)
         self.prompts_cache: Dict[str, Dict] = {}
-        self.graph = self._build_graph()
+        self._graph: Optional["Graph"] = None
+    
+    @property
+    def graph(self) -> "Graph":
+        """The LangGraph, built on first use so importing langgraph doesn't slow startup"""
+        if self._graph is None:
+            self._graph = self._build_graph()
+        return self._graph
         
-    def _build_graph(self) -> Graph:
+    def _build_graph(self) -> "Graph":
         """Build the LangGraph for LLM interactions"""
+        from langgraph.graph import Graph
+        from langgraph.prebuilt import ToolNode
+        
         # Define nodes
         nodes = {
             "load_prompt": ToolNode(self._load_prompt),
@@ -33,30 +44,35 @@ class LLMService:
     
     def _load_prompt(self, prompt_name: str) -> Dict:
         """Load a prompt configuration from JSON"""
-        if prompt_name in self.prompts_cache:
-            return self.prompts_cache[prompt_name]
-            
-        prompt_path = self.prompts_dir / f"{prompt_name}.json"
-        if not prompt_path.exists():
-            raise FileNotFoundError(f"Prompt file not found: {prompt_path}")
-            
-        with open(prompt_path, 'r') as f:
-            prompt_config = json.load(f)
-            self.prompts_cache[prompt_name] = prompt_config
-            return prompt_config
+        with tracer.span("load_prompt", prompt_name=prompt_name) as span:
+            if prompt_name in self.prompts_cache:
+                span.set(cache="hit")
+                return self.prompts_cache[prompt_name]
+            span.set(cache="miss")
+
+            prompt_path = self.prompts_dir / f"{prompt_name}.json"
+            if not prompt_path.exists():
+                raise FileNotFoundError(f"Prompt file not found: {prompt_path}")
+
+            with open(prompt_path, 'r') as f:
+                prompt_config = json.load(f)
+                self.prompts_cache[prompt_name] = prompt_config
+                return prompt_config
     
     def _process_data(self, prompt_config: Dict, app_data: Dict) -> Dict:
         """Process application data according to the prompt configuration"""
-        # Apply handler code if present
-        if "handler_code" in prompt_config:
-            # In a real implementation, this would execute the handler code
-            # For now, we'll just pass through the data
-            pass
-            
-        return {
-            "prompt_config": prompt_config,
-            "app_data": app_data
-        }
+        with tracer.span("process_data", handler="handler_code" in prompt_config,
+                         data_keys=len(app_data or {})):
+            # Apply handler code if present
+            if "handler_code" in prompt_config:
+                # In a real implementation, this would execute the handler code
+                # For now, we'll just pass through the data
+                pass
+
+            return {
+                "prompt_config": prompt_config,
+                "app_data": app_data
+            }
     
     def _call_llm(self, processed_data: Dict) -> Dict:
         """Call the LLM with the processed data"""
@@ -66,31 +82,37 @@ class LLMService:
         # Build the final prompt
         system_prompt = prompt_config["system_card"]
         user_prompt = prompt_config["prompt_card"]
-        
-        # In a real implementation, this would call the actual LLM
-        # For now, we'll return a mock response
-        return {
-            "response": {
-                "status": "success",
-                "data": {
-                    "message": "This is a mock LLM response",
-                    "app_data": app_data
+
+        with tracer.span("call_llm", system_chars=len(system_prompt), prompt_chars=len(user_prompt)) as span:
+            # In a real implementation, this would call the actual LLM
+            # For now, we'll return a mock response
+            message = "This is a mock LLM response"
+            span.set(response_chars=len(message))
+            return {
+                "response": {
+                    "status": "success",
+                    "data": {
+                        "message": message,
+                        "app_data": app_data
+                    }
                 }
             }
-        }
     
     def _validate_output(self, llm_response: Dict) -> Dict:
         """Validate the LLM response"""
-        # In a real implementation, this would validate the response
-        # For now, we'll just pass through the response
-        return llm_response
+        with tracer.span("validate_output"):
+            # In a real implementation, this would validate the response
+            # For now, we'll just pass through the response
+            return llm_response
     
     def generate(self, prompt_name: str, app_data: Dict) -> Dict:
         """Generate a response using the specified prompt and application data"""
-        # Run the graph
-        result = self.graph.run({
-            "prompt_name": prompt_name,
-            "app_data": app_data
-        })
-        
-        return result["response"] 
\ No newline at end of file
+        # Run the graph; each stage records a span under this one
+        with tracer.span("llm_service.generate", prompt_name=prompt_name,
+                         graph="warm" if self._graph is not None else "cold") as span:
+            result = self.graph.run({
+                "prompt_name": prompt_name,
+                "app_data": app_data
+            })
+            span.set(response_status=result["response"].get("status"))
+            return result["response"] 
\ No newline at end of file
@@ -1,18 +1,179 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
 from datetime import datetime
+import asyncio
+import os
+import threading
+from ..utils.metrics import instrument_engine
+from ..utils.query_guard import watch_engine
 
-# Create SQLAlchemy engine
-engine = create_engine('sqlite:///bookwright.db')
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Per-book databases and the project registry live here
+BOOKWRIGHT_HOME = Path(os.environ.get("BOOKWRIGHT_HOME", Path.home() / ".bookwright"))
+# Database used when no book is selected
+LEGACY_DATABASE_PATH = "bookwright.db"
+
+def _default_database_path() -> str:
+    """BOOKWRIGHT_DB, else the database in BOOKWRIGHT_HOME.
+
+    Earlier versions kept it in the working directory; such a file is still
+    used while BOOKWRIGHT_HOME has none, so existing books don't disappear.
+    """
+    if os.environ.get("BOOKWRIGHT_DB"):
+        return os.environ["BOOKWRIGHT_DB"]
+    home_path = BOOKWRIGHT_HOME / "bookwright.db"
+    if not home_path.exists() and os.path.exists(LEGACY_DATABASE_PATH):
+        return os.path.abspath(LEGACY_DATABASE_PATH)
+    return str(home_path)
+
+DATABASE_PATH = _default_database_path()
+# Engines allowed to keep idle connections open at once
+MAX_OPEN_ENGINES = 8
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection for many small writes"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+    cursor.execute("PRAGMA synchronous=NORMAL")  # fsync on checkpoint, not on every commit
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA cache_size=-16000")  # 16 MB page cache
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA wal_autocheckpoint=1000")
+    cursor.close()
+
+class _EngineEntry:
+    def __init__(self, path: str):
+        self.path = path
+        # SQLite creates the file on first connect, but not its directory
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Sessions are shared between Gradio worker threads, hence check_same_thread=False
+        self.engine = create_engine(f'sqlite:///{path}', connect_args={"check_same_thread": False})
+        event.listen(self.engine, "connect", set_sqlite_pragmas)
+        instrument_engine(self.engine)
+        watch_engine(self.engine)
+        self.sessionmaker = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_engine: Optional[AsyncEngine] = None
+        self.async_sessionmaker: Optional[async_sessionmaker] = None
+
+    def ensure_async(self) -> None:
+        if self.async_engine is None:
+            self.async_engine = create_async_engine(f'sqlite+aiosqlite:///{self.path}')
+            event.listen(self.async_engine.sync_engine, "connect", set_sqlite_pragmas)
+            instrument_engine(self.async_engine.sync_engine)
+            watch_engine(self.async_engine.sync_engine)
+            self.async_sessionmaker = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+
+    def is_connected(self) -> bool:
+        pool = self.engine.pool
+        return pool.checkedin() + pool.checkedout() > 0
+
+    def is_idle(self) -> bool:
+        return self.engine.pool.checkedout() == 0
+
+    def release(self) -> None:
+        """Close pooled connections; the engine reconnects on next use"""
+        self.engine.dispose()
+
+    def close(self) -> None:
+        """Close every connection, the async engine's too, for good"""
+        self.engine.dispose()
+        if self.async_engine is not None:
+            # AsyncEngine.dispose() must be awaited; give it a loop of its own
+            thread = threading.Thread(target=asyncio.run, args=(self.async_engine.dispose(),))
+            thread.start()
+            thread.join()
+
+class EngineRegistry:
+    """One lazily created engine per database file.
+
+    Engine objects are cheap and stay cached, so sessions bound to them remain
+    valid. What is bounded is open connections: when more than max_open files
+    hold pooled connections, the least recently used idle ones are released.
+    """
+
+    def __init__(self, max_open: int = MAX_OPEN_ENGINES):
+        self.max_open = max_open
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _EngineEntry]" = OrderedDict()
+
+    def _entry(self, path: str) -> _EngineEntry:
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                entry = self._entries[path] = _EngineEntry(path)
+            self._entries.move_to_end(path)
+            self._release_idle()
+            return entry
+
+    def _release_idle(self) -> None:
+        connected = [e for e in self._entries.values() if e.is_connected()]
+        # Oldest first; never release the most recently used entry
+        for entry in connected[:-1]:
+            if len(connected) <= self.max_open:
+                break
+            if entry.is_idle():
+                entry.release()
+                connected.remove(entry)
+
+    def touch(self, path: str) -> None:
+        """Mark a database as recently used"""
+        self._entry(path)
+
+    def engine(self, path: str) -> Engine:
+        return self._entry(path).engine
+
+    def sessionmaker(self, path: str) -> sessionmaker:
+        return self._entry(path).sessionmaker
+
+    def _async_entry(self, path: str) -> _EngineEntry:
+        entry = self._entry(path)
+        with self._lock:
+            entry.ensure_async()
+        return entry
+
+    def async_engine(self, path: str) -> AsyncEngine:
+        return self._async_entry(path).async_engine
+
+    def async_sessionmaker(self, path: str) -> async_sessionmaker:
+        return self._async_entry(path).async_sessionmaker
+
+    def close(self, path: str) -> None:
+        """Drop a database's engines and close their connections, e.g. before deleting the file"""
+        with self._lock:
+            entry = self._entries.pop(os.path.abspath(path), None)
+        if entry is not None:
+            entry.close()
+
+    def open_paths(self) -> Dict[str, bool]:
+        """Map each known database file to whether it holds open connections"""
+        with self._lock:
+            return {path: entry.is_connected() for path, entry in self._entries.items()}
+
+engines = EngineRegistry()
+
+# Default SQLAlchemy engine
+engine = engines.engine(DATABASE_PATH)
+SessionLocal = engines.sessionmaker(DATABASE_PATH)
 
 # Create base class for models
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+def get_async_engine(path: str = DATABASE_PATH) -> AsyncEngine:
+    """Async engine over aiosqlite for async Gradio handlers, created on first use"""
+    return engines.async_engine(path)
+
+async def get_db(path: str = DATABASE_PATH) -> AsyncIterator[AsyncSession]:
+    """Session-per-request dependency: yields an AsyncSession closed after the request"""
+    async with engines.async_sessionmaker(path)() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
+
+# For handlers that are not wired through a dependency system:
+#     async with async_session() as db: ...
+async_session = asynccontextmanager(get_db)
@@ -0,0 +1,66 @@
+# bookwright/models/migrations.py
+from typing import Callable, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from .models import Character, Scene, Chapter, scene_chapter
+
+
+def _columns(conn: Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))]
+
+
+def _add_scene_chapter_position(conn: Connection) -> None:
+    if "position" in _columns(conn, "scene_chapter"):
+        return
+    conn.execute(text("ALTER TABLE scene_chapter ADD COLUMN position INTEGER"))
+    # Existing links keep the order they were stored in
+    conn.execute(text("UPDATE scene_chapter SET position = rowid"))
+
+
+def _add_character_aliases(conn: Connection) -> None:
+    if "aliases" not in _columns(conn, "characters"):
+        conn.execute(text("ALTER TABLE characters ADD COLUMN aliases TEXT"))
+
+
+def _add_character_age_gender(conn: Connection) -> None:
+    columns = _columns(conn, "characters")
+    if "age" not in columns:
+        conn.execute(text("ALTER TABLE characters ADD COLUMN age INTEGER"))
+    if "gender" not in columns:
+        conn.execute(text("ALTER TABLE characters ADD COLUMN gender VARCHAR(64)"))
+
+
+def _add_page_indexes(conn: Connection) -> None:
+    # create_all() only makes the indexes of tables it creates. Expression
+    # indexes can't be reflected, so look for them by name.
+    existing = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+    for table in (Character.__table__, Scene.__table__, Chapter.__table__, scene_chapter):
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+
+
+def _add_job_lease(conn: Connection) -> None:
+    columns = _columns(conn, "jobs")
+    if "owner" not in columns:
+        conn.execute(text("ALTER TABLE jobs ADD COLUMN owner VARCHAR(128)"))
+    if "heartbeat_at" not in columns:
+        conn.execute(text("ALTER TABLE jobs ADD COLUMN heartbeat_at DATETIME"))
+
+
+# Idempotent steps bringing databases created by older versions up to date.
+# create_all() makes missing tables but never alters existing ones.
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("scene_chapter.position", _add_scene_chapter_position),
+    ("characters.aliases", _add_character_aliases),
+    ("paged table indexes", _add_page_indexes),
+    ("characters.age/gender", _add_character_age_gender),
+    ("jobs.owner/heartbeat_at", _add_job_lease),
+]
+
+
+def ensure_schema(engine: Engine) -> None:
+    """Apply any missing migrations; run after Base.metadata.create_all"""
+    with engine.begin() as conn:
+        for _, migrate in MIGRATIONS:
+            migrate(conn)
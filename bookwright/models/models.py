@@ -1,8 +1,21 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table, LargeBinary, Index, Float, func, literal_column
+from sqlalchemy.orm import relationship, deferred
 from .base import Base
+from datetime import datetime
 import json
 
+
+def sort_key(column):
+    """Sort expression for a nullable text column; NULLs sort as "".
+
+    Shared by the page indexes below and the queries in utils/paging.py.
+    The empty string is rendered literally so the expression matches the
+    one in the table's index (SQLite won't use an expression index when a
+    bound parameter stands in for part of it).
+    """
+    return func.coalesce(column, literal_column("''"))
+
+
 # Association tables for many-to-many relationships
 character_scene = Table('character_scene', Base.metadata,
     Column('character_id', Integer, ForeignKey('characters.id')),
@@ -11,7 +24,9 @@ character_scene = Table('character_scene', Base.metadata,
 
 scene_chapter = Table('scene_chapter', Base.metadata,
     Column('scene_id', Integer, ForeignKey('scenes.id')),
-    Column('chapter_id', Integer, ForeignKey('chapters.id'))
+    Column('chapter_id', Integer, ForeignKey('chapters.id')),
+    Column('position', Integer),  # Order of the scene within the chapter
+    Index('ix_scene_chapter_chapter', 'chapter_id')
 )
 
 class Book(Base):
@@ -38,8 +53,19 @@ class Character(Base):
     relationships = Column(Text)
     skills = Column(Text)
     notes = Column(Text)
+    aliases = Column(Text)  # Other names the character goes by, comma-separated
+    age = Column(Integer)
+    gender = Column(String(64))
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Sort and filter columns of the paged characters table (see utils/paging.py),
+    # and each filter followed by each other sort
+    __table_args__ = (
+        Index('ix_characters_page_name', sort_key(name), id),
+        Index('ix_characters_page_role', sort_key(role), id),
+        Index('ix_characters_page_role_name', sort_key(role), sort_key(name), id),
+    )
+    
     # Relationships
     scenes = relationship("Scene", secondary=character_scene, back_populates="characters")
 
@@ -55,6 +81,21 @@ class Scene(Base):
     notes = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Sort and filter columns of the paged scenes table (see utils/paging.py),
+    # and each filter followed by each other sort
+    __table_args__ = (
+        Index('ix_scenes_page_title', sort_key(title), id),
+        Index('ix_scenes_page_location', sort_key(location), id),
+        Index('ix_scenes_page_day', sort_key(day), id),
+        Index('ix_scenes_page_time', sort_key(time), id),
+        Index('ix_scenes_page_location_title', sort_key(location), sort_key(title), id),
+        Index('ix_scenes_page_location_day', sort_key(location), sort_key(day), id),
+        Index('ix_scenes_page_location_time', sort_key(location), sort_key(time), id),
+        Index('ix_scenes_page_day_title', sort_key(day), sort_key(title), id),
+        Index('ix_scenes_page_day_location', sort_key(day), sort_key(location), id),
+        Index('ix_scenes_page_day_time', sort_key(day), sort_key(time), id),
+    )
+    
     # Relationships
     characters = relationship("Character", secondary=character_scene, back_populates="scenes")
     chapters = relationship("Chapter", secondary=scene_chapter, back_populates="scenes")
@@ -68,5 +109,118 @@ class Chapter(Base):
     notes = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Sort column of the paged chapters table (see utils/paging.py)
+    __table_args__ = (
+        Index('ix_chapters_page_title', sort_key(title), id),
+    )
+    
     # Relationships
-    scenes = relationship("Scene", secondary=scene_chapter, back_populates="chapters") 
\ No newline at end of file
+    scenes = relationship("Scene", secondary=scene_chapter, back_populates="chapters",
+                          order_by=scene_chapter.c.position)
+
+class Revision(Base):
+    __tablename__ = 'revisions'
+    
+    id = Column(Integer, primary_key=True)
+    entity_type = Column(String(32), nullable=False)
+    entity_key = Column(String(255), nullable=False)
+    seq = Column(Integer, nullable=False)  # Per-entity revision number
+    kind = Column(String(16), nullable=False)  # snapshot, delta or delete
+    payload = Column(LargeBinary)  # zlib-compressed JSON
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        Index('ix_revisions_entity_seq', 'entity_type', 'entity_key', 'seq'),
+    )
+
+class DraftChunk(Base):
+    __tablename__ = 'draft_chunks'
+    
+    id = Column(Integer, primary_key=True)
+    owner_type = Column(String(32), nullable=False)  # chapter or scene
+    owner_id = Column(Integer, nullable=False)
+    seq = Column(Integer, nullable=False)  # Chunk position within the draft
+    first_paragraph = Column(Integer, nullable=False)
+    paragraph_count = Column(Integer, nullable=False)
+    word_count = Column(Integer, nullable=False)
+    digest = Column(String(40), nullable=False)  # sha1 of the uncompressed text
+    # zlib-compressed paragraphs; deferred so metadata queries never load prose
+    payload = deferred(Column(LargeBinary, nullable=False))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_draft_chunks_owner_seq', 'owner_type', 'owner_id', 'seq'),
+    )
+
+class Mention(Base):
+    __tablename__ = 'mentions'
+    
+    id = Column(Integer, primary_key=True)
+    character_id = Column(Integer, nullable=False)
+    source_type = Column(String(32), nullable=False)  # character, scene or chapter
+    source_id = Column(Integer, nullable=False)
+    field = Column(String(64), nullable=False)  # Text field, or "draft"
+    paragraph = Column(Integer)  # Draft paragraph; None for other fields
+    start = Column(Integer, nullable=False)  # Offsets within the field or paragraph
+    end = Column(Integer, nullable=False)
+    matched = Column(String(255), nullable=False)  # Name or alias found
+    
+    __table_args__ = (
+        Index('ix_mentions_character', 'character_id'),
+        Index('ix_mentions_source', 'source_type', 'source_id', 'field'),
+    )
+
+class MentionSource(Base):
+    __tablename__ = 'mention_sources'
+    
+    # A scanned piece of text and the digest it had when scanned
+    source_type = Column(String(32), primary_key=True)
+    source_id = Column(Integer, primary_key=True)
+    field = Column(String(64), primary_key=True)
+    digest = Column(String(40), nullable=False)
+
+class MentionPattern(Base):
+    __tablename__ = 'mention_patterns'
+    
+    # The names a character was last scanned for, one per line
+    character_id = Column(Integer, primary_key=True)
+    names = Column(Text, nullable=False)
+
+class MinHashSignature(Base):
+    __tablename__ = 'minhash_signatures'
+    
+    id = Column(Integer, primary_key=True)
+    owner_type = Column(String(32), nullable=False)  # scene or chapter
+    owner_id = Column(Integer, nullable=False)
+    part = Column(String(16), nullable=False)  # outline, or draft for a draft chunk
+    seq = Column(Integer, nullable=False)  # Draft chunk position; 0 for outlines
+    digest = Column(String(40), nullable=False)  # Of the text the signature was computed from
+    shingle_count = Column(Integer, nullable=False)
+    signature = Column(LargeBinary, nullable=False)  # uint32 MinHash values
+    
+    __table_args__ = (
+        Index('ix_minhash_signatures_owner', 'owner_type', 'owner_id', 'part', 'seq'),
+    )
+
+class Job(Base):
+    __tablename__ = 'jobs'
+    
+    # A background job; see utils/job_queue.py
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(64), nullable=False)
+    params = Column(Text)  # JSON
+    status = Column(String(16), nullable=False, default="queued")  # queued, running, done, failed or cancelled
+    progress = Column(Float, nullable=False, default=0.0)  # 0 to 1
+    message = Column(Text)  # Latest progress message
+    result = Column(Text)  # JSON
+    error = Column(Text)
+    cancel_requested = Column(Integer, nullable=False, default=0)
+    owner = Column(String(128))  # The queue running it, while running
+    heartbeat_at = Column(DateTime)  # Renewed by the owner; a stale one means the owner is gone
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index('ix_jobs_status', 'status', 'id'),
+    )
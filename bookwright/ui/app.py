@@ -52,13 +52,38 @@
 
 # if __name__ == '__main__':
 
-import gradio as gr
+from bookwright.utils.startup import startup
+import argparse
+import itertools
+import json
 import os, signal
-from bookwright.ui.scenes_manager import ScenesManager
-from bookwright.ui.characters_manager import CharactersManager
-from bookwright.ui.chapters_manager import ChaptersManager
-from bookwright.utils.database_manager import DatabaseManager
 from datetime import datetime
+with startup.phase("gradio"):
+    import gradio as gr
+# Heavy, rarely used dependencies (langgraph, requests, scipy) are imported
+# by the code that needs them, on first use
+with startup.phase("modules"):
+    from bookwright.ui.scenes_manager import ScenesManager
+    from bookwright.ui.characters_manager import CharactersManager
+    from bookwright.ui.chapters_manager import ChaptersManager
+    from bookwright.utils.database_manager import DatabaseManager, get_story_database, projects
+    from bookwright.utils.async_database import AsyncStoryDatabase
+    from bookwright.core.manuscript import FORMATS, compile_manuscript
+    from bookwright.core.jobs import JOB_KINDS, get_job_queue
+    from bookwright.ui.concurrency import queue_group, DB_WRITES, EXPORTS, DEFAULT_CONCURRENCY, MAX_QUEUE_SIZE
+    from bookwright.ui.stats import stats_tab, instrument_events
+    from bookwright.utils.metrics import serve_metrics
+    from sqlalchemy.exc import SQLAlchemyError
+
+# Records of an export shown in the Database Viewer
+EXPORT_PREVIEW_LINES = 20
+
+# Jobs listed in the Jobs tab, and how often it refreshes while any are active
+JOBS_SHOWN = 50
+JOBS_REFRESH_SECONDS = 1.0
+
+# Port of the Prometheus metrics endpoint served beside the app; 0 turns it off
+METRICS_PORT = int(os.environ.get("BOOKWRIGHT_METRICS_PORT", "9464"))
 
 def welcome_area():
     return """
@@ -77,9 +102,8 @@ Enjoy creative writing powered by AI and structured workflow!
 """
 
 def characters_interface():
-    characters_manager = CharactersManager()
     scenes_manager = ScenesManager()
-    characters_manager.set_scenes(scenes_manager.scenes)
+    characters_manager = CharactersManager(scenes_manager, scenes_manager.db)
     return characters_manager.create_characters_interface()
 
 def chapters_interface():
@@ -125,7 +149,7 @@ def load_book_meta():
     return title, author, genre, setting, description, plot_summary, plot_points_text
 
 # &#x2014; Define UI &#x2014;
-def book_info_tab():
+def book_info_tab(async_db: AsyncStoryDatabase):
     """Create the Book Info tab interface"""
     with gr.TabItem("Book Info"):
         gr.Markdown("### Book Information")
@@ -146,19 +170,23 @@ def book_info_tab():
         book_status = gr.Markdown("Status: _No book info saved yet_")
 
         # When clicking save
-        def save_info(title, author, genre, summary, notes):
-            database_manager.db.save_book_info(title, author, genre, summary, notes)
+        # Async handlers run on the event loop instead of a worker thread
+        async def save_info(title, author, genre, summary, notes):
+            async with async_db.session() as db:
+                await async_db.save_book_info(db, title, author, genre, summary, notes)
             return f"Saved book info: {title} by {author}"
         
         save_book_info.click(
             fn=save_info,
             inputs=[book_title, book_author, book_genre, book_summary, book_notes],
-            outputs=book_status
+            outputs=book_status,
+            **queue_group(DB_WRITES)
         )
         
         # When clicking load
-        def load_info():
-            book_info = database_manager.db.get_book_info()
+        async def load_info():
+            async with async_db.session() as db:
+                book_info = await async_db.get_book_info(db)
             if book_info:
                 return (
                     book_info["title"],
@@ -185,97 +213,282 @@ def book_info_tab():
             outputs=[book_title, book_author, book_genre, book_summary, book_notes]
         )
 
-def quit_app():
+def jobs_tab(story_db):
+    """Create the Jobs tab: start background jobs and follow their progress"""
+    queue = get_job_queue(story_db)
+    with gr.TabItem("Jobs") as tab:
+        gr.Markdown("### Background Jobs")
+        gr.Markdown("Jobs run in the background and carry on after a restart; this page follows them live.")
+        with gr.Row():
+            job_kind = gr.Dropdown(label="Job", choices=[(label, kind) for kind, label in JOB_KINDS.items()],
+                                   value="draft_scenes")
+            job_format = gr.Dropdown(label="Manuscript Format", choices=list(FORMATS), value="markdown")
+            job_scenes = gr.Textbox(label="Scenes to Draft (comma separated, empty for all undrafted)")
+        start_button = gr.Button("Start Job")
+        jobs_list = gr.Dataframe(
+            headers=["ID", "Job", "Status", "Progress %", "Message", "Started", "Finished"],
+            datatype=["number", "str", "str", "number", "str", "str", "str"],
+            col_count=(7, "fixed"),
+            interactive=False
+        )
+        with gr.Row():
+            job_id = gr.Number(label="Job ID", precision=0)
+            cancel_button = gr.Button("Cancel Job")
+            result_button = gr.Button("Show Result")
+        job_status = gr.Markdown("")
+        job_result = gr.JSON(label="Result")
+        job_file = gr.File(label="Result File")
+        # Ticks only while jobs are queued or running
+        timer = gr.Timer(JOBS_REFRESH_SECONDS, active=False)
+        
+        def list_jobs():
+            def when(value):
+                return value.strftime("%Y-%m-%d %H:%M:%S") if value else ""
+            rows = [[j["id"], JOB_KINDS.get(j["kind"], j["kind"]), j["status"], round(100 * j["progress"]),
+                     j["error"] or j["message"] or "", when(j["started_at"]), when(j["finished_at"])]
+                    for j in queue.list(JOBS_SHOWN)]
+            return rows, gr.Timer(active=queue.active() > 0)
+        
+        def start_job(kind, fmt, scenes):
+            if kind == "compile_manuscript":
+                new_id = queue.submit(kind, fmt=fmt)
+            elif kind == "draft_scenes":
+                titles = [t.strip() for t in (scenes or "").split(",") if t.strip()]
+                new_id = queue.submit(kind, titles=titles or None)
+            else:
+                new_id = queue.submit(kind)
+            return f"Started job {new_id}: {JOB_KINDS[kind]}", new_id
+        
+        def cancel_job(selected):
+            if not selected:
+                return "No job selected"
+            if queue.cancel(int(selected)):
+                return f"Cancelling job {int(selected)}"
+            return f"Job {int(selected)} has already finished"
+        
+        def show_result(selected):
+            job = queue.get(int(selected)) if selected else None
+            if job is None:
+                return "No such job", None, None
+            result = job["result"]
+            path = result.get("path") if isinstance(result, dict) else None
+            status = f"Job {job['id']} {job['status']}" + (f": {job['error']}" if job["error"] else "")
+            return status, result, path if path and os.path.exists(path) else None
+        
+        start_button.click(
+            fn=start_job,
+            inputs=[job_kind, job_format, job_scenes],
+            outputs=[job_status, job_id]
+        ).then(fn=list_jobs, inputs=[], outputs=[jobs_list, timer])
+        cancel_button.click(fn=cancel_job, inputs=[job_id], outputs=[job_status]).then(
+            fn=list_jobs, inputs=[], outputs=[jobs_list, timer])
+        result_button.click(fn=show_result, inputs=[job_id], outputs=[job_status, job_result, job_file])
+        def select_job(evt: gr.SelectData):
+            return evt.row_value[0]
+        
+        jobs_list.select(fn=select_job, inputs=None, outputs=job_id)
+        timer.tick(fn=list_jobs, inputs=[], outputs=[jobs_list, timer])
+        tab.select(fn=list_jobs, inputs=[], outputs=[jobs_list, timer])
+
+def quit_app(story_db):
     """Function to quit the application"""
+    story_db.flush()  # Don't lose grouped writes on exit
     os.kill(os.getpid(), signal.SIGINT)
     return "🚪 Exiting BookWright AI..."
 
-def create_interface():
-    global database_manager
-    scenes_manager = ScenesManager()
-    characters_manager = CharactersManager(scenes_manager)
-    chapters_manager = ChaptersManager(scenes_manager)
-    database_manager = DatabaseManager(scenes_manager, characters_manager, chapters_manager)
-    
-    # Load initial data from database
-    scenes_manager.scenes = database_manager.db.get_scenes()
-    characters_manager.characters = database_manager.db.get_characters()
-    chapters_manager.chapters = database_manager.db.get_chapters()
+def create_interface(book_id: str = None, metrics_url: str = None):
+    # The managers hold only shared, feed-maintained data; what differs per
+    # browser session (table position, selection, chat, scene details)
+    # lives in gr.State and the components themselves
+    with startup.phase("database"):
+        story_db = get_story_database(book_id)
+    # The managers share one StoryDatabase and LLM client, load their data
+    # when their tab is first opened and then follow the change feed
+    scenes_manager = ScenesManager(story_db)
+    characters_manager = CharactersManager(scenes_manager, story_db)
+    chapters_manager = ChaptersManager(scenes_manager, story_db)
+    database_manager = DatabaseManager(scenes_manager, characters_manager, chapters_manager, story_db)
     
-    with gr.Blocks(title="BookWright AI") as interface:
+    with startup.phase("interface"), gr.Blocks(title="BookWright AI") as interface:
         gr.Markdown("# 📚 BookWright AI - Writing Assistant")
         
         with gr.Tabs():
             with gr.TabItem("Home"):
                 gr.Markdown("Welcome to BookWright AI!")
             
-            with gr.TabItem("Characters"):
+            with gr.TabItem("Characters") as characters_tab:
                 characters_manager.create_characters_interface()
             
-            with gr.TabItem("Scenes"):
+            with gr.TabItem("Scenes") as scenes_tab:
                 scenes_manager.create_scene_interface()
             
-            with gr.TabItem("Chapters"):
+            with gr.TabItem("Chapters") as chapters_tab:
                 chapters_manager.create_chapters_interface()
             
+            # Tabs re-read the page of their table each session is on when
+            # opened, so edits made in another tab show up
+            for tab, manager in [(characters_tab, characters_manager),
+                                 (scenes_tab, scenes_manager),
+                                 (chapters_tab, chapters_manager)]:
+                tab.select(fn=manager.refresh_view, inputs=manager.view_inputs, outputs=manager.view_components)
+            
             with gr.TabItem("Story Generator"):
                 gr.Markdown("Generate stories here...")
             
-            with gr.TabItem("Database Viewer"):
+            with gr.TabItem("Database Viewer") as database_tab:
                 gr.Markdown("### Database Operations")
                 
-                # Export Section
+                # Export Section: streamed to a file, never held as one string
                 gr.Markdown("#### Export Data")
-                export_status = gr.Markdown("Click the button below to export all data as JSON")
+                export_status = gr.Markdown("Click the button below to export all data as JSON Lines")
                 export_button = gr.Button("Export Data")
-                json_output = gr.TextArea(label="JSON Data", lines=10, interactive=False)
+                download_file = gr.File(label="Download File")
+                json_preview = gr.TextArea(label=f"Preview (first {EXPORT_PREVIEW_LINES} records)", lines=10, interactive=False)
                 
                 def export_data():
-                    json_data = database_manager.export_to_json()
-                    return "Data exported successfully!", json_data
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    filename = f"bookwright_export_{timestamp}.jsonl"
+                    counts = database_manager.export_to_file(filename)
+                    with open(filename, "r", encoding="utf-8") as f:
+                        preview = "".join(itertools.islice(f, EXPORT_PREVIEW_LINES))
+                    summary = ", ".join(f"{count} {kind}" for kind, count in counts.items())
+                    return f"Exported {summary} to {filename}", filename, preview
                 
                 export_button.click(
                     fn=export_data,
                     inputs=[],
-                    outputs=[export_status, json_output]
+                    outputs=[export_status, download_file, json_preview],
+                    **queue_group(EXPORTS)
                 )
                 
-                # Download Section
-                gr.Markdown("#### Download Data")
-                download_button = gr.Button("Download JSON File")
-                download_status = gr.Markdown("")
-                download_file = gr.File(label="Download File")
+                # Import Section
+                gr.Markdown("#### Import Data")
+                import_file = gr.File(label="BookWright export (.jsonl or .jsonl.gz)", type="filepath")
+                import_button = gr.Button("Import File")
+                import_status = gr.Markdown("")
                 
-                def download_data():
-                    json_data = database_manager.export_to_json()
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"bookwright_export_{timestamp}.json"
-                    
-                    # Create a temporary file
-                    with open(filename, "w") as f:
-                        f.write(json_data)
-                    
-                    return f"File saved as {filename}", filename
+                def import_data(path):
+                    if not path:
+                        return "No file selected"
+                    try:
+                        counts = database_manager.import_from_file(path)
+                    except (ValueError, KeyError, OSError, EOFError, json.JSONDecodeError, SQLAlchemyError) as e:
+                        # Batches before the failing one stay imported
+                        return f"Import failed ({type(e).__name__}): {e}"
+                    summary = ", ".join(f"{count} {kind}" for kind, count in counts.items())
+                    return f"Imported {summary}"
                 
-                download_button.click(
-                    fn=download_data,
-                    inputs=[],
-                    outputs=[download_status, download_file]
+                import_button.click(
+                    fn=import_data,
+                    inputs=[import_file],
+                    outputs=[import_status],
+                    **queue_group(EXPORTS)
+                )
+                
+                # Manuscript Section
+                gr.Markdown("#### Compile Manuscript")
+                manuscript_format = gr.Dropdown(label="Format", choices=list(FORMATS), value="markdown")
+                compile_button = gr.Button("Compile Manuscript")
+                manuscript_status = gr.Markdown("")
+                manuscript_file = gr.File(label="Manuscript")
+                
+                def compile_book(fmt):
+                    build = compile_manuscript(database_manager.db, fmt)
+                    return (f"Built {build['chapters']} chapters in {build['seconds']}s "
+                            f"({build['rendered']} rendered, {build['cached']} from cache)"), build["path"]
+                
+                compile_button.click(
+                    fn=compile_book,
+                    inputs=[manuscript_format],
+                    outputs=[manuscript_status, manuscript_file],
+                    **queue_group(EXPORTS)
+                )
+                
+                # Snapshots Section
+                gr.Markdown("#### Snapshots")
+                with gr.Row():
+                    snapshot_label = gr.Textbox(label="Label", placeholder="e.g. before batch generation")
+                    snapshot_compress = gr.Checkbox(label="Compress", value=False)
+                snapshot_button = gr.Button("Take Snapshot")
+                snapshot_list = gr.Dropdown(label="Snapshots", choices=[])
+                restore_button = gr.Button("Restore Selected Snapshot")
+                snapshot_status = gr.Markdown("")
+                
+                def snapshot_choices():
+                    return [(s["name"], s["path"]) for s in database_manager.list_snapshots()]
+                
+                def take_snapshot(label, compress):
+                    path = database_manager.create_snapshot(label or None, compress)
+                    return f"Snapshot saved to {path}", gr.update(choices=snapshot_choices(), value=path)
+                
+                def restore_selected(path):
+                    if not path:
+                        return "No snapshot selected", gr.update()
+                    try:
+                        backup_path = database_manager.restore_snapshot(path)
+                    except ValueError as e:
+                        return f"Restore failed: {e}", gr.update()
+                    return (f"Restored {os.path.basename(path)}; previous state saved to {backup_path}",
+                            gr.update(choices=snapshot_choices()))
+                
+                snapshot_button.click(
+                    fn=take_snapshot,
+                    inputs=[snapshot_label, snapshot_compress],
+                    outputs=[snapshot_status, snapshot_list],
+                    **queue_group(EXPORTS)
                 )
+                restore_button.click(
+                    fn=restore_selected,
+                    inputs=[snapshot_list],
+                    outputs=[snapshot_status, snapshot_list],
+                    **queue_group(EXPORTS)
+                )
+                database_tab.select(fn=lambda: gr.update(choices=snapshot_choices()), inputs=[], outputs=snapshot_list)
             
             with gr.TabItem("Settings"):
                 gr.Markdown("Configure your settings here.")
                 quit_button = gr.Button("❌ Quit Application")
                 status = gr.Markdown("")
-                quit_button.click(fn=quit_app, inputs=[], outputs=status)
+                quit_button.click(fn=lambda: quit_app(story_db), inputs=[], outputs=status)
             
             # Add the Book Info tab
-            book_info_tab()
+            book_info_tab(AsyncStoryDatabase(story_db))
+            
+            jobs_tab(story_db)
+            
+            stats_tab(metrics_url)
     
+    # Every handler's latency is recorded (see the Stats tab and /metrics)
+    instrument_events(interface)
+    # Saves, LLM calls and exports each have their own concurrency group (see concurrency.py)
+    interface.queue(default_concurrency_limit=DEFAULT_CONCURRENCY, max_size=MAX_QUEUE_SIZE)
     return interface
 
 def main():
-    interface = create_interface()
+    parser = argparse.ArgumentParser(prog="bookwright", description="BookWright AI writing assistant")
+    parser.add_argument("--book", help="id of the book to open (default: BOOKWRIGHT_HOME/bookwright.db)")
+    parser.add_argument("--new-book", metavar="TITLE", help="register a new book with its own database and open it")
+    parser.add_argument("--list-books", action="store_true", help="list registered books and exit")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help=f"port of the Prometheus metrics endpoint, 0 to disable (default: {METRICS_PORT})")
+    args = parser.parse_args()
+    
+    if args.list_books:
+        for book in projects.list_books():
+            print(f"{book['id']}\t{book['title']}\t{book['path']}")
+        return
+    book_id = projects.create_book(args.new_book) if args.new_book else args.book
+    
+    metrics_url = None
+    if args.metrics_port:
+        try:
+            server = serve_metrics(args.metrics_port)
+            metrics_url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        except OSError as e:
+            print(f"Metrics endpoint not started: {e}")
+    
+    interface = create_interface(book_id, metrics_url)
+    print(startup.report())
     interface.launch()
 
 if __name__ == "__main__":
@@ -0,0 +1,87 @@
+import gradio as gr
+from datetime import datetime
+from typing import Callable, Dict
+from bookwright.ui.concurrency import queue_group, DB_WRITES
+
+# Quiet time after the last edit before the form is sent
+AUTOSAVE_SECONDS = 2.0
+
+# Debounce in the browser: each edit restarts a timer, and only the timer
+# that runs out sets a new flush mark. A superseded edit returns the mark
+# unchanged, so nothing reaches the server while the user is typing or idle.
+_DEBOUNCE_JS = """(mark) => new Promise((resolve) => {
+    const pending = window.bookwrightAutosave = window.bookwrightAutosave || {};
+    const previous = pending["%(name)s"];
+    if (previous) {
+        clearTimeout(previous.timer);
+        previous.resolve(mark);
+    }
+    pending["%(name)s"] = {resolve, timer: setTimeout(() => {
+        delete pending["%(name)s"];
+        resolve(Date.now());
+    }, %(delay)d)};
+})"""
+
+class Autosave:
+    """Debounced autosave of an entity form.
+
+    Edits are debounced in the browser; after a quiet interval a hidden
+    mark changes and the form is sent once. It is compared with what was
+    last loaded or saved in this session, and only the changed fields are
+    saved. The database skips rows whose values are unchanged as well.
+
+    Only an entity that was loaded or saved is autosaved, only while its
+    key field is unchanged, and only while it still exists: new, renamed
+    and deleted entities need Save.
+    """
+
+    def __init__(self, fields: Dict[str, gr.components.Component], key: str,
+                 save: Callable[[str, Dict], bool], status: gr.components.Component,
+                 interval: float = AUTOSAVE_SECONDS):
+        self.fields = fields  # Record field -> form component
+        self.key = key  # Field naming the entity
+        self.save = save  # save(key value, changed fields) -> whether anything was written
+        self.status = status
+        self.interval = interval
+
+    def render(self) -> None:
+        """Create the hidden components and wire the form; call inside a Blocks context"""
+        self.flush_mark = gr.Number(value=0, visible="hidden")  # Set in the browser once edits pause
+        self.baseline = gr.State({})  # Field values as last loaded or saved
+        debounce = _DEBOUNCE_JS % {"name": f"{self.key}-{id(self)}", "delay": self.interval * 1000}
+
+        for component in self.fields.values():
+            # Every edit must restart the timer, so don't drop edits while one waits
+            component.input(fn=None, inputs=[self.flush_mark], outputs=[self.flush_mark], js=debounce,
+                            show_progress="hidden", trigger_mode="multiple")
+        self.flush_mark.change(fn=self.flush, inputs=[self.baseline, *self.fields.values()],
+                               outputs=[self.status, self.baseline], show_progress="hidden",
+                               **queue_group(DB_WRITES))
+
+    def flush(self, baseline: Dict, *values) -> tuple:
+        current = dict(zip(self.fields, values))
+        key = current[self.key]
+        if not baseline or not key or key != baseline.get(self.key):
+            return f"Unsaved changes to {key or 'a new entry'}: press Save to keep them", baseline
+        changes = {field: value for field, value in current.items()
+                   if field != self.key and value != baseline.get(field)}
+        if not changes:
+            return gr.skip(), current
+        try:
+            written = self.save(key, changes)
+        except ValueError:
+            # Deleted elsewhere since it was loaded
+            return f"{key} no longer exists: press Save to create it again", baseline
+        if not written:
+            return gr.skip(), current
+        return f"Autosaved {key} ({', '.join(changes)}) at {datetime.now().strftime('%H:%M:%S')}", current
+
+    def snapshot(self, *values) -> Dict:
+        """The form as a new baseline; an empty key clears it"""
+        current = dict(zip(self.fields, values))
+        return current if current[self.key] else {}
+
+    def reset_after(self, event):
+        """Chain taking the form as the baseline onto an event that loads, saves or clears it"""
+        return event.then(fn=self.snapshot, inputs=list(self.fields.values()), outputs=[self.baseline],
+                          show_progress="hidden")
@@ -1,14 +1,35 @@
 import gradio as gr
 from typing import List, Dict, Optional
-from bookwright.core.llm_interface import OllamaClient
-from bookwright.utils.database_manager import DatabaseManager
+from bookwright.core.llm_interface import get_llm_client
+from bookwright.utils.database_manager import StoryDatabase, get_story_database
+from bookwright.ui.paged_table import PagedTable
+from bookwright.ui.concurrency import queue_group, LLM, DB_WRITES
+from bookwright.ui.autosave import Autosave
+from bookwright.utils.tracing import tracer
+
+# Paragraphs of a draft shown, and decompressed, at a time
+DRAFT_PAGE_SIZE = 20
 
 class ChaptersManager:
-    def __init__(self, scenes_manager):
-        self.chapters: List[Dict] = []
+    def __init__(self, scenes_manager, db: Optional[StoryDatabase] = None):
         self.scenes_manager = scenes_manager
-        self.llm = OllamaClient(model='deepseek')
-        self.db = DatabaseManager(None, None, None).db  # Temporary until we can pass the manager
+        self.llm = get_llm_client('deepseek')
+        self.db = db or get_story_database()
+        # Kept current by the change feed
+        self._chapters = self.db.mirror("chapter")
+        self.table = PagedTable(
+            self.db, "chapter",
+            columns={"Title": "title", "Scene Count": "scene_count"},
+            sorts={"Title": "title"},
+            datatype=["str", "number"]
+        )
+        self.view_inputs: List[gr.components.Component] = []
+        self.view_components: List[gr.components.Component] = []
+    
+    @property
+    def chapters(self) -> List[Dict]:
+        """Current chapters as read-only records"""
+        return self._chapters.records()
         
     def create_chapters_interface(self) -> gr.Blocks:
         """Create and return the Gradio interface for chapters management"""
@@ -28,10 +49,27 @@ class ChaptersManager:
                     
                     chapter_status = gr.Markdown("Status: _No chapter saved yet_")
                     
+                    # Edits to a loaded chapter are saved as they are made
+                    form = {"title": chapter_title, "description": chapter_description, "notes": chapter_notes}
+                    autosave = Autosave(form, "title", self.autosave_chapter, chapter_status)
+                    autosave.render()
+                    form_fields = list(form.values())
+                    
+                    # Draft prose, opened one page at a time
+                    with gr.Accordion("Chapter Draft", open=False):
+                        draft_info = gr.Markdown("_No draft loaded_")
+                        draft_text = gr.TextArea(label="Draft (one page)", lines=15)
+                        draft_start = gr.State(0)
+                        draft_count = gr.State(0)
+                        with gr.Row():
+                            prev_page_button = gr.Button("Previous Page")
+                            next_page_button = gr.Button("Next Page")
+                            save_draft_button = gr.Button("Save Page")
+                    
                     # Scene Assignment
                     gr.Markdown("### Assign Scenes to Chapter")
                     available_scenes = gr.Dropdown(
-                        choices=self.get_available_scenes(),
+                        choices=[],  # Filled when the tab is opened
                         label="Available Scenes",
                         multiselect=True
                     )
@@ -39,11 +77,7 @@ class ChaptersManager:
                     
                 with gr.Column(scale=1):
                     # Chapters List
-                    chapters_list = gr.Dataframe(
-                        headers=["Title", "Scene Count"],
-                        datatype=["str", "number"],
-                        col_count=(2, "fixed")
-                    )
+                    self.table.render()
                     
                     with gr.Row():
                         load_chapter_button = gr.Button("Load Selected Chapter")
@@ -54,13 +88,29 @@ class ChaptersManager:
                     chapter_scenes = gr.Dataframe(
                         headers=["Scene Title", "Location", "Day", "Time"],
                         datatype=["str", "str", "str", "str"],
-                        col_count=(4, "fixed")
+                        col_count=(4, "fixed"),
+                        type="array"
                     )
                     
                     with gr.Row():
                         remove_scene_button = gr.Button("Remove Selected Scene")
                         reorder_scenes_button = gr.Button("Reorder Scenes")
             
+            # Text Statistics
+            with gr.Accordion("Text Statistics", open=False):
+                stats_button = gr.Button("Analyze Drafts")
+                stats_summary = gr.Markdown("")
+                chapter_stats = gr.Dataframe(
+                    headers=["Chapter", "Words", "Sentences", "Dialogue %", "Reading Ease", "Grade Level"],
+                    datatype=["str", "number", "number", "number", "number", "number"],
+                    col_count=(6, "fixed")
+                )
+                dialogue_share = gr.Dataframe(
+                    headers=["Character", "Dialogue Words", "Share %"],
+                    datatype=["str", "number", "number"],
+                    col_count=(3, "fixed")
+                )
+            
             # Chat Interface for Chapter Development
             with gr.Group():
                 gr.Markdown("### Chapter Development Chat")
@@ -68,92 +118,139 @@ class ChaptersManager:
                 msg = gr.Textbox(label="Ask about chapter development", placeholder="Type your message here...")
                 clear_chat = gr.Button("Clear Chat")
                 
-                def respond(message, chat_history):
+                # The form is passed in, so each session's chat sees its own chapter
+                def respond(message, chat_history, title, description, notes, scenes):
                     if not message:
                         return "", chat_history
                         
-                    # Build context from current chapter and scenes
-                    context = ""
-                    if chapter_title.value:
-                        context += f"Current Chapter: {chapter_title.value}\n"
-                        context += f"Description: {chapter_description.value}\n"
-                        context += f"Notes: {chapter_notes.value}\n\n"
-                        
-                        # Add assigned scenes context
-                        if chapter_scenes.value:
-                            context += "Assigned Scenes:\n"
-                            for scene in chapter_scenes.value:
-                                context += f"- {scene[0]}: {scene[1]}\n"
-                    
-                    # Add all chapters as context
-                    if self.chapters:
-                        context += "\nAll Chapters:\n"
-                        for chapter in self.chapters:
-                            context += f"- {chapter['title']}: {chapter['description']}\n"
-                    
-                    # Build prompt with context
-                    prompt = f"""You are a helpful writing assistant. Use the following context to help answer questions about chapter development:
+                    with tracer.span("chat.chapter", message_chars=len(message), history=len(chat_history or [])) as span:
+                        with tracer.span("build_context") as stage:
+                            # Build context from current chapter and scenes
+                            context = ""
+                            if title:
+                                context += f"Current Chapter: {title}\n"
+                                context += f"Description: {description}\n"
+                                context += f"Notes: {notes}\n\n"
+
+                                # Add assigned scenes context
+                                if scenes:
+                                    context += "Assigned Scenes:\n"
+                                    for scene in scenes:
+                                        context += f"- {scene[0]}: {scene[1]}\n"
+
+                            # Add all chapters as context
+                            if self.chapters:
+                                context += "\nAll Chapters:\n"
+                                for chapter in self.chapters:
+                                    context += f"- {chapter['title']}: {chapter['description']}\n"
+
+                            stage.set(context_chars=len(context))
+
+                        with tracer.span("render_prompt") as stage:
+                            # Build prompt with context
+                            prompt = f"""You are a helpful writing assistant. Use the following context to help answer questions about chapter development:
 
 {context}
 
 User: {message}
 Assistant: """
-                    
-                    # Get response from Ollama
-                    response = self.llm.generate(prompt)
-                    
-                    chat_history.append((message, response))
-                    return "", chat_history
+
+                            stage.set(prompt_chars=len(prompt))
+
+                        # Get response from Ollama
+                        response = self.llm.generate(prompt)
+
+                        chat_history.append((message, response))
+                        span.set(response_chars=len(response))
+                        return "", chat_history
                 
-                msg.submit(respond, [msg, chatbot], [msg, chatbot])
+                msg.submit(respond, [msg, chatbot, chapter_title, chapter_description, chapter_notes, chapter_scenes],
+                           [msg, chatbot], **queue_group(LLM))
                 clear_chat.click(lambda: [], None, chatbot)
             
             # Connect buttons to functions
-            save_chapter_button.click(
+            save_event = save_chapter_button.click(
                 fn=self.save_chapter,
-                inputs=[chapter_title, chapter_description, chapter_notes],
-                outputs=[chapter_status, chapters_list]
+                inputs=form_fields,
+                outputs=[chapter_status],
+                **queue_group(DB_WRITES)
             )
+            self.table.reload_after(save_event)
+            autosave.reset_after(save_event)
             
-            clear_chapter_button.click(
+            autosave.reset_after(clear_chapter_button.click(
                 fn=self.clear_form,
                 inputs=[],
-                outputs=[chapter_title, chapter_description, chapter_notes]
-            )
+                outputs=form_fields + [chapter_scenes]
+            ))
             
-            load_chapter_button.click(
+            load_event = load_chapter_button.click(
                 fn=self.load_chapter,
-                inputs=[chapters_list],
-                outputs=[chapter_title, chapter_description, chapter_notes, chapter_scenes]
+                inputs=[self.table.selected],
+                outputs=form_fields + [chapter_scenes]
+            )
+            autosave.reset_after(load_event)
+            load_event.then(
+                fn=self.open_draft_page,
+                inputs=[chapter_title],
+                outputs=[draft_info, draft_text, draft_start, draft_count]
             )
             
-            delete_chapter_button.click(
-                fn=self.delete_chapter,
-                inputs=[chapters_list],
-                outputs=[chapter_status, chapters_list, chapter_scenes]
+            draft_outputs = [draft_info, draft_text, draft_start, draft_count]
+            prev_page_button.click(
+                fn=lambda title, start: self.open_draft_page(title, max(0, start - DRAFT_PAGE_SIZE)),
+                inputs=[chapter_title, draft_start],
+                outputs=draft_outputs
+            )
+            next_page_button.click(
+                fn=lambda title, start, count: self.open_draft_page(title, start + count if count else start),
+                inputs=[chapter_title, draft_start, draft_count],
+                outputs=draft_outputs
             )
+            save_draft_button.click(
+                fn=self.save_draft_page,
+                inputs=[chapter_title, draft_start, draft_count, draft_text],
+                outputs=draft_outputs,
+                **queue_group(DB_WRITES)
+            )
+            
+            self.table.reload_after(delete_chapter_button.click(
+                fn=self.delete_chapter,
+                inputs=[self.table.selected],
+                outputs=[chapter_status, chapter_scenes],
+                **queue_group(DB_WRITES)
+            ))
             
-            assign_scenes_button.click(
+            self.table.reload_after(assign_scenes_button.click(
                 fn=self.assign_scenes,
                 inputs=[chapter_title, available_scenes],
-                outputs=[chapter_status, chapter_scenes]
-            )
+                outputs=[chapter_status, chapter_scenes],
+                **queue_group(DB_WRITES)
+            ))
             
-            remove_scene_button.click(
+            self.table.reload_after(remove_scene_button.click(
                 fn=self.remove_scene,
-                inputs=[chapters_list, chapter_scenes],
-                outputs=[chapter_status, chapter_scenes]
-            )
+                inputs=[chapter_title, chapter_scenes],
+                outputs=[chapter_status, chapter_scenes],
+                **queue_group(DB_WRITES)
+            ))
             
             reorder_scenes_button.click(
                 fn=self.reorder_scenes,
-                inputs=[chapters_list, chapter_scenes],
-                outputs=[chapter_status, chapter_scenes]
+                inputs=[chapter_title, chapter_scenes],
+                outputs=[chapter_status, chapter_scenes],
+                **queue_group(DB_WRITES)
             )
             
-            # Initialize lists
-            chapters_list.value = self.get_chapters_list()
-            available_scenes.choices = self.get_available_scenes()
+            stats_button.click(
+                fn=self.analyze_drafts,
+                inputs=[],
+                outputs=[stats_summary, chapter_stats, dialogue_share]
+            )
+            
+            # The table and scene choices are filled when the tab is first opened (see refresh_view)
+            self.view_inputs = self.table.refresh_inputs
+            self.view_components = self.table.refresh_outputs + [available_scenes]
             
         return chapters_interface
     
@@ -161,21 +258,32 @@ Assistant: """
         """Get list of all available scenes"""
         return [scene["title"] for scene in self.scenes_manager.scenes]
     
+    def refresh_view(self, *table_state) -> tuple:
+        """Re-read the table page the session is on and the scene choices"""
+        return (*self.table.refresh(*table_state), gr.update(choices=self.get_available_scenes()))
+    
     def save_chapter(self, title: str, description: str, notes: str) -> str:
         """Save a chapter to the database"""
+        if not title:
+            return "A chapter needs a title"
+        # Scenes are assigned separately; leaving them out keeps existing assignments
         chapter = {
             "title": title,
             "description": description,
-            "notes": notes,
-            "scenes": []  # Scenes will be added separately
+            "notes": notes
         }
-        self.db.save_chapter(chapter)
-        self.chapters = self.db.get_chapters()  # Refresh the chapters list
-        return f"Saved chapter: {title}"
+        with self.db.session() as db:
+            written = self.db.save_chapter(db, chapter)
+        self.db.wait_for_commit()  # Committed with its group before the form says it was saved
+        return f"Saved chapter: {title}" if written else f"No changes to save: {title}"
     
-    def get_chapters_list(self) -> List[List]:
-        """Return a list of chapters in the format expected by the Dataframe"""
-        return [[c["title"], len(c["scenes"])] for c in self.chapters]
+    def autosave_chapter(self, title: str, changes: Dict) -> bool:
+        """Save only the edited fields of a loaded chapter"""
+        with self.db.session() as db:
+            # Update only: a chapter deleted by another session is not re-created
+            written = self.db.save_chapter(db, {"title": title, **changes}, create=False)
+        self.db.wait_for_commit()
+        return written
     
     def load_chapter(self, selected_chapters: List[List]) -> tuple:
         """Load a chapter's details into the form"""
@@ -183,13 +291,13 @@ Assistant: """
             return "", "", "", []
             
         selected_title = selected_chapters[0][0]  # First column is title
-        chapter = next((c for c in self.chapters if c["title"] == selected_title), None)
+        chapter = self._chapters.get(selected_title)
         
         if chapter:
             # Get scene details for the chapter's scenes
             chapter_scenes = []
             for scene_title in chapter["scenes"]:
-                scene = next((s for s in self.scenes_manager.scenes if s["title"] == scene_title), None)
+                scene = self.scenes_manager.get_scene(scene_title)
                 if scene:
                     chapter_scenes.append([scene["title"], scene["location"], scene["day"], scene["time"]])
             
@@ -201,75 +309,129 @@ Assistant: """
             )
         return "", "", "", []
     
-    def delete_chapter(self, title: str) -> str:
-        """Delete a chapter from the database"""
-        self.db.delete_chapter(title)
-        self.chapters = self.db.get_chapters()  # Refresh the chapters list
-        return f"Deleted chapter: {title}"
+    def open_draft_page(self, title: str, start: int = 0) -> tuple:
+        """Load one page of a chapter's draft; only the chunks holding it are read"""
+        if not title:
+            return "_No chapter selected_", "", 0, 0
+        try:
+            with self.db.session() as db:
+                info = self.db.get_draft_info(db, "chapter", title)
+                if start >= info["paragraphs"]:
+                    start = max(0, info["paragraphs"] - DRAFT_PAGE_SIZE)
+                paragraphs = self.db.get_draft_paragraphs(db, "chapter", title, start, DRAFT_PAGE_SIZE)
+        except ValueError as e:
+            return f"_{e}_", "", 0, 0
+        return self._draft_status(info, start, len(paragraphs)), "\n\n".join(paragraphs), start, len(paragraphs)
+    
+    def analyze_drafts(self) -> tuple:
+        """Word counts, readability and dialogue share of the drafts; unchanged paragraphs come from cache"""
+        from bookwright.utils.text_processor import text_analyzer
+        stats = text_analyzer.analyze_book(self.db)
+        book = stats["book"]
+        summary = (f"**{book['words']:,} words** in {book['paragraphs']:,} paragraphs; "
+                   f"reading ease {book['flesch_reading_ease']}, grade {book['flesch_kincaid_grade']}, "
+                   f"{book['dialogue_ratio']:.0%} dialogue")
+        chapters = [[c["title"], c["words"], c["sentences"], round(100 * c["dialogue_ratio"], 1),
+                     c["flesch_reading_ease"], c["flesch_kincaid_grade"]] for c in stats["chapters"]]
+        speakers = [[name, words, round(100 * stats["dialogue_share"][name], 1)]
+                    for name, words in book["speakers"].items()]
+        return summary, chapters, speakers
+
+    def save_draft_page(self, title: str, start: int, count: int, text: str) -> tuple:
+        """Write the edited page back in place of the paragraphs it was loaded from"""
+        if not title:
+            return "_No chapter selected_", text, start, count
+        try:
+            with self.db.session() as db:
+                self.db.save_draft_paragraphs(db, "chapter", title, start, count, text)
+        except ValueError as e:
+            return f"_{e}_", text, start, count
+        return self.open_draft_page(title, start)
+    
+    def _draft_status(self, info: Dict, start: int, count: int) -> str:
+        if not info["paragraphs"]:
+            return "_Empty draft: write the first page and save it_"
+        return (f"Paragraphs {start + 1}-{start + count} of {info['paragraphs']} "
+                f"({info['words']} words)")
+    
+    def delete_chapter(self, selected_chapters: List[List]) -> tuple:
+        """Delete the selected chapter from the database"""
+        if not selected_chapters:
+            return "No chapter selected", []
+        
+        title = selected_chapters[0][0]
+        with self.db.session() as db:
+            self.db.delete_chapter(db, title)
+        return f"Deleted chapter: {title}", []
     
     def assign_scenes(self, chapter_title: str, scene_titles: List[str]) -> tuple:
         """Assign scenes to a chapter"""
         if not chapter_title or not scene_titles:
             return "No chapter or scenes selected", []
             
-        chapter = next((c for c in self.chapters if c["title"] == chapter_title), None)
+        chapter = self._chapters.get(chapter_title)
         if not chapter:
             return f"Chapter not found: {chapter_title}", []
             
         # Add new scenes to chapter
+        scenes = list(chapter["scenes"])
         for scene_title in scene_titles:
-            if scene_title not in chapter["scenes"]:
-                chapter["scenes"].append(scene_title)
+            if scene_title not in scenes:
+                scenes.append(scene_title)
+        self._save_chapter_scenes(chapter, scenes)
         
         # Get scene details for display
         chapter_scenes = []
-        for scene_title in chapter["scenes"]:
-            scene = next((s for s in self.scenes_manager.scenes if s["title"] == scene_title), None)
+        for scene_title in scenes:
+            scene = self.scenes_manager.get_scene(scene_title)
             if scene:
                 chapter_scenes.append([scene["title"], scene["location"], scene["day"], scene["time"]])
         
         return f"Assigned {len(scene_titles)} scenes to {chapter_title}", chapter_scenes
     
-    def remove_scene(self, selected_chapters: List[List], selected_scenes: List[List]) -> tuple:
-        """Remove a scene from a chapter"""
-        if not selected_chapters or not selected_scenes:
+    def remove_scene(self, chapter_title: str, selected_scenes: List[List]) -> tuple:
+        """Remove a scene from the loaded chapter"""
+        if not chapter_title or not selected_scenes:
             return "No chapter or scene selected", []
             
-        chapter_title = selected_chapters[0][0]
         scene_title = selected_scenes[0][0]
         
-        chapter = next((c for c in self.chapters if c["title"] == chapter_title), None)
+        chapter = self._chapters.get(chapter_title)
         if not chapter:
             return f"Chapter not found: {chapter_title}", []
             
         # Remove scene from chapter
-        if scene_title in chapter["scenes"]:
-            chapter["scenes"].remove(scene_title)
+        scenes = [title for title in chapter["scenes"] if title != scene_title]
+        self._save_chapter_scenes(chapter, scenes)
             
         # Get updated scene list
         chapter_scenes = []
-        for scene_title in chapter["scenes"]:
-            scene = next((s for s in self.scenes_manager.scenes if s["title"] == scene_title), None)
+        for scene_title in scenes:
+            scene = self.scenes_manager.get_scene(scene_title)
             if scene:
                 chapter_scenes.append([scene["title"], scene["location"], scene["day"], scene["time"]])
         
         return f"Removed scene from {chapter_title}", chapter_scenes
     
-    def reorder_scenes(self, selected_chapters: List[List], scenes_order: List[List]) -> tuple:
-        """Reorder scenes in a chapter"""
-        if not selected_chapters or not scenes_order:
+    def reorder_scenes(self, chapter_title: str, scenes_order: List[List]) -> tuple:
+        """Reorder scenes in the loaded chapter"""
+        if not chapter_title or not scenes_order:
             return "No chapter or scenes selected", []
             
-        chapter_title = selected_chapters[0][0]
-        chapter = next((c for c in self.chapters if c["title"] == chapter_title), None)
+        chapter = self._chapters.get(chapter_title)
         if not chapter:
             return f"Chapter not found: {chapter_title}", []
             
         # Update chapter's scene order
-        chapter["scenes"] = [scene[0] for scene in scenes_order]
+        self._save_chapter_scenes(chapter, [scene[0] for scene in scenes_order])
         
         return f"Reordered scenes in {chapter_title}", scenes_order
     
+    def _save_chapter_scenes(self, chapter: Dict, scene_titles: List[str]) -> None:
+        """Persist a chapter's scene list"""
+        with self.db.session() as db:
+            self.db.save_chapter(db, {**chapter, "scenes": scene_titles})
+    
     def clear_form(self) -> tuple:
         """Clear all form fields"""
         return "", "", "", [] 
\ No newline at end of file
@@ -1,18 +1,47 @@
 import gradio as gr
-from typing import List, Dict, Optional
-from bookwright.core.llm_interface import OllamaClient
-from bookwright.utils.database_manager import DatabaseManager
+from typing import List, Dict, Optional, Tuple
+from bookwright.core.llm_interface import get_llm_client
+from bookwright.utils.database_manager import StoryDatabase, get_story_database
+from bookwright.ui.paged_table import PagedTable
+from bookwright.ui.concurrency import queue_group, DB_WRITES
+from bookwright.ui.autosave import Autosave
+
+# Rows shown per analytics table; the statistics cover the whole cast
+ANALYTICS_ROWS = 25
 
 class CharactersManager:
-    def __init__(self, scenes_manager):
-        self.characters: List[Dict] = []
+    def __init__(self, scenes_manager, db: Optional[StoryDatabase] = None):
         self.scenes_manager = scenes_manager
-        self.llm = OllamaClient(model='deepseek')
-        self.db = DatabaseManager(None, None, None).db  # Temporary until we can pass the manager
+        self.llm = get_llm_client('deepseek')
+        self.db = db or get_story_database()
+        # Kept current by the change feed
+        self._characters = self.db.mirror("character")
+        self._analytics = None
+        self.table = PagedTable(
+            self.db, "character",
+            columns={"Name": "name", "Role": "role"},
+            sorts={"Name": "name", "Role": "role"},
+            filters={"Role": "role"}
+        )
+        self.view_inputs: List[gr.components.Component] = []
+        self.view_components: List[gr.components.Component] = []
+    
+    @property
+    def analytics(self):
+        """Cast analytics, created on first use so NumPy and SciPy load only when asked for"""
+        if self._analytics is None:
+            from bookwright.core.cast_analytics import CastAnalytics
+            self._analytics = CastAnalytics(self.db)
+        return self._analytics
+    
+    @property
+    def characters(self) -> List[Dict]:
+        """Current characters as read-only records"""
+        return self._characters.records()
         
-    def set_scenes(self, scenes: List[Dict]):
-        """Set the scenes list from ScenesManager"""
-        self.scenes_manager.scenes = scenes
+    def set_scenes(self, scenes_manager):
+        """Read scenes from the given ScenesManager's feed-maintained records"""
+        self.scenes_manager = scenes_manager
         
     def create_characters_interface(self) -> gr.Blocks:
         """Create and return the Gradio interface for characters management"""
@@ -27,6 +56,7 @@ class CharactersManager:
                         choices=["Protagonist", "Antagonist", "Supporting", "Minor"],
                         label="Role in Story"
                     )
+                    aliases = gr.Textbox(label="Aliases (comma separated)", placeholder="Other names the character goes by")
                     
                     # Physical Description
                     with gr.Group():
@@ -58,8 +88,11 @@ class CharactersManager:
                             headers=["Scene Title", "Day", "Time", "Location", "Role in Scene", "Scene Notes"],
                             datatype=["str", "str", "str", "str", "str", "str"],
                             col_count=(6, "fixed"),
-                            interactive=True
+                            interactive=True,
+                            type="array"
                         )
+                        # Per session: (scene title, character name) -> (role in scene, scene notes)
+                        scene_details = gr.State({})
                         
                         with gr.Row():
                             update_scene_button = gr.Button("Update Scene Details")
@@ -73,112 +106,184 @@ class CharactersManager:
                         clear_button = gr.Button("Clear Form")
                     
                     status = gr.Markdown("Status: _No character saved yet_")
+                    
+                    # Edits to a loaded character are saved as they are made
+                    form = {
+                        "name": character_name, "role": character_role, "aliases": aliases,
+                        "physical_description": appearance, "age": age, "gender": gender,
+                        "personality_traits": personality, "background": background, "motivation": motivation,
+                        "relationships": relationships, "skills": skills, "notes": notes
+                    }
+                    autosave = Autosave(form, "name", self.autosave_character, status)
+                    autosave.render()
+                    form_fields = list(form.values())
             
             with gr.Column(scale=1):
-                characters_list = gr.Dataframe(
-                    headers=["Name", "Role", "Age", "Gender"],
-                    datatype=["str", "str", "number", "str"],
-                    col_count=(4, "fixed")
-                )
+                self.table.render()
                 
                 load_button = gr.Button("Load Selected Character")
                 delete_button = gr.Button("Delete Selected Character")
             
+            # Mentions
+            with gr.Accordion("Mentions", open=False):
+                mentions_button = gr.Button("Find Mentions of Character")
+                mentions_status = gr.Markdown("")
+                mentions_list = gr.Dataframe(
+                    headers=["Type", "Source", "Field", "Paragraph", "Offset", "Matched"],
+                    datatype=["str", "str", "str", "number", "number", "str"],
+                    col_count=(6, "fixed")
+                )
+            
+            # Cast Analytics
+            with gr.Accordion("Cast Analytics", open=False):
+                with gr.Row():
+                    analytics_limit = gr.Number(label="Rows to Show", value=ANALYTICS_ROWS, precision=0)
+                    analytics_button = gr.Button("Analyze Cast")
+                analytics_status = gr.Markdown("")
+                with gr.Row():
+                    top_pairs = gr.Dataframe(
+                        headers=["Character", "Character", "Shared Scenes"],
+                        datatype=["str", "str", "number"],
+                        col_count=(3, "fixed"),
+                        label="Most Scenes Together"
+                    )
+                    centrality = gr.Dataframe(
+                        headers=["Name", "Scenes", "Co-characters", "Shared Scenes", "Centrality"],
+                        datatype=["str", "number", "number", "number", "number"],
+                        col_count=(5, "fixed"),
+                        label="Centrality"
+                    )
+                presence = gr.Dataframe(label="Scenes per Chapter")
+            
             # Connect buttons to functions
-            save_button.click(
+            save_event = save_button.click(
                 fn=self.save_character,
-                inputs=[
-                    character_name, character_role, appearance, age, gender,
-                    personality, background, motivation, relationships, skills, notes
-                ],
-                outputs=[status, characters_list, character_scenes]
+                inputs=form_fields,
+                outputs=[status],
+                **queue_group(DB_WRITES)
             )
+            self.table.reload_after(save_event)
+            autosave.reset_after(save_event)
             
-            clear_button.click(
+            autosave.reset_after(clear_button.click(
                 fn=self.clear_form,
                 inputs=[],
-                outputs=[
-                    character_name, character_role, appearance, age, gender,
-                    personality, background, motivation, relationships, skills, notes,
-                    character_scenes
-                ]
-            )
+                outputs=form_fields + [character_scenes]
+            ))
             
-            load_button.click(
+            autosave.reset_after(load_button.click(
                 fn=self.load_character,
-                inputs=[characters_list],
-                outputs=[
-                    character_name, character_role, appearance, age, gender,
-                    personality, background, motivation, relationships, skills, notes,
-                    character_scenes
-                ]
-            )
+                inputs=[self.table.selected, scene_details],
+                outputs=form_fields + [character_scenes]
+            ))
             
-            delete_button.click(
+            self.table.reload_after(delete_button.click(
                 fn=self.delete_character,
-                inputs=[characters_list],
-                outputs=[status, characters_list, character_scenes]
-            )
+                inputs=[self.table.selected],
+                outputs=[status],
+                **queue_group(DB_WRITES)
+            ))
             
             update_scene_button.click(
                 fn=self.update_scene_details,
-                inputs=[character_name, character_scenes],
-                outputs=[status, character_scenes]
+                inputs=[character_name, character_scenes, scene_details],
+                outputs=[status, character_scenes, scene_details]
             )
             
             add_to_scene_button.click(
                 fn=self.add_to_new_scene,
+                inputs=[character_name, scene_details],
+                outputs=[status, character_scenes],
+                **queue_group(DB_WRITES)
+            )
+            
+            mentions_button.click(
+                fn=self.find_mentions,
                 inputs=[character_name],
-                outputs=[status, character_scenes]
+                outputs=[mentions_status, mentions_list]
             )
             
-            # Initialize characters list
-            characters_list.value = self.get_characters_list()
+            analytics_button.click(
+                fn=self.analyze_cast,
+                inputs=[analytics_limit],
+                outputs=[analytics_status, top_pairs, centrality, presence]
+            )
+            
+            # The table is filled when the tab is first opened (see refresh_view)
+            self.view_inputs = self.table.refresh_inputs
+            self.view_components = self.table.refresh_outputs
             
         return characters_interface
     
-    def get_character_scenes(self, character_name: str) -> List[List[str]]:
-        """Get all scenes where this character appears"""
+    def get_character_scenes(self, character_name: str, scene_details: Optional[Dict] = None) -> List[List[str]]:
+        """Get all scenes where this character appears, with the session's scene details"""
         if not character_name:
             return []
             
+        scene_details = scene_details or {}
         character_scenes = []
         for scene in self.scenes_manager.scenes:
             if character_name in scene.get("characters", []):
+                role, notes = scene_details.get((scene["title"], character_name), ("Supporting", ""))
                 character_scenes.append([
                     scene["title"],
                     scene["day"],
                     scene["time"],
                     scene["location"],
-                    scene.get("character_roles", {}).get(character_name, "Supporting"),
-                    scene.get("character_notes", {}).get(character_name, "")
+                    role,
+                    notes
                 ])
         return character_scenes
     
-    def update_scene_details(self, character_name: str, scenes_data: List[List[str]]) -> tuple:
+    def find_mentions(self, character_name: str) -> tuple:
+        """Everywhere the character's name or an alias appears; only changed text is rescanned"""
+        if not character_name:
+            return "No character selected", []
+        with self.db.session() as db:
+            mentions = self.db.get_mentions(db, character_name)
+        rows = [[m["source_type"], m["source"], m["field"], m["paragraph"], m["start"], m["matched"]]
+                for m in mentions]
+        return f"{len(rows)} mentions of {character_name}", rows
+    
+    def analyze_cast(self, limit: Optional[float]) -> tuple:
+        """Co-occurrence, centrality and per-chapter presence, cut to the top rows for display"""
+        limit = max(int(limit or ANALYTICS_ROWS), 1)
+        pairs = [[*p["characters"], p["shared_scenes"]] for p in self.analytics.top_pairs(limit)]
+        ranked = [[c["name"], c["scenes"], c["co_characters"], c["shared_scenes"], c["eigenvector"]]
+                  for c in self.analytics.centrality(limit)]
+        names, chapters, counts = self.analytics.presence(limit)
+        heatmap = gr.Dataframe(
+            value=[[name, *map(int, row)] for name, row in zip(names, counts)],
+            headers=["Name", *chapters]
+        )
+        isolated = self.analytics.isolated()
+        status = f"{len(isolated)} characters share no scenes"
+        if isolated:
+            shown = ", ".join(c["name"] for c in isolated[:limit])
+            status += f": {shown}" + (" ..." if len(isolated) > limit else "")
+        return status, pairs, ranked, heatmap
+    
+    def update_scene_details(self, character_name: str, scenes_data: List[List[str]],
+                             scene_details: Dict[Tuple[str, str], Tuple[str, str]]) -> tuple:
         """Update the character's details for specific scenes"""
         if not character_name or not scenes_data:
-            return "No character or scenes selected", []
+            return "No character or scenes selected", [], scene_details
             
+        # Scene records are shared read-only snapshots, so per-character
+        # details are kept alongside them, in the session, rather than written into them
+        scene_details = dict(scene_details)
         for scene_data in scenes_data:
             scene_title = scene_data[0]
             scene_role = scene_data[4]
             scene_notes = scene_data[5]
             
-            # Find the scene and update character details
-            for scene in self.scenes_manager.scenes:
-                if scene["title"] == scene_title:
-                    if "character_roles" not in scene:
-                        scene["character_roles"] = {}
-                    if "character_notes" not in scene:
-                        scene["character_notes"] = {}
+            if self.scenes_manager.get_scene(scene_title):
+                scene_details[(scene_title, character_name)] = (scene_role, scene_notes)
                     
-                    scene["character_roles"][character_name] = scene_role
-                    scene["character_notes"][character_name] = scene_notes
-                    
-        return f"Updated scene details for {character_name}", self.get_character_scenes(character_name)
+        return (f"Updated scene details for {character_name}",
+                self.get_character_scenes(character_name, scene_details), scene_details)
     
-    def add_to_new_scene(self, character_name: str) -> tuple:
+    def add_to_new_scene(self, character_name: str, scene_details: Optional[Dict] = None) -> tuple:
         """Add the character to a new scene"""
         if not character_name:
             return "No character selected", []
@@ -189,21 +294,26 @@ class CharactersManager:
             "day": "Day 1",
             "time": "Morning",
             "location": "New Location",
-            "characters": [character_name],
-            "character_roles": {character_name: "Supporting"},
-            "character_notes": {character_name: ""}
+            "characters": [character_name]
         }
         
-        self.scenes_manager.scenes.append(new_scene)
-        return f"Added {character_name} to new scene", self.get_character_scenes(character_name)
+        with self.db.session() as db:
+            self.db.save_scene(db, new_scene)
+        return f"Added {character_name} to new scene", self.get_character_scenes(character_name, scene_details)
     
-    def save_character(self, name: str, role: str, physical_description: str, personality_traits: str,
-                      background: str, motivation: str, relationships: str, skills: str, notes: str) -> str:
+    def save_character(self, name: str, role: str, aliases: str, physical_description: str,
+                       age: Optional[float], gender: str, personality_traits: str, background: str,
+                       motivation: str, relationships: str, skills: str, notes: str) -> str:
         """Save a character to the database"""
+        if not name or not name.strip():
+            return "A character needs a name"
         character = {
             "name": name,
             "role": role,
+            "aliases": aliases,
             "physical_description": physical_description,
+            "age": int(age) if age is not None else None,
+            "gender": gender,
             "personality_traits": personality_traits,
             "background": background,
             "motivation": motivation,
@@ -211,42 +321,60 @@ class CharactersManager:
             "skills": skills,
             "notes": notes
         }
-        self.db.save_character(character)
-        self.characters = self.db.get_characters()  # Refresh the characters list
-        return f"Saved character: {name}"
+        with self.db.session() as db:
+            written = self.db.save_character(db, character)
+        self.db.wait_for_commit()  # Committed with its group before the form says it was saved
+        return f"Saved character: {name}" if written else f"No changes to save: {name}"
+    
+    def autosave_character(self, name: str, changes: Dict) -> bool:
+        """Save only the edited fields of a loaded character"""
+        if changes.get("age") is not None:
+            changes = {**changes, "age": int(changes["age"])}
+        with self.db.session() as db:
+            # Update only: a character deleted by another session is not re-created
+            written = self.db.save_character(db, {"name": name, **changes}, create=False)
+        self.db.wait_for_commit()
+        return written
     
-    def delete_character(self, name: str) -> str:
-        """Delete a character from the database"""
-        self.db.delete_character(name)
-        self.characters = self.db.get_characters()  # Refresh the characters list
+    def delete_character(self, selected_characters: List[List]) -> str:
+        """Delete the selected character from the database"""
+        if not selected_characters:
+            return "No character selected"
+        name = selected_characters[0][0]
+        with self.db.session() as db:
+            self.db.delete_character(db, name)
         return f"Deleted character: {name}"
     
-    def get_characters_list(self) -> List[List]:
-        """Return a list of characters in the format expected by the Dataframe"""
-        return [[c["name"], c["role"]] for c in self.characters]
+    def refresh_view(self, *table_state) -> tuple:
+        """Re-read the table page the session is on; edits from other tabs show up"""
+        return self.table.refresh(*table_state)
     
-    def load_character(self, selected_characters: List[List]) -> tuple:
-        """Load a character's details into the form"""
+    def load_character(self, selected_characters: List[List], scene_details: Optional[Dict] = None) -> tuple:
+        """Load a character's details and scenes into the form"""
         if not selected_characters:
-            return "", "", "", "", "", "", "", "", ""
+            return self.clear_form()
             
         selected_name = selected_characters[0][0]  # First column is name
-        character = next((c for c in self.characters if c["name"] == selected_name), None)
+        character = self._characters.get(selected_name)
         
         if character:
             return (
                 character["name"],
                 character["role"],
+                character["aliases"] or "",
                 character["physical_description"],
+                character["age"],
+                character["gender"],
                 character["personality_traits"],
                 character["background"],
                 character["motivation"],
                 character["relationships"],
                 character["skills"],
-                character["notes"]
+                character["notes"],
+                self.get_character_scenes(character["name"], scene_details)
             )
-        return "", "", "", "", "", "", "", "", ""
+        return self.clear_form()
     
     def clear_form(self) -> tuple:
         """Clear all form fields"""
-        return "", "", "", "", "", "", "", "", "" 
\ No newline at end of file
+        return "", None, "", "", None, None, "", "", "", "", "", "", [] 
\ No newline at end of file
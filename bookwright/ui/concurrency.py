@@ -0,0 +1,24 @@
+from typing import Dict
+
+# Gradio queue concurrency groups. Each group has its own workers, so a
+# slow LLM reply never holds up a save and an export never blocks either.
+LLM = "llm"
+DB_WRITES = "db_writes"
+EXPORTS = "exports"
+
+CONCURRENCY_LIMITS = {
+    LLM: 2,  # One local model; more parallel generations only slow each other down
+    DB_WRITES: 4,  # Writers share one group-committed session, so more would just wait
+    EXPORTS: 1,  # Exports, imports, snapshots and manuscript builds cover the whole book
+}
+
+# Events in no group: table pages, loads and analytics
+DEFAULT_CONCURRENCY = 8
+
+# Requests beyond this many waiting are turned away instead of queued
+MAX_QUEUE_SIZE = 256
+
+
+def queue_group(name: str) -> Dict:
+    """Keyword arguments placing an event listener in a concurrency group"""
+    return {"concurrency_id": name, "concurrency_limit": CONCURRENCY_LIMITS[name]}
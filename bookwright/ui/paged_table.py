@@ -0,0 +1,110 @@
+import gradio as gr
+from typing import List, Dict, Optional
+from bookwright.utils.database_manager import StoryDatabase
+from bookwright.utils.paging import PAGE_SIZE
+
+class PagedTable:
+    """A Dataframe showing one page of an entity table at a time.
+
+    Search, filters, sorting and paging are done by indexed queries
+    (StoryDatabase.get_page), so a page costs the same however large the
+    book is. Each browser session keeps its own position in gr.State: the
+    cursors of the pages it has passed, so Previous needs no offset.
+    """
+
+    def __init__(self, db: StoryDatabase, entity_type: str, columns: Dict[str, str],
+                 sorts: Dict[str, str], filters: Optional[Dict[str, str]] = None,
+                 datatype: Optional[List[str]] = None, page_size: int = PAGE_SIZE):
+        self.db = db
+        self.entity_type = entity_type
+        self.columns = columns  # Header -> field
+        self.sorts = sorts  # Label -> field
+        self.filters = filters or {}  # Label -> field
+        self.datatype = datatype or ["str"] * len(columns)
+        self.page_size = page_size
+
+    def render(self) -> gr.Dataframe:
+        """Create the components; call inside a Blocks context"""
+        with gr.Row():
+            self.search = gr.Textbox(label="Search", placeholder="Press Enter to search", scale=2)
+            self.sort = gr.Dropdown(choices=[("Created", "id")] + list(self.sorts.items()), value="id",
+                                    label="Sort By", scale=1)
+            self.descending = gr.Checkbox(label="Descending", value=False, scale=0)
+        self.filter_inputs = []
+        if self.filters:
+            with gr.Row():
+                for label in self.filters:
+                    # Choices are filled when the tab is opened
+                    self.filter_inputs.append(gr.Dropdown(choices=[("All", "")], value="", label=label))
+        self.table = gr.Dataframe(
+            headers=list(self.columns),
+            datatype=self.datatype,
+            col_count=(len(self.columns), "fixed"),
+            interactive=False
+        )
+        with gr.Row():
+            previous_button = gr.Button("Previous Page")
+            self.info = gr.Markdown("")
+            next_button = gr.Button("Next Page")
+        self.cursors = gr.State([None])  # Start of each page up to the current one
+        self.next_cursor = gr.State(None)
+        self.selected = gr.State([])  # The clicked row, as a one-row table
+
+        self.query_inputs = [self.search, self.sort, self.descending, *self.filter_inputs]
+        self.page_outputs = [self.table, self.info, self.cursors, self.next_cursor, self.selected]
+        self.refresh_inputs = [self.cursors] + self.query_inputs
+        self.refresh_outputs = self.page_outputs + self.filter_inputs
+
+        self.search.submit(fn=self.first_page, inputs=self.query_inputs, outputs=self.page_outputs)
+        for component in [self.sort, self.descending, *self.filter_inputs]:
+            component.change(fn=self.first_page, inputs=self.query_inputs, outputs=self.page_outputs)
+        previous_button.click(fn=self.previous_page, inputs=self.refresh_inputs, outputs=self.page_outputs)
+        next_button.click(fn=self.next_page, inputs=[self.next_cursor] + self.refresh_inputs,
+                          outputs=self.page_outputs)
+        self.table.select(fn=self.select_row, inputs=[], outputs=self.selected)
+        return self.table
+
+    def _fetch(self, cursors: List, search: str, sort: str, descending: bool, *filter_values) -> tuple:
+        filters = {field: value for field, value in zip(self.filters.values(), filter_values) if value}
+        with self.db.session() as db:
+            page = self.db.get_page(db, self.entity_type, sort or "id", bool(descending), search or "",
+                                    filters, cursors[-1], self.page_size)
+        rows = [[row[field] for field in self.columns.values()] for row in page["rows"]]
+        start = (len(cursors) - 1) * self.page_size
+        if rows:
+            info = f"Page {len(cursors)}: rows {start + 1}-{start + len(rows)}" + ("" if page["next"] else " (last)")
+        else:
+            info = "No rows" if len(cursors) == 1 else f"Page {len(cursors)}: no rows"
+        # A new page invalidates the selection
+        return rows, info, cursors, page["next"], []
+
+    def first_page(self, *query) -> tuple:
+        return self._fetch([None], *query)
+
+    def current_page(self, cursors: List, *query) -> tuple:
+        """Re-read the page being shown, e.g. after a save or delete"""
+        return self._fetch(cursors or [None], *query)
+
+    def next_page(self, next_cursor: Optional[List], cursors: List, *query) -> tuple:
+        if next_cursor is None:
+            return self.current_page(cursors, *query)
+        return self._fetch(cursors + [next_cursor], *query)
+
+    def previous_page(self, cursors: List, *query) -> tuple:
+        return self._fetch(cursors[:-1] or [None], *query)
+
+    def refresh(self, cursors: List, *query) -> tuple:
+        """The current page and fresh filter choices, for when the tab is opened"""
+        updates = []
+        with self.db.session() as db:
+            for field in self.filters.values():
+                values = self.db.get_filter_values(db, self.entity_type, field)
+                updates.append(gr.update(choices=[("All", "")] + [(v, v) for v in values]))
+        return (*self.current_page(cursors, *query), *updates)
+
+    def reload_after(self, event):
+        """Chain a re-read of the current page onto an event that changes the table"""
+        return event.then(fn=self.current_page, inputs=self.refresh_inputs, outputs=self.page_outputs)
+
+    def select_row(self, evt: gr.SelectData) -> List[List]:
+        return [evt.row_value]
@@ -1,14 +1,34 @@
 import gradio as gr
 from typing import List, Dict, Optional
-from bookwright.core.llm_interface import OllamaClient
-from bookwright.utils.database_manager import DatabaseManager
+from bookwright.core.llm_interface import get_llm_client
+from bookwright.utils.database_manager import StoryDatabase, get_story_database
+from bookwright.core.timeline import Timeline
+from bookwright.utils.near_duplicates import DEFAULT_THRESHOLD
+from bookwright.ui.paged_table import PagedTable
+from bookwright.ui.concurrency import queue_group, LLM, DB_WRITES
+from bookwright.ui.autosave import Autosave
+from bookwright.utils.tracing import tracer
 
 class ScenesManager:
-    def __init__(self):
-        self.scenes: List[Dict] = []
-        self.llm = OllamaClient(model='deepseek')
-        self.db = DatabaseManager(None, None, None).db  # Temporary until we can pass the manager
-        self.chat_history = []
+    def __init__(self, db: Optional[StoryDatabase] = None):
+        self.llm = get_llm_client('deepseek')
+        self.db = db or get_story_database()
+        # Kept current by the change feed, shared with the other tabs' managers
+        self._scenes = self.db.mirror("scene")
+        self.timeline = Timeline(self.db)
+        self.table = PagedTable(
+            self.db, "scene",
+            columns={"Title": "title", "Location": "location", "Day": "day", "Time": "time"},
+            sorts={"Title": "title", "Location": "location", "Day": "day", "Time": "time"},
+            filters={"Location": "location", "Day": "day"}
+        )
+        self.view_inputs: List[gr.components.Component] = []
+        self.view_components: List[gr.components.Component] = []
+    
+    @property
+    def scenes(self) -> List[Dict]:
+        """Current scenes as read-only records"""
+        return self._scenes.records()
         
     def create_scene_interface(self) -> gr.Blocks:
         """Create and return the Gradio interface for scenes management"""
@@ -31,17 +51,48 @@ class ScenesManager:
                         clear_button = gr.Button("Clear Form")
                     
                     status = gr.Markdown("Status: _No scene saved yet_")
+                    
+                    # Edits to a loaded scene are saved as they are made
+                    form = {
+                        "title": scene_title, "description": scene_description, "location": scene_location,
+                        "day": scene_day, "time": scene_time, "characters": scene_characters, "notes": scene_notes
+                    }
+                    autosave = Autosave(form, "title", self.autosave_scene, status)
+                    autosave.render()
+                    form_fields = list(form.values())
             
             with gr.Column(scale=1):
-                scenes_list = gr.Dataframe(
-                    headers=["Title", "Location", "Day", "Time"],
-                    datatype=["str", "str", "str", "str"],
-                    col_count=(4, "fixed")
-                )
+                self.table.render()
                 
                 load_button = gr.Button("Load Selected Scene")
                 delete_button = gr.Button("Delete Selected Scene")
             
+            # Timeline
+            with gr.Accordion("Timeline", open=False):
+                with gr.Row():
+                    timeline_query = gr.Textbox(label="Days", placeholder="e.g., Day 3 or Day 2 - Day 4 (empty for all)")
+                    timeline_button = gr.Button("Show Scenes")
+                    continuity_button = gr.Button("Check Continuity")
+                timeline_status = gr.Markdown("")
+                timeline_list = gr.Dataframe(
+                    headers=["Day", "Time", "Title", "Location", "Characters"],
+                    datatype=["str", "str", "str", "str", "str"],
+                    col_count=(5, "fixed")
+                )
+            
+            # Near Duplicates
+            with gr.Accordion("Near Duplicates", open=False):
+                with gr.Row():
+                    duplicate_threshold = gr.Slider(0.5, 1.0, value=DEFAULT_THRESHOLD, step=0.05,
+                                                    label="Minimum Similarity")
+                    duplicates_button = gr.Button("Find Near Duplicates")
+                duplicates_status = gr.Markdown("")
+                duplicates_list = gr.Dataframe(
+                    headers=["Similarity", "First", "Second", "Kind"],
+                    datatype=["number", "str", "str", "str"],
+                    col_count=(4, "fixed")
+                )
+            
             # Chat Interface
             with gr.Group():
                 gr.Markdown("### Character Development Chat")
@@ -49,76 +100,113 @@ class ScenesManager:
                 msg = gr.Textbox(label="Ask about characters or scenes", placeholder="Type your message here...")
                 clear_chat = gr.Button("Clear Chat")
                 
-                def respond(message, chat_history):
+                # The form is passed in, so each session's chat sees its own scene
+                def respond(message, chat_history, title, description, location, day, time, characters, notes):
                     if not message:
                         return "", chat_history
                         
-                    # Build context from current scene and characters
-                    context = ""
-                    if scene_title.value:
-                        context += f"Current Scene: {scene_title.value}\n"
-                        context += f"Description: {scene_description.value}\n"
-                        context += f"Location: {scene_location.value}\n"
-                        context += f"Day: {scene_day.value}\n"
-                        context += f"Time: {scene_time.value}\n"
-                        context += f"Characters: {scene_characters.value}\n"
-                        context += f"Notes: {scene_notes.value}\n\n"
-                    
-                    # Add all scenes as context
-                    if self.scenes:
-                        context += "All Scenes:\n"
-                        for scene in self.scenes:
-                            context += f"- {scene['title']}: {scene['description']}\n"
-                    
-                    # Build prompt with context
-                    prompt = f"""You are a helpful writing assistant. Use the following context to help answer questions about characters and scenes:
+                    with tracer.span("chat.scene", message_chars=len(message), history=len(chat_history or [])) as span:
+                        with tracer.span("build_context") as stage:
+                            # Build context from current scene and characters
+                            context = ""
+                            if title:
+                                context += f"Current Scene: {title}\n"
+                                context += f"Description: {description}\n"
+                                context += f"Location: {location}\n"
+                                context += f"Day: {day}\n"
+                                context += f"Time: {time}\n"
+                                context += f"Characters: {characters}\n"
+                                context += f"Notes: {notes}\n\n"
+
+                            # Add all scenes as context
+                            if self.scenes:
+                                context += "All Scenes:\n"
+                                for scene in self.scenes:
+                                    context += f"- {scene['title']}: {scene['description']}\n"
+
+                            stage.set(context_chars=len(context))
+
+                        with tracer.span("render_prompt") as stage:
+                            # Build prompt with context
+                            prompt = f"""You are a helpful writing assistant. Use the following context to help answer questions about characters and scenes:
 
 {context}
 
 User: {message}
 Assistant: """
-                    
-                    # Get response from Ollama
-                    response = self.llm.generate(prompt)
-                    
-                    chat_history.append((message, response))
-                    return "", chat_history
+
+                            stage.set(prompt_chars=len(prompt))
+
+                        # Get response from Ollama
+                        response = self.llm.generate(prompt)
+
+                        chat_history.append((message, response))
+                        span.set(response_chars=len(response))
+                        return "", chat_history
                 
-                msg.submit(respond, [msg, chatbot], [msg, chatbot])
+                msg.submit(respond, [msg, chatbot, scene_title, scene_description, scene_location, scene_day,
+                                     scene_time, scene_characters, scene_notes], [msg, chatbot], **queue_group(LLM))
                 clear_chat.click(lambda: [], None, chatbot)
             
             # Connect buttons to functions
-            save_button.click(
+            save_event = save_button.click(
                 fn=self.save_scene,
-                inputs=[scene_title, scene_description, scene_location, scene_day, scene_time, scene_characters, scene_notes],
-                outputs=[status, scenes_list]
+                inputs=form_fields,
+                outputs=[status],
+                **queue_group(DB_WRITES)
             )
+            self.table.reload_after(save_event)
+            autosave.reset_after(save_event)
             
-            clear_button.click(
+            autosave.reset_after(clear_button.click(
                 fn=self.clear_form,
                 inputs=[],
-                outputs=[scene_title, scene_description, scene_location, scene_day, scene_time, scene_characters, scene_notes]
-            )
+                outputs=form_fields
+            ))
             
-            load_button.click(
+            autosave.reset_after(load_button.click(
                 fn=self.load_scene,
-                inputs=[scenes_list],
-                outputs=[scene_title, scene_description, scene_location, scene_day, scene_time, scene_characters, scene_notes]
-            )
+                inputs=[self.table.selected],
+                outputs=form_fields
+            ))
             
-            delete_button.click(
+            self.table.reload_after(delete_button.click(
                 fn=self.delete_scene,
-                inputs=[scenes_list],
-                outputs=[status, scenes_list]
+                inputs=[self.table.selected],
+                outputs=[status],
+                **queue_group(DB_WRITES)
+            ))
+            
+            duplicates_button.click(
+                fn=self.find_near_duplicates,
+                inputs=[duplicate_threshold],
+                outputs=[duplicates_status, duplicates_list]
             )
             
-            # Initialize scenes list
-            scenes_list.value = self.get_scenes_list()
+            timeline_button.click(
+                fn=self.show_timeline,
+                inputs=[timeline_query],
+                outputs=[timeline_status, timeline_list]
+            )
+            
+            continuity_button.click(
+                fn=self.check_continuity,
+                inputs=[],
+                outputs=[timeline_status]
+            )
+            
+            # The table is filled when the tab is first opened (see refresh_view)
+            self.view_inputs = self.table.refresh_inputs
+            self.view_components = self.table.refresh_outputs
             
         return scenes_interface
     
     def save_scene(self, title: str, description: str, location: str, day: str, time: str, characters: List[str], notes: str) -> str:
         """Save a scene to the database"""
+        if not title:
+            return "A scene needs a title"
+        if isinstance(characters, str):  # Comma separated text from the form
+            characters = _split_names(characters)
         scene = {
             "title": title,
             "description": description,
@@ -128,21 +216,36 @@ Assistant: """
             "characters": characters,
             "notes": notes
         }
-        self.db.save_scene(scene)
-        self.scenes = self.db.get_scenes()  # Refresh the scenes list
-        return f"Saved scene: {title}"
+        with self.db.session() as db:
+            written = self.db.save_scene(db, scene)
+        self.db.wait_for_commit()  # Committed with its group before the form says it was saved
+        return f"Saved scene: {title}" if written else f"No changes to save: {title}"
+    
+    def autosave_scene(self, title: str, changes: Dict) -> bool:
+        """Save only the edited fields of a loaded scene"""
+        if isinstance(changes.get("characters"), str):
+            changes = {**changes, "characters": _split_names(changes["characters"])}
+        with self.db.session() as db:
+            # Update only: a scene deleted by another session is not re-created
+            written = self.db.save_scene(db, {"title": title, **changes}, create=False)
+        self.db.wait_for_commit()
+        return written
     
-    def get_scenes_list(self) -> List[List]:
-        """Return a list of scenes in the format expected by the Dataframe"""
-        return [[s["title"], s["location"], s["day"], s["time"]] for s in self.scenes]
+    def get_scene(self, title: str) -> Optional[Dict]:
+        """Look up one scene by title"""
+        return self._scenes.get(title)
+    
+    def refresh_view(self, *table_state) -> tuple:
+        """Re-read the table page the session is on; edits from other tabs show up"""
+        return self.table.refresh(*table_state)
     
     def load_scene(self, selected_scenes: List[List]) -> tuple:
         """Load a scene's details into the form"""
         if not selected_scenes:
-            return "", "", "", "", "", [], ""
+            return self.clear_form()
             
         selected_title = selected_scenes[0][0]  # First column is title
-        scene = next((s for s in self.scenes if s["title"] == selected_title), None)
+        scene = self._scenes.get(selected_title)
         
         if scene:
             return (
@@ -151,22 +254,72 @@ Assistant: """
                 scene["location"],
                 scene["day"],
                 scene["time"],
-                scene["characters"],
+                ", ".join(scene["characters"]),
                 scene["notes"]
             )
-        return "", "", "", "", "", [], ""
+        return self.clear_form()
     
-    def delete_scene(self, selected_scenes: List[List]) -> tuple:
+    def delete_scene(self, selected_scenes: List[List]) -> str:
         """Delete the selected scene"""
         if not selected_scenes:
-            return "No scene selected", self.get_scenes_list()
+            return "No scene selected"
             
         selected_title = selected_scenes[0][0]
-        self.db.delete_scene(selected_title)
-        self.scenes = self.db.get_scenes()  # Refresh the scenes list
+        with self.db.session() as db:
+            self.db.delete_scene(db, selected_title)
         
-        return f"Deleted scene: {selected_title}", self.get_scenes_list()
+        return f"Deleted scene: {selected_title}"
+    
+    def show_timeline(self, query: str) -> tuple:
+        """List scenes in story order, optionally limited to some days"""
+        try:
+            scenes = self.timeline.query(query) if query and query.strip() else self.timeline.chronological()
+        except ValueError as e:
+            return str(e), []
+        rows = [[s["day"], s["time"], s["title"], s["location"], ", ".join(s["characters"])] for s in scenes]
+        status = f"{len(rows)} scenes"
+        unscheduled = self.timeline.unscheduled()
+        if unscheduled and not (query and query.strip()):
+            status += f"; not on the timeline (day or time not understood): {', '.join(s['title'] for s in unscheduled)}"
+        return status, rows
+    
+    def find_near_duplicates(self, threshold: float) -> tuple:
+        """Scene outlines and draft passages that are nearly the same text"""
+        with self.db.session() as db:
+            pairs = self.db.find_near_duplicates(db, threshold)
+        def label(part):
+            if part["part"] == "outline":
+                return f"{part['title']} (outline)"
+            return f"{part['title']} ({part['type']} draft, passage {part['chunk'] + 1})"
+        rows = [[p["similarity"], label(p["a"]), label(p["b"]),
+                 "outline" if p["a"]["part"] == p["b"]["part"] == "outline" else "passage"] for p in pairs]
+        return f"{len(rows)} near-duplicate pairs at {threshold:.0%} similarity or more", rows
+    
+    def check_continuity(self) -> str:
+        """Report characters who are in two places at the same time"""
+        found = self.timeline.conflicts()
+        if not found:
+            return "No continuity conflicts found"
+        conflicts = [c for c in found if not c["possible"]]
+        possible = [c for c in found if c["possible"]]
+        lines = []
+        if conflicts:
+            lines.append(f"**{len(conflicts)} continuity conflicts**")
+            for c in conflicts:
+                lines.append(f"- {c['character']} is in *{c['scenes'][0]}* ({c['locations'][0]}) and "
+                             f"*{c['scenes'][1]}* ({c['locations'][1]}) at the same time on day {c['day']}")
+        if possible:
+            lines.append(f"**{len(possible)} possible conflicts** (a scene has no time)")
+            for c in possible:
+                lines.append(f"- {c['character']} is in *{c['scenes'][0]}* ({c['locations'][0]}) and "
+                             f"*{c['scenes'][1]}* ({c['locations'][1]}) on day {c['day']}")
+        return "\n".join(lines)
     
     def clear_form(self) -> tuple:
         """Clear all form fields"""
-        return "", "", "", "", "", [], "" 
\ No newline at end of file
+        return "", "", "", "", "", "", ""
+
+
+def _split_names(text: str) -> List[str]:
+    """Names from the comma separated characters field"""
+    return [name.strip() for name in text.split(",") if name.strip()] 
\ No newline at end of file
@@ -0,0 +1,120 @@
+import contextlib
+import functools
+import inspect
+import gradio as gr
+from typing import Dict, List
+from bookwright.utils.metrics import registry, Counter, Histogram, CACHE_LOOKUPS
+from bookwright.utils.query_guard import QueryGuard, GUARD_MODE, REQUEST_BUDGET
+
+HANDLER_SECONDS = registry.histogram("bookwright_handler_seconds", "Time spent in Gradio event handlers")
+HANDLER_ERRORS = registry.counter("bookwright_handler_errors_total", "Gradio event handlers that raised")
+
+# Units of the histograms not measured in seconds
+UNITS = {"bookwright_llm_tokens_per_second": "tokens/s"}
+
+def _guard(name: str):
+    """A query guard for one request in development mode, else a no-op"""
+    if GUARD_MODE in ("log", "raise"):
+        return QueryGuard(name, budget=REQUEST_BUDGET, raise_on_violation=GUARD_MODE == "raise")
+    return contextlib.nullcontext()
+
+def _timed(fn, name: str):
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def timed(*args, **kwargs):
+            with HANDLER_SECONDS.time(handler=name):
+                try:
+                    with _guard(name):
+                        return await fn(*args, **kwargs)
+                except Exception:
+                    HANDLER_ERRORS.inc(handler=name)
+                    raise
+    else:
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            with HANDLER_SECONDS.time(handler=name):
+                try:
+                    with _guard(name):
+                        return fn(*args, **kwargs)
+                except Exception:
+                    HANDLER_ERRORS.inc(handler=name)
+                    raise
+    return timed
+
+def instrument_events(blocks: gr.Blocks) -> None:
+    """Time every event handler of the app, labelled by its API name.
+
+    With BOOKWRIGHT_QUERY_GUARD set, each request also runs under a
+    QueryGuard that reports N+1 queries and over-budget requests.
+
+    Call once the whole interface is built. Generator handlers are left
+    alone, as are js-only events, which never reach the server.
+    """
+    for block_fn in blocks.fns.values():
+        fn = block_fn.fn
+        if fn is None or getattr(fn, "__wrapped__", None) is not None:
+            continue
+        if inspect.isgeneratorfunction(fn) or inspect.isasyncgenfunction(fn):
+            continue
+        block_fn.fn = _timed(fn, block_fn.api_name or block_fn.name)
+
+def _labels(key) -> str:
+    return ", ".join(f"{name}={value}" for name, value in key)
+
+def _scaled(value, scale: float):
+    return round(value * scale, 2) if value is not None else None
+
+def metric_tables() -> tuple:
+    """A cache summary, a row per histogram series and a row per counter series"""
+    histograms, counters = [], []
+    for metric in registry.metrics():
+        if isinstance(metric, Histogram):
+            # Latencies are shown in milliseconds, other histograms in their own unit
+            scale, unit = (1000, "ms") if metric.name.endswith("_seconds") else (1, UNITS.get(metric.name, ""))
+            for key, counts, total in metric.samples():
+                count = sum(counts)
+                histograms.append([metric.name, _labels(key), count, _scaled(total / count if count else None, scale),
+                                   _scaled(metric.quantile(0.5, counts), scale),
+                                   _scaled(metric.quantile(0.95, counts), scale), unit])
+        elif isinstance(metric, Counter):
+            for key, value in metric.samples():
+                counters.append([metric.name, _labels(key), value])
+    return _cache_summary(), histograms, counters
+
+def _cache_summary() -> str:
+    lookups: Dict[str, List[float]] = {}
+    for key, value in CACHE_LOOKUPS.samples():
+        labels = dict(key)
+        counts = lookups.setdefault(labels.get("entity", ""), [0, 0])
+        counts[0 if labels.get("result") == "hit" else 1] += value
+    if not lookups:
+        return "_No cache reads yet_"
+    rates = [f"{entity} {hits / (hits + misses):.0%} of {int(hits + misses)}"
+             for entity, (hits, misses) in sorted(lookups.items())]
+    return "**Cache hit rate:** " + ", ".join(rates)
+
+def stats_tab(metrics_url: str = None) -> None:
+    """Create the Stats tab: handler, query and LLM timings of this process"""
+    with gr.TabItem("Stats") as tab:
+        gr.Markdown("### Performance Stats")
+        if metrics_url:
+            gr.Markdown(f"Prometheus metrics are served at {metrics_url}")
+        refresh_button = gr.Button("Refresh")
+        cache_summary = gr.Markdown("")
+        timings = gr.Dataframe(
+            headers=["Metric", "Labels", "Count", "Mean", "p50", "p95", "Unit"],
+            datatype=["str", "str", "number", "number", "number", "number", "str"],
+            col_count=(7, "fixed"),
+            interactive=False,
+            label="Histograms"
+        )
+        totals = gr.Dataframe(
+            headers=["Metric", "Labels", "Total"],
+            datatype=["str", "str", "number"],
+            col_count=(3, "fixed"),
+            interactive=False,
+            label="Counters"
+        )
+        outputs = [cache_summary, timings, totals]
+        refresh_button.click(fn=metric_tables, inputs=[], outputs=outputs)
+        tab.select(fn=metric_tables, inputs=[], outputs=outputs)
@@ -0,0 +1,85 @@
+# bookwright/utils/async_database.py
+import asyncio
+from datetime import datetime
+from typing import AsyncContextManager, Dict, List, Optional, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.base import async_session
+from .database_manager import StoryDatabase
+from .record_cache import FrozenRecord
+
+
+class AsyncStoryDatabase:
+    """Async variant of the StoryDatabase API for async Gradio handlers.
+
+    Each call runs the StoryDatabase method on the AsyncSession's connection
+    (aiosqlite), so the event loop is free while SQLite works. Grouped writes
+    still pending on the shared session are committed first, in a worker
+    thread, since that commit is blocking. The wrapped
+    StoryDatabase's cache, revision log and change feed are shared with the
+    sync path; cache hits never touch the database at all.
+
+        async with async_db.session() as db:
+            await async_db.save_scene(db, scene)
+    """
+
+    def __init__(self, story_db: StoryDatabase):
+        self.sync = story_db
+
+    def session(self) -> AsyncContextManager[AsyncSession]:
+        """A new AsyncSession on this book's database, one per request"""
+        return async_session(self.sync.path)
+
+    async def _run(self, db: AsyncSession, method, *args):
+        # The separate session only sees committed rows; commit the pending
+        # group (a blocking fsync behind the shared session's lock) off the loop
+        if self.sync.uow.pending:
+            await asyncio.to_thread(self.sync.flush)
+        return await db.run_sync(method, *args)
+
+    async def save_book_info(self, db: AsyncSession, title: str, author: str, genre: str,
+                             summary: str, notes: str) -> None:
+        await self._run(db, self.sync.save_book_info, title, author, genre, summary, notes)
+
+    async def get_book_info(self, db: AsyncSession) -> Optional[FrozenRecord]:
+        return await self._run(db, self.sync.get_book_info)
+
+    async def save_character(self, db: AsyncSession, character_data: Dict) -> bool:
+        return await self._run(db, self.sync.save_character, character_data)
+
+    async def get_characters(self, db: AsyncSession) -> Sequence[FrozenRecord]:
+        return await self._run(db, self.sync.get_characters)
+
+    async def delete_character(self, db: AsyncSession, name: str) -> None:
+        await self._run(db, self.sync.delete_character, name)
+
+    async def save_scene(self, db: AsyncSession, scene_data: Dict) -> bool:
+        return await self._run(db, self.sync.save_scene, scene_data)
+
+    async def get_scenes(self, db: AsyncSession) -> Sequence[FrozenRecord]:
+        return await self._run(db, self.sync.get_scenes)
+
+    async def delete_scene(self, db: AsyncSession, title: str) -> None:
+        await self._run(db, self.sync.delete_scene, title)
+
+    async def save_chapter(self, db: AsyncSession, chapter_data: Dict) -> bool:
+        return await self._run(db, self.sync.save_chapter, chapter_data)
+
+    async def get_chapters(self, db: AsyncSession) -> Sequence[FrozenRecord]:
+        return await self._run(db, self.sync.get_chapters)
+
+    async def delete_chapter(self, db: AsyncSession, title: str) -> None:
+        await self._run(db, self.sync.delete_chapter, title)
+
+    async def get_revision_history(self, db: AsyncSession, entity_type: str, key: str) -> List[Dict]:
+        return await self._run(db, self.sync.get_revision_history, entity_type, key)
+
+    async def restore_entity(self, db: AsyncSession, entity_type: str, key: str,
+                             when: datetime) -> Optional[Dict]:
+        return await self._run(db, self.sync.restore_entity, entity_type, key, when)
+
+    async def save_draft(self, db: AsyncSession, entity_type: str, key: str, text: str) -> Dict:
+        return await self._run(db, self.sync.save_draft, entity_type, key, text)
+
+    async def get_draft_paragraphs(self, db: AsyncSession, entity_type: str, key: str,
+                                   start: int = 0, limit: Optional[int] = None) -> List[str]:
+        return await self._run(db, self.sync.get_draft_paragraphs, entity_type, key, start, limit)
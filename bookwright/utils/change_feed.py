@@ -0,0 +1,120 @@
+# bookwright/utils/change_feed.py
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from .record_cache import FrozenRecord
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeEvent(NamedTuple):
+    entity_type: Optional[str]  # book, character, scene or chapter; None for reset
+    op: str  # insert, update, delete or reset
+    key: Optional[str]  # name or title of the row
+    row: Optional[FrozenRecord]  # new row payload; None for delete and reset
+
+
+RESET = ChangeEvent(None, "reset", None, None)
+
+Listener = Callable[[ChangeEvent], None]
+
+
+class ChangeFeed:
+    """Publishes row-level changes made through StoryDatabase.
+
+    Events are published as soon as a write is applied to the session, the
+    same moment the read cache is patched. If a commit is rolled back a RESET
+    event tells every subscriber to reload.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners: List[Tuple[Optional[frozenset], Listener]] = []
+
+    def subscribe(self, listener: Listener, entity_types: Optional[Iterable[str]] = None) -> Callable[[], None]:
+        """Call listener for changes to the given entity types (all if None).
+
+        Returns a function that removes the subscription.
+        """
+        entry = (frozenset(entity_types) if entity_types is not None else None, listener)
+        with self._lock:
+            self._listeners.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._listeners:
+                    self._listeners.remove(entry)
+        return unsubscribe
+
+    def publish(self, event: ChangeEvent) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for entity_types, listener in listeners:
+            if entity_types is None or event.op == "reset" or event.entity_type in entity_types:
+                try:
+                    listener(event)
+                except Exception:
+                    # One broken subscriber must not stop the write or the others
+                    logger.exception("Change feed listener failed for %s", event)
+
+
+class FeedMirror:
+    """An in-memory copy of one entity type kept current by the change feed.
+
+    The first read loads the rows once; afterwards every event costs O(1)
+    instead of a full re-query.
+    """
+
+    def __init__(self, feed: ChangeFeed, entity_type: str, key_field: str,
+                 loader: Callable[[], Iterable[FrozenRecord]]):
+        self.entity_type = entity_type
+        self.key_field = key_field
+        self._loader = loader
+        self._lock = threading.RLock()
+        self._rows: Optional[Dict[str, FrozenRecord]] = None
+        self._view: Optional[Tuple[FrozenRecord, ...]] = None
+        self.version = 0
+        self.unsubscribe = feed.subscribe(self.apply, [entity_type])
+
+    def _ensure_loaded(self) -> Dict[str, FrozenRecord]:
+        with self._lock:
+            if self._rows is not None:
+                return self._rows
+            version = self.version
+        # Load without holding the lock: the loader takes the session lock,
+        # which writers hold while they publish to apply()
+        rows = {row[self.key_field]: row for row in self._loader()}
+        with self._lock:
+            if self._rows is None and self.version == version:
+                self._rows = rows
+                self._view = None
+            elif self._rows is not None:
+                return self._rows
+        # Otherwise a change raced with the load; serve it and reload next time
+        return rows
+
+    def apply(self, event: ChangeEvent) -> None:
+        with self._lock:
+            self.version += 1
+            self._view = None
+            if event.op == "reset":
+                self._rows = None  # Reload lazily on the next read
+            elif self._rows is None:
+                pass  # Not loaded yet; the first read will include this change
+            elif event.op == "delete":
+                self._rows.pop(event.key, None)
+            else:
+                self._rows[event.key] = event.row
+
+    def records(self) -> Tuple[FrozenRecord, ...]:
+        """All rows in insertion order"""
+        rows = self._ensure_loaded()
+        with self._lock:
+            if rows is not self._rows:
+                return tuple(rows.values())
+            if self._view is None:
+                self._view = tuple(rows.values())
+            return self._view
+
+    def get(self, key: str) -> Optional[FrozenRecord]:
+        return self._ensure_loaded().get(key)
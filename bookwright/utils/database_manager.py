@@ -1,16 +1,178 @@
 # bookwright/utils/database_manager.py
-from sqlalchemy.orm import Session
-from typing import List, Optional, Dict
-from ..models.models import Book, Character, Scene, Chapter
-from ..models.base import Base, engine
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm import Session, selectinload
+from typing import Iterator, List, Optional, Dict, Sequence, Tuple
+from datetime import datetime
+import json
+import logging
+import os
+import threading
+from ..models.models import Book, Character, Scene, Chapter, scene_chapter
+from ..models.base import Base, DATABASE_PATH, engines
+from ..models.migrations import ensure_schema
+from .project_registry import ProjectRegistry
+from .revision_history import RevisionLog
+from .unit_of_work import UnitOfWork, DEFAULT_WINDOW
+from .record_cache import EntityCache, FrozenRecord, freeze
+from .change_feed import ChangeFeed, ChangeEvent, FeedMirror, RESET
+from .draft_store import DraftStore
+from .relationship_index import RelationshipIndex
+from .mention_index import MentionIndex, SOURCE_MODELS
+from .near_duplicates import NearDuplicateIndex, DEFAULT_THRESHOLD
+from .jsonl_io import export_jsonl, import_jsonl
+from .snapshots import create_snapshot, list_snapshots, restore_snapshot
+from .paging import Listing, PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+BOOK_KEY = "book_info"
+
+# Seconds after a change to the cast or the text before mentions are rescanned
+MENTION_REFRESH_DELAY = 1.0
+
+# Field identifying a row of each entity type in caches and change events
+KEY_FIELDS = {"character": "name", "scene": "title", "chapter": "title"}
+
+# Entities that can own draft prose, keyed like KEY_FIELDS
+DRAFT_OWNERS = {"scene": Scene, "chapter": Chapter}
+
+# Paged tables of each entity type; sort and filter fields are indexed in models.py
+LISTINGS = {
+    "character": Listing(
+        Character,
+        {"name": Character.name, "role": Character.role},
+        sorts=["name", "role"],
+        search=["name", "aliases", "notes"],
+        filters=["role"]
+    ),
+    "scene": Listing(
+        Scene,
+        {"title": Scene.title, "location": Scene.location, "day": Scene.day, "time": Scene.time},
+        sorts=["title", "location", "day", "time"],
+        search=["title", "description", "location", "notes"],
+        filters=["location", "day"]
+    ),
+    "chapter": Listing(
+        Chapter,
+        {"title": Chapter.title,
+         "scene_count": select(func.count()).where(scene_chapter.c.chapter_id == Chapter.id).scalar_subquery()},
+        sorts=["title"],
+        search=["title", "description", "notes"]
+    ),
+}
+
+def _same(a, b) -> bool:
+    # Forms send "" for fields the database holds as NULL
+    return a == b or (a in (None, "") and b in (None, ""))
+
+def _changes(current: Dict, data: Dict, skip: Tuple[str, ...] = ()) -> Dict:
+    """The fields of data whose values differ from the current record"""
+    return {k: v for k, v in data.items() if k != "id" and k not in skip and not _same(current.get(k), v)}
+
+def _book_to_dict(book: Book) -> Dict:
+    return {
+        "title": book.title,
+        "author": book.author,
+        "genre": book.genre,
+        "summary": book.summary,
+        "notes": book.notes
+    }
+
+def _character_to_dict(c: Character) -> Dict:
+    return {
+        "id": c.id,
+        "name": c.name,
+        "role": c.role,
+        "physical_description": c.physical_description,
+        "personality_traits": c.personality_traits,
+        "background": c.background,
+        "motivation": c.motivation,
+        "relationships": c.relationships,
+        "skills": c.skills,
+        "notes": c.notes,
+        "aliases": c.aliases,
+        "age": c.age,
+        "gender": c.gender
+    }
+
+def _scene_to_dict(s: Scene) -> Dict:
+    return {
+        "id": s.id,
+        "title": s.title,
+        "description": s.description,
+        "location": s.location,
+        "day": s.day,
+        "time": s.time,
+        "characters": [c.name for c in s.characters],
+        "notes": s.notes
+    }
+
+def _chapter_to_dict(c: Chapter) -> Dict:
+    return {
+        "id": c.id,
+        "title": c.title,
+        "description": c.description,
+        "notes": c.notes,
+        "scenes": [s.title for s in c.scenes]
+    }
 
 class StoryDatabase:
-    def __init__(self):
+    def __init__(self, write_window: float = DEFAULT_WINDOW, path: Optional[str] = None,
+                 mention_delay: Optional[float] = MENTION_REFRESH_DELAY):
+        # Each book has its own SQLite file; engines are shared via the registry
+        self.path = path or DATABASE_PATH
+        self.engine = engines.engine(self.path)
         # Create all tables
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=self.engine)
+        ensure_schema(self.engine)
+        self.revisions = RevisionLog()
+        self.cache = EntityCache()
+        self.drafts = DraftStore()
+        self.mentions = MentionIndex(self.drafts)
+        self.uow = UnitOfWork(engines.sessionmaker(self.path), window=write_window)
+        self.uow.on_rollback(self.revisions.forget)
+        self.uow.on_rollback(self.cache.clear)
+        self.feed = ChangeFeed()
+        self.uow.on_rollback(lambda: self.feed.publish(RESET))
+        # MinHash signatures of outlines and draft passages, updated on save
+        self.duplicates = NearDuplicateIndex(self.drafts)
+        self.feed.subscribe(self.duplicates.apply, [])
+        # Character <-> scene <-> chapter adjacency for context queries
+        self.relationships = RelationshipIndex(self.feed, self._load_relationships)
+        # Mentions are rescanned in the background shortly after the cast or
+        # any text changes (None: only on read); reads rescan only if stale
+        self.mention_delay = mention_delay
+        self._mentions_stale = True
+        self._mention_timer: Optional[threading.Timer] = None
+        self._mention_lock = threading.Lock()
+        self.feed.subscribe(lambda event: self._mentions_changed(), ["character", "scene", "chapter"])
+    
+    def session(self) -> Iterator[Session]:
+        """Context manager yielding the shared, group-committed session"""
+        engines.touch(self.path)
+        return self.uow.session()
+    
+    def flush(self) -> None:
+        """Commit pending grouped writes; call before anything that must be durable"""
+        self.uow.flush()
+    
+    def wait_for_commit(self) -> None:
+        """Block until the writes made so far are committed with their group"""
+        self.uow.wait()
+    
+    def close(self) -> None:
+        """Commit pending writes, stop background mention refreshes and release the session"""
+        with self._mention_lock:
+            self.mention_delay = None  # No new refresh timers either
+            if self._mention_timer is not None:
+                self._mention_timer.cancel()
+                self._mention_timer = None
+        self.uow.close()
     
     def save_book_info(self, db: Session, title: str, author: str, genre: str, summary: str, notes: str) -> None:
+        self._sync_pending(db)
         book = db.query(Book).first()
+        is_new = book is None
         if book:
             book.title = title
             book.author = author
@@ -26,143 +188,544 @@ class StoryDatabase:
                 notes=notes
             )
             db.add(book)
-        db.commit()
+        state = _book_to_dict(book)
+        self.revisions.record(db, "book", BOOK_KEY, state)
+        self._apply_change("book", BOOK_KEY, state, is_new)
+        self._commit(db)
     
-    def get_book_info(self, db: Session) -> Optional[Dict]:
-        book = db.query(Book).first()
-        if book:
-            return {
-                "title": book.title,
-                "author": book.author,
-                "genre": book.genre,
-                "summary": book.summary,
-                "notes": book.notes
-            }
+    def get_book_info(self, db: Session) -> Optional[FrozenRecord]:
+        """Return the book info as a shared read-only record, or None"""
+        self._sync_pending(db)
+        def load():
+            book = db.query(Book).first()
+            return [_book_to_dict(book)] if book else []
+        records = self.cache.get("book", load)
+        if records:
+            return records[0]
         return None
     
-    def save_character(self, db: Session, character_data: Dict) -> None:
+    def save_character(self, db: Session, character_data: Dict, create: bool = True) -> bool:
+        """Create or update a character from the given fields; False if nothing changed.
+
+        With create=False a missing character raises ValueError instead of being added.
+        """
+        self._sync_pending(db)
         character = db.query(Character).filter(Character.name == character_data["name"]).first()
+        is_new = character is None
+        if is_new and not create:
+            raise ValueError(f"Unknown character: {character_data['name']}")
         if character:
-            for key, value in character_data.items():
+            # Only changed fields are written; an unchanged save writes nothing
+            changes = _changes(_character_to_dict(character), character_data)
+            if not changes:
+                return False
+            for key, value in changes.items():
                 setattr(character, key, value)
         else:
-            character = Character(**character_data)
+            # Records read from the cache carry their row id; it is never written back
+            character = Character(**{k: v for k, v in character_data.items() if k != "id"})
             db.add(character)
-        db.commit()
+            db.flush()  # Assigns the id published with the new row
+        state = _character_to_dict(character)
+        self.revisions.record(db, "character", character.name, state)
+        self._apply_change("character", character.name, state, is_new)
+        self._commit(db)
+        return True
     
-    def get_characters(self, db: Session) -> List[Dict]:
-        characters = db.query(Character).all()
-        return [{
-            "name": c.name,
-            "role": c.role,
-            "physical_description": c.physical_description,
-            "personality_traits": c.personality_traits,
-            "background": c.background,
-            "motivation": c.motivation,
-            "relationships": c.relationships,
-            "skills": c.skills,
-            "notes": c.notes
-        } for c in characters]
+    def get_characters(self, db: Session) -> Sequence[FrozenRecord]:
+        """Return all characters as a shared read-only snapshot"""
+        self._sync_pending(db)
+        return self.cache.get("character", lambda: [_character_to_dict(c) for c in db.query(Character).all()])
     
     def delete_character(self, db: Session, name: str) -> None:
+        self._sync_pending(db)
         character = db.query(Character).filter(Character.name == name).first()
         if character:
+            # Scenes lose this character from their cast, keep their history in step
+            scenes = (db.query(Scene).options(selectinload(Scene.characters))
+                      .filter(Scene.characters.any(Character.id == character.id)).all())
+            for scene in scenes:
+                state = _scene_to_dict(scene)
+                state["characters"] = [n for n in state["characters"] if n != name]
+                self.revisions.record(db, "scene", scene.title, state)
+                self._apply_change("scene", scene.title, state)
             db.delete(character)
-            db.commit()
+            self.revisions.record(db, "character", name, None)
+            self._apply_change("character", name, None)
+            self._commit(db)
     
-    def save_scene(self, db: Session, scene_data: Dict) -> None:
+    def save_scene(self, db: Session, scene_data: Dict, create: bool = True) -> bool:
+        """Create or update a scene from the given fields; False if nothing changed.
+
+        With create=False a missing scene raises ValueError instead of being added.
+        """
+        self._sync_pending(db)
         scene = db.query(Scene).filter(Scene.title == scene_data["title"]).first()
+        is_new = scene is None
+        if is_new and not create:
+            raise ValueError(f"Unknown scene: {scene_data['title']}")
         if scene:
-            for key, value in scene_data.items():
-                if key != "characters":  # Handle characters separately
-                    setattr(scene, key, value)
+            # Only changed fields are written; an unchanged save writes nothing
+            current = _scene_to_dict(scene)
+            changes = _changes(current, scene_data, ("characters",))
+            if not changes and list(scene_data.get("characters", current["characters"])) == current["characters"]:
+                return False
+            for key, value in changes.items():
+                setattr(scene, key, value)
         else:
-            scene = Scene(**{k: v for k, v in scene_data.items() if k != "characters"})
+            scene = Scene(**{k: v for k, v in scene_data.items() if k not in ("id", "characters")})
             db.add(scene)
+            db.flush()
         
         # Handle character relationships
-        if "characters" in scene_data:
-            characters = []
-            for char_name in scene_data["characters"]:
-                character = db.query(Character).filter(Character.name == char_name).first()
-                if character:
-                    characters.append(character)
-            scene.characters = characters
+        if "characters" in scene_data and (is_new or list(scene_data["characters"]) != current["characters"]):
+            names = list(scene_data["characters"])
+            by_name = {c.name: c for c in db.query(Character).filter(Character.name.in_(names))} if names else {}
+            scene.characters = [by_name[name] for name in names if name in by_name]
         
-        db.commit()
+        if is_new or "description" in changes or "notes" in changes:
+            self.duplicates.update_outline(db, scene.id, scene.description, scene.notes)
+        state = _scene_to_dict(scene)
+        self.revisions.record(db, "scene", scene.title, state)
+        self._apply_change("scene", scene.title, state, is_new)
+        self._commit(db)
+        return True
     
-    def get_scenes(self, db: Session) -> List[Dict]:
-        scenes = db.query(Scene).all()
-        return [{
-            "title": s.title,
-            "description": s.description,
-            "location": s.location,
-            "day": s.day,
-            "time": s.time,
-            "characters": [c.name for c in s.characters],
-            "notes": s.notes
-        } for s in scenes]
+    def get_scenes(self, db: Session) -> Sequence[FrozenRecord]:
+        """Return all scenes as a shared read-only snapshot"""
+        self._sync_pending(db)
+        # Characters are loaded for all scenes in one IN query, not one query per scene
+        return self.cache.get("scene", lambda: [
+            _scene_to_dict(s) for s in db.query(Scene).options(selectinload(Scene.characters)).all()])
     
     def delete_scene(self, db: Session, title: str) -> None:
+        self._sync_pending(db)
         scene = db.query(Scene).filter(Scene.title == title).first()
         if scene:
+            for chapter in scene.chapters:
+                state = _chapter_to_dict(chapter)
+                state["scenes"] = [t for t in state["scenes"] if t != title]
+                self.revisions.record(db, "chapter", chapter.title, state)
+                self._apply_change("chapter", chapter.title, state)
+            self.drafts.delete(db, "scene", scene.id)
             db.delete(scene)
-            db.commit()
+            self.duplicates.remove_owner(db, "scene", scene.id)
+            self.revisions.record(db, "scene", title, None)
+            self._apply_change("scene", title, None)
+            self._commit(db)
     
-    def save_chapter(self, db: Session, chapter_data: Dict) -> None:
+    def save_chapter(self, db: Session, chapter_data: Dict, create: bool = True) -> bool:
+        """Create or update a chapter from the given fields; False if nothing changed.
+
+        With create=False a missing chapter raises ValueError instead of being added.
+        """
+        self._sync_pending(db)
         chapter = db.query(Chapter).filter(Chapter.title == chapter_data["title"]).first()
+        is_new = chapter is None
+        if is_new and not create:
+            raise ValueError(f"Unknown chapter: {chapter_data['title']}")
         if chapter:
-            for key, value in chapter_data.items():
-                if key != "scenes":  # Handle scenes separately
-                    setattr(chapter, key, value)
+            # Only changed fields are written; an unchanged save writes nothing
+            current = _chapter_to_dict(chapter)
+            changes = _changes(current, chapter_data, ("scenes",))
+            if not changes and list(chapter_data.get("scenes", current["scenes"])) == current["scenes"]:
+                return False
+            for key, value in changes.items():
+                setattr(chapter, key, value)
         else:
-            chapter = Chapter(**{k: v for k, v in chapter_data.items() if k != "scenes"})
+            chapter = Chapter(**{k: v for k, v in chapter_data.items() if k not in ("id", "scenes")})
             db.add(chapter)
+            db.flush()
         
         # Handle scene relationships
-        if "scenes" in chapter_data:
-            scenes = []
-            for scene_title in chapter_data["scenes"]:
-                scene = db.query(Scene).filter(Scene.title == scene_title).first()
-                if scene:
-                    scenes.append(scene)
+        if "scenes" in chapter_data and (is_new or list(chapter_data["scenes"]) != current["scenes"]):
+            titles = list(chapter_data["scenes"])
+            by_title = {s.title: s for s in db.query(Scene).filter(Scene.title.in_(titles))} if titles else {}
+            scenes = [by_title[title] for title in titles if title in by_title]
             chapter.scenes = scenes
+            self._write_scene_positions(db, chapter, scenes)
         
-        db.commit()
+        state = _chapter_to_dict(chapter)
+        self.revisions.record(db, "chapter", chapter.title, state)
+        self._apply_change("chapter", chapter.title, state, is_new)
+        self._commit(db)
+        return True
     
-    def get_chapters(self, db: Session) -> List[Dict]:
-        chapters = db.query(Chapter).all()
-        return [{
-            "title": c.title,
-            "description": c.description,
-            "notes": c.notes,
-            "scenes": [s.title for s in c.scenes]
-        } for c in chapters]
+    def _write_scene_positions(self, db: Session, chapter: Chapter, scenes: List[Scene]) -> None:
+        """Store the order of a chapter's scenes on the association rows"""
+        db.flush()  # The association rows must exist before they are numbered
+        if scenes:
+            db.execute(
+                scene_chapter.update()
+                .where(scene_chapter.c.chapter_id == bindparam("chapter"),
+                       scene_chapter.c.scene_id == bindparam("scene"))
+                .values(position=bindparam("position")),
+                [{"chapter": chapter.id, "scene": scene.id, "position": position}
+                 for position, scene in enumerate(scenes)]
+            )
+    
+    def get_chapters(self, db: Session) -> Sequence[FrozenRecord]:
+        """Return all chapters as a shared read-only snapshot"""
+        self._sync_pending(db)
+        return self.cache.get("chapter", lambda: [
+            _chapter_to_dict(c) for c in db.query(Chapter).options(selectinload(Chapter.scenes)).all()])
     
     def delete_chapter(self, db: Session, title: str) -> None:
+        self._sync_pending(db)
         chapter = db.query(Chapter).filter(Chapter.title == title).first()
         if chapter:
+            self.drafts.delete(db, "chapter", chapter.id)
             db.delete(chapter)
+            self.duplicates.remove_owner(db, "chapter", chapter.id)
+            self.revisions.record(db, "chapter", title, None)
+            self._apply_change("chapter", title, None)
+            self._commit(db)
+    
+    # Paged tables
+    
+    def get_page(self, db: Session, entity_type: str, sort: str = "id", descending: bool = False,
+                 search: str = "", filters: Optional[Dict[str, str]] = None, after: Optional[List] = None,
+                 limit: int = PAGE_SIZE) -> Dict:
+        """One page of an entity table and the cursor of the next; see Listing.page"""
+        self._sync_pending(db)
+        return LISTINGS[entity_type].page(db, sort, descending, search, filters, after, limit)
+    
+    def get_filter_values(self, db: Session, entity_type: str, field: str) -> List[str]:
+        """Distinct values of a field an entity table can be filtered by"""
+        self._sync_pending(db)
+        return LISTINGS[entity_type].values(db, field)
+    
+    def _apply_change(self, entity_type: str, key: str, state: Optional[Dict], is_new: bool = False) -> None:
+        """Patch the read cache and publish the change; state None means deleted"""
+        if state is None:
+            self.cache.remove(entity_type, KEY_FIELDS[entity_type], key)
+            self.feed.publish(ChangeEvent(entity_type, "delete", key, None))
+            return
+        row = freeze(state)
+        if entity_type == "book":
+            self.cache.replace("book", [row])
+        else:
+            self.cache.upsert(entity_type, KEY_FIELDS[entity_type], row)
+        self.feed.publish(ChangeEvent(entity_type, "insert" if is_new else "update", key, row))
+    
+    def mirror(self, entity_type: str) -> FeedMirror:
+        """Return an in-memory copy of a table kept current by the change feed"""
+        loaders = {
+            "character": self.get_characters,
+            "scene": self.get_scenes,
+            "chapter": self.get_chapters
+        }
+        loader = loaders[entity_type]
+        def load():
+            with self.session() as db:
+                return loader(db)
+        return FeedMirror(self.feed, entity_type, KEY_FIELDS[entity_type], load)
+    
+    def _load_relationships(self):
+        with self.session() as db:
+            return self.get_characters(db), self.get_scenes(db), self.get_chapters(db)
+    
+    def _commit(self, db: Session) -> None:
+        if self.uow.owns(db):
+            # Grouped with other writes in the current window
+            self.uow.mark_dirty()
+            return
+        try:
             db.commit()
+        except Exception:
+            db.rollback()
+            self.revisions.forget()
+            self.cache.clear()
+            self.feed.publish(RESET)
+            raise
+    
+    def _sync_pending(self, db: Session) -> None:
+        # The shared session autoflushes; any other session only sees
+        # committed data, so commit the pending group before it reads or writes.
+        if self.uow.pending and not self.uow.owns(db):
+            self.uow.flush()
+    
+    # Draft prose, stored apart from the entity rows so list reads never load it
+    
+    def _draft_owner_id(self, db: Session, entity_type: str, key: str) -> int:
+        self._sync_pending(db)
+        model = DRAFT_OWNERS.get(entity_type)
+        if model is None:
+            raise ValueError(f"Drafts are not kept for {entity_type}")
+        owner_id = db.query(model.id).filter(model.title == key).scalar()
+        if owner_id is None:
+            raise ValueError(f"Unknown {entity_type}: {key}")
+        return owner_id
+    
+    def save_draft(self, db: Session, entity_type: str, key: str, text: str) -> Dict:
+        """Replace the draft of a scene or chapter and return its counts"""
+        owner_id = self._draft_owner_id(db, entity_type, key)
+        info = self.drafts.save(db, entity_type, owner_id, text)
+        self.duplicates.update_drafts(db, entity_type, owner_id)
+        self._commit(db)
+        self._mentions_changed()
+        return info
+    
+    def save_draft_paragraphs(self, db: Session, entity_type: str, key: str,
+                              start: int, count: int, text: str) -> Dict:
+        """Replace count paragraphs from start, e.g. one edited page of a draft"""
+        owner_id = self._draft_owner_id(db, entity_type, key)
+        info = self.drafts.replace_paragraphs(db, entity_type, owner_id, start, count, text)
+        self.duplicates.update_drafts(db, entity_type, owner_id)
+        self._commit(db)
+        self._mentions_changed()
+        return info
+    
+    def get_draft_info(self, db: Session, entity_type: str, key: str) -> Dict:
+        """Paragraph, word and chunk counts of a draft"""
+        return self.drafts.info(db, entity_type, self._draft_owner_id(db, entity_type, key))
+    
+    def get_draft_paragraphs(self, db: Session, entity_type: str, key: str,
+                             start: int = 0, limit: Optional[int] = None) -> List[str]:
+        """Return a page of paragraphs, reading only the chunks that hold it"""
+        stop = start + limit if limit is not None else None
+        owner_id = self._draft_owner_id(db, entity_type, key)
+        return list(self.drafts.iter_paragraphs(db, entity_type, owner_id, start, stop))
+    
+    def get_draft_digests(self, db: Session, entity_type: str) -> Dict[str, Tuple[str, ...]]:
+        """Map each scene or chapter title to its draft's chunk digests, without reading prose"""
+        self._sync_pending(db)
+        model = DRAFT_OWNERS[entity_type]
+        digests = self.drafts.digests(db, entity_type)
+        if not digests:
+            return {}
+        titles = dict(db.query(model.id, model.title).filter(model.id.in_(list(digests))))
+        return {titles[owner_id]: d for owner_id, d in digests.items() if owner_id in titles}
+    
+    def iter_draft(self, db: Session, entity_type: str, key: str) -> Iterator[str]:
+        """Stream a whole draft paragraph by paragraph"""
+        return self.drafts.iter_paragraphs(db, entity_type, self._draft_owner_id(db, entity_type, key))
+    
+    # Near-duplicate outlines and passages
+    
+    def find_near_duplicates(self, db: Session, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+        """Pairs of scene outlines or draft passages that are nearly the same text"""
+        self._sync_pending(db)
+        pairs = self.duplicates.pairs(db, threshold)
+        titles = {}
+        for owner_type, model in DRAFT_OWNERS.items():
+            ids = list({k[1] for pair in pairs for k in pair[:2] if k[0] == owner_type})
+            titles[owner_type] = dict(db.query(model.id, model.title).filter(model.id.in_(ids))) if ids else {}
+        def describe(key):
+            owner_type, owner_id, part, seq = key
+            return {"type": owner_type, "title": titles[owner_type].get(owner_id), "part": part, "chunk": seq}
+        return [{"a": describe(a), "b": describe(b), "similarity": similarity} for a, b, similarity in pairs]
+    
+    def refresh_duplicates(self, db: Session) -> int:
+        """Recompute the signatures of outlines and passages that changed; returns how many"""
+        self._sync_pending(db)
+        computed = self.duplicates.refresh(db)
+        self._commit(db)
+        return computed
+    
+    # Character mentions
+    
+    def _mentions_changed(self) -> None:
+        self._mentions_stale = True
+        if self.mention_delay is None:
+            return
+        with self._mention_lock:
+            if self._mention_timer is None:
+                self._mention_timer = threading.Timer(self.mention_delay, self._refresh_mentions_later)
+                self._mention_timer.daemon = True
+                self._mention_timer.start()
+    
+    def _refresh_mentions_later(self) -> None:
+        with self._mention_lock:
+            self._mention_timer = None
+        try:
+            with self.session() as db:
+                self.refresh_mentions(db)
+        except Exception:
+            # The index stays stale, so the next read rescans
+            logger.exception("Background mention refresh failed")
+    
+    def refresh_mentions(self, db: Session) -> Dict:
+        """Rescan text and names that changed since the last refresh"""
+        self._sync_pending(db)
+        self._mentions_stale = False
+        try:
+            summary = self.mentions.refresh(db)
+        except Exception:
+            self._mentions_stale = True
+            raise
+        if summary["sources_scanned"] or summary["characters_rescanned"]:
+            self._commit(db)
+        return summary
+    
+    def get_mentions(self, db: Session, name: str) -> List[Dict]:
+        """Everywhere a character is named, by source"""
+        if self._mentions_stale:
+            self.refresh_mentions(db)
+        character = db.query(Character.id).filter(Character.name == name).scalar()
+        if character is None:
+            return []
+        mentions = self.mentions.mentions(db, character)
+        titles = {}
+        for source_type in {m.source_type for m in mentions}:
+            model = SOURCE_MODELS[source_type]
+            key = model.name if source_type == "character" else model.title
+            ids = list({m.source_id for m in mentions if m.source_type == source_type})
+            titles[source_type] = dict(db.query(model.id, key).filter(model.id.in_(ids)))
+        return [{
+            "source_type": m.source_type,
+            "source": titles[m.source_type].get(m.source_id),
+            "field": m.field,
+            "paragraph": m.paragraph,
+            "start": m.start,
+            "end": m.end,
+            "matched": m.matched
+        } for m in mentions]
+    
+    def get_mention_counts(self, db: Session) -> Dict[str, int]:
+        """Number of mentions per character name"""
+        if self._mentions_stale:
+            self.refresh_mentions(db)
+        counts = self.mentions.counts(db)
+        return {name: counts.get(cid, 0) for cid, name in db.query(Character.id, Character.name)}
+    
+    # Revision history
+    
+    def get_revision_history(self, db: Session, entity_type: str, key: str) -> List[Dict]:
+        """List the stored revisions of a book, character, scene or chapter"""
+        if entity_type == "book":
+            key = BOOK_KEY
+        self._sync_pending(db)
+        return self.revisions.history(db, entity_type, key)
+    
+    def restore_entity(self, db: Session, entity_type: str, key: str, when: datetime) -> Optional[Dict]:
+        """Restore one entity to its state at the given time and return that state.
+
+        The restore is itself recorded as a new revision, so it can be undone.
+        """
+        if entity_type == "book":
+            key = BOOK_KEY
+        self._sync_pending(db)
+        state = self.revisions.state_at(db, entity_type, key, when)
+        self._write_state(db, entity_type, key, state)
+        return state
+    
+    def restore_book(self, db: Session, when: datetime) -> Dict[str, int]:
+        """Restore every tracked entity to its state at the given time"""
+        self._sync_pending(db)
+        states = {}
+        for entity_type, key in self.revisions.tracked_entities(db):
+            states[(entity_type, key)] = self.revisions.state_at(db, entity_type, key, when)
+        
+        # Parents before children on save, children before parents on delete
+        counts = {"restored": 0, "deleted": 0}
+        for entity_type in ("character", "scene", "chapter", "book"):
+            for (kind, key), state in states.items():
+                if kind == entity_type and state is not None:
+                    self._write_state(db, kind, key, state)
+                    counts["restored"] += 1
+        for entity_type in ("chapter", "scene", "character"):
+            for (kind, key), state in states.items():
+                if kind == entity_type and state is None:
+                    self._write_state(db, kind, key, None)
+                    counts["deleted"] += 1
+        return counts
+    
+    def _write_state(self, db: Session, entity_type: str, key: str, state: Optional[Dict]) -> None:
+        if entity_type == "book":
+            if state is not None:
+                self.save_book_info(db, state.get("title"), state.get("author"), state.get("genre"),
+                                    state.get("summary"), state.get("notes"))
+        elif entity_type == "character":
+            if state is None:
+                self.delete_character(db, key)
+            else:
+                self.save_character(db, state)
+        elif entity_type == "scene":
+            if state is None:
+                self.delete_scene(db, key)
+            else:
+                self.save_scene(db, state)
+        elif entity_type == "chapter":
+            if state is None:
+                self.delete_chapter(db, key)
+            else:
+                self.save_chapter(db, state)
+        else:
+            raise ValueError(f"Unknown entity type: {entity_type}")
+
+projects = ProjectRegistry()
+_databases: Dict[str, StoryDatabase] = {}
+_databases_lock = threading.Lock()
+
+def get_story_database(book_id: Optional[str] = None) -> StoryDatabase:
+    """Return the shared StoryDatabase of a book, or of the default database.
+
+    There must be one StoryDatabase per file for its cache and change feed to
+    see every write, so all callers should route through here.
+    """
+    path = projects.path_for(book_id) if book_id else DATABASE_PATH
+    key = os.path.abspath(path)
+    with _databases_lock:
+        story_db = _databases.get(key)
+        if story_db is None:
+            story_db = _databases[key] = StoryDatabase(path=path)
+        return story_db
+
+def close_story_database(book_id: Optional[str] = None, registry: Optional[ProjectRegistry] = None) -> None:
+    """Flush and close a book's shared StoryDatabase and its connections.
+
+    Call before moving or deleting the file; a later get_story_database()
+    opens it afresh. registry is the one the book is listed in, if not
+    the shared one.
+    """
+    path = (registry or projects).path_for(book_id) if book_id else DATABASE_PATH
+    with _databases_lock:
+        story_db = _databases.pop(os.path.abspath(path), None)
+    if story_db is not None:
+        story_db.close()
+    engines.close(path)
 
 class DatabaseManager:
-    def __init__(self, scenes_manager, characters_manager, chapters_manager):
+    def __init__(self, scenes_manager, characters_manager, chapters_manager, db: Optional[StoryDatabase] = None):
         self.scenes_manager = scenes_manager
         self.characters_manager = characters_manager
         self.chapters_manager = chapters_manager
-        self.db = StoryDatabase()
+        # Share one StoryDatabase per file so its cache sees every write
+        self.db = db or get_story_database()
     
     def export_data(self) -> Dict:
         """Export all data as a JSON-compatible dictionary"""
-        return {
-            "export_date": datetime.now().isoformat(),
-            "book_info": self.db.get_book_info(),
-            "scenes": self.db.get_scenes(),
-            "characters": self.db.get_characters(),
-            "chapters": self.db.get_chapters()
-        }
+        self.db.flush()
+        with self.db.session() as db:
+            return {
+                "export_date": datetime.now().isoformat(),
+                "book_info": self.db.get_book_info(db),
+                "scenes": self.db.get_scenes(db),
+                "characters": self.db.get_characters(db),
+                "chapters": self.db.get_chapters(db)
+            }
     
     def export_to_json(self) -> str:
         """Export all data as a JSON string"""
         data = self.export_data()
         return json.dumps(data, indent=2)
+    
+    def export_to_file(self, path: str) -> Dict[str, int]:
+        """Stream all data to a JSON Lines file and return record counts"""
+        return export_jsonl(self.db, path)
+    
+    def import_from_file(self, path: str) -> Dict[str, int]:
+        """Merge a JSON Lines export into the book in batched transactions"""
+        return import_jsonl(self.db, path)
+    
+    def create_snapshot(self, label: Optional[str] = None, compress: bool = False) -> str:
+        """Take a consistent binary copy of the book and return its path"""
+        return create_snapshot(self.db, label=label, compress=compress)
+    
+    def list_snapshots(self) -> List[Dict]:
+        return list_snapshots(self.db)
+    
+    def restore_snapshot(self, path: str) -> Optional[str]:
+        """Restore a snapshot, returning the snapshot of the state it replaced"""
+        return restore_snapshot(self.db, path)
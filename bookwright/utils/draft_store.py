@@ -0,0 +1,171 @@
+# bookwright/utils/draft_store.py
+import hashlib
+import re
+import zlib
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from ..models.models import DraftChunk
+
+# Target size of a chunk in characters (~1,500 words). Chunks hold whole
+# paragraphs, so one may exceed this when a single paragraph does.
+CHUNK_SIZE = 8192
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SEPARATOR = "\n\n"
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split prose on blank lines, dropping empty paragraphs"""
+    text = (text or "").replace("\r\n", "\n")
+    return [p.strip() for p in _PARAGRAPH_BREAK.split(text) if p.strip()]
+
+
+def _pack(paragraphs: List[str], chunk_size: int) -> List[List[str]]:
+    groups: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for paragraph in paragraphs:
+        if current and size + len(paragraph) > chunk_size:
+            groups.append(current)
+            current, size = [], 0
+        current.append(paragraph)
+        size += len(paragraph) + len(_SEPARATOR)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _decode(payload: bytes) -> List[str]:
+    return zlib.decompress(payload).decode("utf-8").split(_SEPARATOR)
+
+
+class DraftStore:
+    """Chapter and scene prose kept as compressed, paragraph-aligned chunks.
+
+    Chunk metadata (paragraph range, word count, digest) is queried without
+    the payload, so callers can page through a draft while decompressing only
+    the chunks they show. Saving rewrites only chunks whose text changed.
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def _chunks(self, db: Session, owner_type: str, owner_id: int) -> List[DraftChunk]:
+        # payload is a deferred column, so this loads metadata only
+        return (db.query(DraftChunk)
+                .filter(DraftChunk.owner_type == owner_type, DraftChunk.owner_id == owner_id)
+                .order_by(DraftChunk.seq)
+                .all())
+
+    def _payload(self, db: Session, chunk_id: int) -> List[str]:
+        # Read the blob with a column query so it is not kept in the session
+        return _decode(db.query(DraftChunk.payload).filter(DraftChunk.id == chunk_id).scalar())
+
+    def info(self, db: Session, owner_type: str, owner_id: int) -> Dict:
+        """Paragraph, word and chunk counts of a draft, without reading prose"""
+        chunks = self._chunks(db, owner_type, owner_id)
+        return {
+            "paragraphs": sum(c.paragraph_count for c in chunks),
+            "words": sum(c.word_count for c in chunks),
+            "chunks": len(chunks)
+        }
+
+    def iter_paragraphs(self, db: Session, owner_type: str, owner_id: int,
+                        start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+        """Yield paragraphs start..stop, decompressing one chunk at a time"""
+        for chunk in self._chunks(db, owner_type, owner_id):
+            if chunk.first_paragraph + chunk.paragraph_count <= start:
+                continue
+            if stop is not None and chunk.first_paragraph >= stop:
+                return
+            for index, paragraph in enumerate(self._payload(db, chunk.id), chunk.first_paragraph):
+                if stop is not None and index >= stop:
+                    return
+                if index >= start:
+                    yield paragraph
+
+    def iter_chunks(self, db: Session, owner_type: str, owner_id: int,
+                    seqs: Optional[Set[int]] = None) -> Iterator[Tuple[int, str, List[str]]]:
+        """Yield (seq, digest, paragraphs) per chunk, decompressing only the chunks in seqs"""
+        for chunk in self._chunks(db, owner_type, owner_id):
+            if seqs is None or chunk.seq in seqs:
+                yield chunk.seq, chunk.digest, self._payload(db, chunk.id)
+
+    def load(self, db: Session, owner_type: str, owner_id: int) -> str:
+        """Return the whole draft as text"""
+        return _SEPARATOR.join(self.iter_paragraphs(db, owner_type, owner_id))
+
+    def save(self, db: Session, owner_type: str, owner_id: int, text: str) -> Dict:
+        """Replace the whole draft; unchanged chunks are left untouched"""
+        chunks = self._chunks(db, owner_type, owner_id)
+        self._rewrite(db, owner_type, owner_id, chunks, 0, len(chunks), split_paragraphs(text))
+        return self.info(db, owner_type, owner_id)
+
+    def replace_paragraphs(self, db: Session, owner_type: str, owner_id: int,
+                           start: int, count: int, text: str) -> Dict:
+        """Replace paragraphs start..start+count with text, touching only their chunks.
+
+        Used to save a page of a draft that was opened with iter_paragraphs.
+        """
+        chunks = self._chunks(db, owner_type, owner_id)
+        if not chunks:
+            return self.save(db, owner_type, owner_id, text)
+        end = start + count
+        lo = next((i for i, c in enumerate(chunks)
+                   if c.first_paragraph + c.paragraph_count > start), len(chunks) - 1)
+        hi = lo + 1
+        while hi < len(chunks) and chunks[hi].first_paragraph < end:
+            hi += 1
+        paragraphs: List[str] = []
+        for chunk in chunks[lo:hi]:
+            paragraphs.extend(self._payload(db, chunk.id))
+        offset = start - chunks[lo].first_paragraph
+        paragraphs[offset:offset + count] = split_paragraphs(text)
+        self._rewrite(db, owner_type, owner_id, chunks, lo, hi, paragraphs)
+        return self.info(db, owner_type, owner_id)
+
+    def digests(self, db: Session, owner_type: str) -> Dict[int, Tuple[str, ...]]:
+        """Chunk digests of every draft of one owner type; changes whenever the text does"""
+        rows = (db.query(DraftChunk.owner_id, DraftChunk.digest)
+                .filter(DraftChunk.owner_type == owner_type)
+                .order_by(DraftChunk.owner_id, DraftChunk.seq))
+        digests: Dict[int, List[str]] = {}
+        for owner_id, digest in rows:
+            digests.setdefault(owner_id, []).append(digest)
+        return {owner_id: tuple(chunk_digests) for owner_id, chunk_digests in digests.items()}
+
+    def delete(self, db: Session, owner_type: str, owner_id: int) -> None:
+        for chunk in self._chunks(db, owner_type, owner_id):
+            db.delete(chunk)
+
+    def _rewrite(self, db: Session, owner_type: str, owner_id: int, chunks: List[DraftChunk],
+                 lo: int, hi: int, paragraphs: List[str]) -> None:
+        """Store paragraphs in place of chunks[lo:hi] and renumber the chunks after them"""
+        groups = _pack(paragraphs, self.chunk_size)
+        old = chunks[lo:hi]
+        first_paragraph = chunks[lo].first_paragraph if lo < len(chunks) else 0
+        seq = lo
+        for index, group in enumerate(groups):
+            body = _SEPARATOR.join(group)
+            digest = hashlib.sha1(body.encode("utf-8")).hexdigest()
+            chunk = old[index] if index < len(old) else None
+            if chunk is None:
+                chunk = DraftChunk(owner_type=owner_type, owner_id=owner_id)
+                db.add(chunk)
+            if chunk.digest != digest:
+                chunk.payload = zlib.compress(body.encode("utf-8"), 6)
+                chunk.digest = digest
+                chunk.word_count = sum(len(p.split()) for p in group)
+            chunk.paragraph_count = len(group)
+            chunk.first_paragraph = first_paragraph
+            chunk.seq = seq
+            first_paragraph += len(group)
+            seq += 1
+        for chunk in old[len(groups):]:
+            db.delete(chunk)
+        # Later chunks keep their payload; only their position moves
+        for chunk in chunks[hi:]:
+            chunk.first_paragraph = first_paragraph
+            chunk.seq = seq
+            first_paragraph += chunk.paragraph_count
+            seq += 1
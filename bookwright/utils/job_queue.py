@@ -0,0 +1,301 @@
+# bookwright/utils/job_queue.py
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from ..models.base import engines
+from ..models.models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+# Progress is written at most this often per job; the final state always is
+PROGRESS_INTERVAL = 0.5
+# Idle workers also look for jobs queued by another process this often
+POLL_INTERVAL = 2.0
+# A running job re-reads its cancel flag this often, to see a cancel from another process
+CANCEL_POLL_INTERVAL = 1.0
+# A queue renews the lease of its running jobs this often; a job whose lease
+# is LEASE_SECONDS old is taken to have lost its process and is requeued
+HEARTBEAT_INTERVAL = 10.0
+LEASE_SECONDS = 60.0
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job by JobContext.check() once cancellation is requested"""
+
+
+def _job_to_dict(job: Job) -> Dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "params": json.loads(job.params) if job.params else {},
+        "status": job.status,
+        "progress": job.progress,
+        "message": job.message,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+
+class JobContext:
+    """Handed to a running job to report progress and notice cancellation"""
+
+    def __init__(self, queue: "JobQueue", job_id: int, cancel: threading.Event):
+        self.queue = queue
+        self.job_id = job_id
+        self._cancel = cancel
+        self._written = 0.0
+        self._polled = time.monotonic()  # The flag was read when the job was claimed
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._cancel.is_set():
+            self._poll()
+        return self._cancel.is_set()
+
+    def check(self) -> None:
+        """Stop here if the job was cancelled; call between units of work"""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def _poll(self) -> None:
+        """Pick up a cancel requested through another process's queue"""
+        now = time.monotonic()
+        if now - self._polled < CANCEL_POLL_INTERVAL:
+            return
+        self._polled = now
+        try:
+            requested = self.queue._cancel_requested(self.job_id)
+        except Exception:
+            logger.exception("Could not read the cancel flag of job %d", self.job_id)
+            return
+        if requested:
+            self._cancel.set()
+
+    def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        now = time.monotonic()
+        if now - self._written < PROGRESS_INTERVAL and fraction < 1:
+            return
+        self._written = now
+        values = {"progress": max(0.0, min(1.0, fraction))}
+        if message is not None:
+            values["message"] = message
+        self.queue._update(self.job_id, **values)
+
+
+class JobQueue:
+    """A persistent job queue in a book's SQLite file, run by worker threads.
+
+    Jobs are rows of the jobs table, so they outlive the process. Several
+    processes may run queues on one file: a running job carries its queue's
+    owner id and a heartbeat, and only jobs whose lease expired (their
+    process died) are put back, so handlers should be safe to re-run
+    (skipping work already saved). Handlers are registered
+    per kind and called as handler(context, **params); what they return is
+    stored as the job's JSON result.
+    """
+
+    def __init__(self, path: str, workers: int = DEFAULT_WORKERS):
+        self.path = path
+        self.workers = workers
+        self._handlers: Dict[str, Callable] = {}
+        self._wake = threading.Condition()
+        self._cancel: Dict[int, threading.Event] = {}
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._stopped = threading.Event()
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @contextmanager
+    def _session(self) -> Iterator[Session]:
+        engines.touch(self.path)
+        db = engines.sessionmaker(self.path)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def register(self, kind: str, handler: Callable) -> None:
+        self._handlers[kind] = handler
+
+    @property
+    def kinds(self) -> List[str]:
+        return list(self._handlers)
+
+    def start(self) -> None:
+        """Requeue jobs whose process died and start the workers"""
+        if self._threads:
+            return
+        self._requeue_expired()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"bookwright-job-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="bookwright-job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Ask running jobs to stop and wait for the workers; stopped jobs are requeued at next start"""
+        self._stopping = True
+        self._stopped.set()
+        for event in list(self._cancel.values()):
+            event.set()
+        with self._wake:
+            self._wake.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, kind: str, **params) -> int:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        with self._session() as db:
+            job = Job(kind=kind, params=json.dumps(params), status=QUEUED, progress=0.0, message="Queued")
+            db.add(job)
+            db.commit()
+            job_id = job.id
+        with self._wake:
+            self._wake.notify()
+        return job_id
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued job at once, or ask a running one to stop; False if already finished.
+
+        A job running in this process sees the request at its next check();
+        one running in another process within CANCEL_POLL_INTERVAL of it.
+        """
+        with self._session() as db:
+            if db.query(Job).filter(Job.id == job_id, Job.status == QUEUED).update(
+                    {"status": CANCELLED, "message": "Cancelled", "finished_at": datetime.utcnow()},
+                    synchronize_session=False):
+                db.commit()
+                return True
+            requested = db.query(Job).filter(Job.id == job_id, Job.status == RUNNING).update(
+                {"cancel_requested": 1, "message": "Cancelling"}, synchronize_session=False)
+            db.commit()
+        event = self._cancel.get(job_id)
+        if event is not None:
+            event.set()
+        return bool(requested)
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        with self._session() as db:
+            job = db.get(Job, job_id)
+            return _job_to_dict(job) if job else None
+
+    def list(self, limit: int = 50) -> List[Dict]:
+        """Most recent jobs first"""
+        with self._session() as db:
+            return [_job_to_dict(j) for j in db.query(Job).order_by(Job.id.desc()).limit(limit)]
+
+    def active(self) -> int:
+        """Number of queued and running jobs"""
+        with self._session() as db:
+            return db.query(Job).filter(Job.status.in_(ACTIVE)).count()
+
+    def _cancel_requested(self, job_id: int) -> bool:
+        with self._session() as db:
+            return bool(db.query(Job.cancel_requested).filter(Job.id == job_id).scalar())
+
+    def _update(self, job_id: int, **values) -> None:
+        with self._session() as db:
+            db.query(Job).filter(Job.id == job_id).update(values, synchronize_session=False)
+            db.commit()
+
+    def _requeue_expired(self) -> int:
+        """Put back running jobs whose owner stopped renewing their lease"""
+        expired = datetime.utcnow() - timedelta(seconds=LEASE_SECONDS)
+        with self._session() as db:
+            requeued = db.query(Job).filter(
+                Job.status == RUNNING,
+                or_(Job.heartbeat_at.is_(None), Job.heartbeat_at < expired)
+            ).update({"status": QUEUED, "owner": None, "message": "Requeued after its process stopped"},
+                     synchronize_session=False)
+            db.commit()
+        if requeued:
+            logger.info("Requeued %d interrupted jobs", requeued)
+        return requeued
+
+    def _heartbeat(self) -> None:
+        """Renew the lease of this queue's running jobs and reclaim expired ones"""
+        while not self._stopped.wait(HEARTBEAT_INTERVAL):
+            try:
+                with self._session() as db:
+                    db.query(Job).filter(Job.owner == self.owner, Job.status == RUNNING).update(
+                        {"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+                    db.commit()
+                self._requeue_expired()
+            except Exception:
+                logger.exception("Could not renew job leases")
+
+    def _claim(self) -> Optional[Job]:
+        """Take the oldest queued job; the status check keeps two workers off the same one"""
+        with self._session() as db:
+            while True:
+                job = db.query(Job).filter(Job.status == QUEUED).order_by(Job.id).first()
+                if job is None:
+                    return None
+                claimed = db.query(Job).filter(Job.id == job.id, Job.status == QUEUED).update(
+                    {"status": RUNNING, "started_at": datetime.utcnow(), "message": "Started",
+                     "owner": self.owner, "heartbeat_at": datetime.utcnow()},
+                    synchronize_session=False)
+                db.commit()
+                if claimed:
+                    db.refresh(job)
+                    db.expunge(job)
+                    return job
+
+    def _work(self) -> None:
+        while not self._stopping:
+            try:
+                job = self._claim()
+            except Exception:
+                logger.exception("Could not claim a job")
+                job = None
+            if job is None:
+                with self._wake:
+                    self._wake.wait(POLL_INTERVAL)
+                continue
+            self._run(job)
+
+    def _run(self, job: Job) -> None:
+        cancel = self._cancel[job.id] = threading.Event()
+        if job.cancel_requested:
+            cancel.set()
+        context = JobContext(self, job.id, cancel)
+        try:
+            handler = self._handlers.get(job.kind)
+            if handler is None:
+                raise ValueError(f"Unknown job kind: {job.kind}")
+            result = handler(context, **json.loads(job.params or "{}"))
+        except JobCancelled:
+            if self._stopping:
+                # Shutting down, not cancelled by anyone: run again next start
+                self._update(job.id, status=QUEUED, message="Requeued after shutdown")
+            else:
+                self._update(job.id, status=CANCELLED, message="Cancelled", finished_at=datetime.utcnow())
+        except Exception as e:
+            logger.exception("Job %d (%s) failed", job.id, job.kind)
+            self._update(job.id, status=FAILED, error=str(e) or type(e).__name__, message="Failed",
+                         finished_at=datetime.utcnow())
+        else:
+            self._update(job.id, status=DONE, progress=1.0, message="Done",
+                         result=json.dumps(result, default=str), finished_at=datetime.utcnow())
+        finally:
+            self._cancel.pop(job.id, None)
@@ -0,0 +1,195 @@
+# bookwright/utils/jsonl_io.py
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import IO, Dict, Iterable, Iterator, List, Union
+from sqlalchemy import literal_column, select
+from sqlalchemy.engine import Connection
+from ..models.models import Book, Character, Scene, Chapter, DraftChunk, character_scene, scene_chapter
+from .draft_store import _decode, _SEPARATOR
+from .change_feed import RESET
+
+FORMAT = "bookwright-jsonl"
+FORMAT_VERSION = 1
+
+# Rows fetched per round trip on export, and records per transaction on import
+BATCH_SIZE = 500
+
+# Order matters on import: scenes reference characters, chapters reference
+# scenes and drafts reference both
+RECORD_TYPES = ["book", "character", "scene", "chapter", "draft"]
+
+
+def _columns(model) -> List:
+    return [c for c in model.__table__.c if c.name not in ("id", "created_at")]
+
+
+def _stream(conn: Connection, statement):
+    return conn.execution_options(yield_per=BATCH_SIZE).execute(statement)
+
+
+def _with_links(conn: Connection, model, owner_column, link_column, linked_model,
+                linked_name, field: str, *link_order) -> Iterator[Dict]:
+    """Stream rows of model with the names of their linked rows attached.
+
+    Rows and links are read with two cursors ordered by owner id and merged in
+    step, so no relationship is loaded per row and nothing is held in memory.
+    """
+    rows = _stream(conn, select(model.id, *_columns(model)).order_by(model.id))
+    # Links without an explicit order keep the order in which they were stored
+    links = iter(_stream(conn, select(owner_column, linked_name)
+                         .join(linked_model, linked_model.id == link_column)
+                         .order_by(owner_column, *link_order,
+                                   literal_column(f"{owner_column.table.name}.rowid"))))
+    link = next(links, None)
+    for row in rows:
+        record = dict(row._mapping)
+        owner_id = record.pop("id")
+        names = []
+        while link is not None and link[0] < owner_id:
+            link = next(links, None)
+        while link is not None and link[0] == owner_id:
+            names.append(link[1])
+            link = next(links, None)
+        record[field] = names
+        yield record
+
+
+def _drafts(conn: Connection) -> Iterator[Dict]:
+    for owner_type, model in [("scene", Scene), ("chapter", Chapter)]:
+        chunks = _stream(conn, select(model.title, DraftChunk.first_paragraph, DraftChunk.payload)
+                         .join(model, model.id == DraftChunk.owner_id)
+                         .where(DraftChunk.owner_type == owner_type)
+                         .order_by(DraftChunk.owner_id, DraftChunk.seq))
+        for title, first_paragraph, payload in chunks:
+            yield {"entity_type": owner_type, "key": title, "start": first_paragraph,
+                   "paragraphs": _decode(payload)}
+
+
+def iter_records(story_db) -> Iterator[Dict]:
+    """Yield the whole book as export records, one entity at a time.
+
+    Everything is read in a single transaction, so the export is a consistent
+    snapshot even while the UI keeps writing.
+    """
+    story_db.flush()
+    with story_db.engine.connect() as conn, conn.begin():
+        yield {"type": "header", "format": FORMAT, "version": FORMAT_VERSION,
+               "export_date": datetime.now().isoformat()}
+        for row in _stream(conn, select(*_columns(Book)).order_by(Book.id).limit(1)):
+            yield {"type": "book", "data": dict(row._mapping)}
+        for row in _stream(conn, select(*_columns(Character)).order_by(Character.id)):
+            yield {"type": "character", "data": dict(row._mapping)}
+        for record in _with_links(conn, Scene, character_scene.c.scene_id, character_scene.c.character_id,
+                                  Character, Character.name, "characters"):
+            yield {"type": "scene", "data": record}
+        for record in _with_links(conn, Chapter, scene_chapter.c.chapter_id, scene_chapter.c.scene_id,
+                                  Scene, Scene.title, "scenes", scene_chapter.c.position):
+            yield {"type": "chapter", "data": record}
+        for record in _drafts(conn):
+            yield {"type": "draft", "data": record}
+
+
+def iter_jsonl(story_db) -> Iterator[str]:
+    """Yield export lines, e.g. as the body of a streaming HTTP response"""
+    for record in iter_records(story_db):
+        yield json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+def _open(path: str, mode: str, compressed: bool) -> IO[str]:
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_jsonl(story_db, out: IO[str]) -> Dict[str, int]:
+    """Write the book to a text stream; returns record counts by type"""
+    counts = {record_type: 0 for record_type in RECORD_TYPES}
+    for record in iter_records(story_db):
+        if record["type"] in counts:
+            counts[record["type"]] += 1
+        out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    return counts
+
+
+def export_jsonl(story_db, path: str) -> Dict[str, int]:
+    """Export the book to a .jsonl (or .jsonl.gz) file, replaced atomically"""
+    tmp_path = f"{path}.tmp"
+    with _open(tmp_path, "w", path.endswith(".gz")) as out:
+        counts = write_jsonl(story_db, out)
+    os.replace(tmp_path, path)
+    return counts
+
+
+def read_jsonl(source: Union[str, IO[str]]) -> Iterator[Dict]:
+    """Yield the records of an export file or stream, checking its header"""
+    if isinstance(source, str):
+        with _open(source, "r", source.endswith(".gz")) as f:
+            yield from read_jsonl(f)
+        return
+    lines = (line for line in source if line.strip())
+    header = json.loads(next(lines, "{}"))
+    if header.get("type") != "header" or header.get("format") != FORMAT:
+        raise ValueError("Not a BookWright JSON Lines export")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Unsupported export version: {header['version']}")
+    for line in lines:
+        yield json.loads(line)
+
+
+def _import_record(story_db, db, record: Dict) -> None:
+    data = record["data"]
+    record_type = record["type"]
+    if record_type == "book":
+        story_db.save_book_info(db, data.get("title"), data.get("author"), data.get("genre"),
+                                data.get("summary"), data.get("notes"))
+    elif record_type == "character":
+        story_db.save_character(db, data)
+    elif record_type == "scene":
+        story_db.save_scene(db, data)
+    elif record_type == "chapter":
+        story_db.save_chapter(db, data)
+    elif record_type == "draft":
+        text = _SEPARATOR.join(data["paragraphs"])
+        if data["start"] == 0:
+            # First chunk replaces any existing draft; later ones are appended
+            story_db.save_draft(db, data["entity_type"], data["key"], text)
+        else:
+            story_db.save_draft_paragraphs(db, data["entity_type"], data["key"], data["start"], 0, text)
+    else:
+        raise ValueError(f"Unknown record type: {record_type}")
+
+
+def import_records(story_db, records: Iterable[Dict], batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """Merge records into the book, committing every batch_size records.
+
+    Entities are matched by name or title and updated in place through the
+    same save methods as the forms, so every record still patches the read
+    cache and is published on the change feed. The cache and the feed's
+    subscribers are reset up front, so views that have not reloaded skip
+    those events and load the result once afterwards. A failing record
+    rolls back its batch; earlier batches stay committed.
+    """
+    story_db.flush()
+    story_db.cache.clear()
+    story_db.feed.publish(RESET)
+    counts = {record_type: 0 for record_type in RECORD_TYPES}
+    records = iter(records)
+    while True:
+        with story_db.session() as db:
+            written = 0
+            for record in records:
+                _import_record(story_db, db, record)
+                counts[record["type"]] += 1
+                written += 1
+                if written >= batch_size:
+                    break
+        story_db.flush()
+        if written < batch_size:
+            return counts
+
+
+def import_jsonl(story_db, source: Union[str, IO[str]], batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """Load an export file or stream into the book in batched transactions"""
+    return import_records(story_db, read_jsonl(source), batch_size)
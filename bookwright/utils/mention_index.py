@@ -0,0 +1,248 @@
+# bookwright/utils/mention_index.py
+import hashlib
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import func, insert, tuple_
+from sqlalchemy.orm import Session
+from ..models.models import Character, Scene, Chapter, Mention, MentionSource, MentionPattern
+from .draft_store import DraftStore
+
+# Text fields scanned for mentions, per source type; drafts are scanned too
+TEXT_FIELDS = {
+    "character": ["physical_description", "personality_traits", "background", "motivation",
+                  "relationships", "skills", "notes"],
+    "scene": ["description", "notes"],
+    "chapter": ["description", "notes"],
+}
+SOURCE_MODELS = {"character": Character, "scene": Scene, "chapter": Chapter}
+DRAFT_FIELD = "draft"
+
+# Rows written per INSERT while indexing
+INSERT_BATCH = 1000
+
+_ALIAS_SPLIT = re.compile(r"[,;\n]")
+_WORD = re.compile(r"\w+")
+
+# (source type, source id, field)
+SourceKey = Tuple[str, int, str]
+
+
+def split_aliases(aliases: Optional[str]) -> List[str]:
+    return [a.strip() for a in _ALIAS_SPLIT.split(aliases or "") if a.strip()]
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class NameAutomaton:
+    """Aho-Corasick automaton over character names and aliases.
+
+    One pass over a text finds every name at once, however many there are.
+    Matching is case-sensitive (so "Rose" is not "rose") and only whole
+    words count; where names overlap, the leftmost longest wins.
+    """
+
+    def __init__(self, patterns: Dict[str, Set[int]]):
+        self.patterns = patterns  # name -> ids of the characters it may refer to
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[List[str]] = [[]]
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                following = self._goto[state].get(char)
+                if following is None:
+                    following = self._goto[state][char] = len(self._goto)
+                    self._goto.append({})
+                    self._output.append([])
+                state = following
+            self._output[state].append(pattern)
+        # Breadth-first failure links; each state also reports its suffixes' names
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, following in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[following] = self._goto[fallback].get(char, 0)
+                self._output[following] = self._output[following] + self._output[self._fail[following]]
+                queue.append(following)
+
+    def scan(self, text: str) -> List[Tuple[int, int, str]]:
+        """(start, end, name) of each whole-word mention in text, in order"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                end = index + 1
+                for pattern in output[state]:
+                    start = end - len(pattern)
+                    if (start == 0 or not text[start - 1].isalnum()) and \
+                            (end == len(text) or not text[end].isalnum()):
+                        found.append((start, end, pattern))
+        found.sort(key=lambda m: (m[0], -m[1]))
+        kept = []
+        last_end = 0
+        for match in found:
+            if match[0] >= last_end:
+                kept.append(match)
+                last_end = match[1]
+        return kept
+
+
+class MentionIndex:
+    """Where each character is named across drafts, descriptions and notes.
+
+    Every indexed piece of text is stored with its digest, and every
+    character with the names it was scanned for, so refresh() rescans only
+    text that changed (with all names) and, for changed characters, all
+    other text with just their names.
+    """
+
+    def __init__(self, drafts: DraftStore):
+        self.drafts = drafts
+
+    def _patterns(self, db: Session) -> Dict[int, List[str]]:
+        patterns = {}
+        for character_id, name, aliases in db.query(Character.id, Character.name, Character.aliases):
+            names = [name] + split_aliases(aliases) if name else split_aliases(aliases)
+            patterns[character_id] = sorted(set(names))
+        return patterns
+
+    def _sources(self, db: Session) -> Dict[SourceKey, str]:
+        """Digest of every scannable text, without reading draft prose"""
+        digests = {}
+        for source_type, fields in TEXT_FIELDS.items():
+            model = SOURCE_MODELS[source_type]
+            columns = [getattr(model, field) for field in fields]
+            for row in db.query(model.id, *columns):
+                for field, text in zip(fields, row[1:]):
+                    if text:
+                        digests[(source_type, row[0], field)] = _digest(text)
+        for owner_type in ("scene", "chapter"):
+            for owner_id, chunk_digests in self.drafts.digests(db, owner_type).items():
+                digests[(owner_type, owner_id, DRAFT_FIELD)] = _digest("".join(chunk_digests))
+        return digests
+
+    def _texts(self, db: Session, keys: Iterable[SourceKey]) -> Iterator[Tuple[SourceKey, Optional[int], str]]:
+        """(source, paragraph, text) for every piece of the given sources"""
+        fields: Dict[Tuple[str, str], List[int]] = {}
+        for key in keys:
+            if key[2] == DRAFT_FIELD:
+                for paragraph, text in enumerate(self.drafts.iter_paragraphs(db, key[0], key[1])):
+                    yield key, paragraph, text
+            else:
+                fields.setdefault((key[0], key[2]), []).append(key[1])
+        for (source_type, field), ids in fields.items():
+            model = SOURCE_MODELS[source_type]
+            for i in range(0, len(ids), INSERT_BATCH):
+                rows = db.query(model.id, getattr(model, field)).filter(model.id.in_(ids[i:i + INSERT_BATCH]))
+                for source_id, text in rows:
+                    if text:
+                        yield (source_type, source_id, field), None, text
+
+    def _scan(self, db: Session, automaton: NameAutomaton, keys: Iterable[SourceKey]) -> int:
+        rows = []
+        written = 0
+        for key, paragraph, text in self._texts(db, keys):
+            for start, end, name in automaton.scan(text):
+                for character_id in automaton.patterns[name]:
+                    rows.append({"character_id": character_id, "source_type": key[0], "source_id": key[1],
+                                 "field": key[2], "paragraph": paragraph, "start": start, "end": end,
+                                 "matched": name})
+            if len(rows) >= INSERT_BATCH:
+                db.execute(insert(Mention), rows)
+                written += len(rows)
+                rows = []
+        if rows:
+            db.execute(insert(Mention), rows)
+            written += len(rows)
+        return written
+
+    def _delete_sources(self, db: Session, keys: List[SourceKey]) -> None:
+        for i in range(0, len(keys), INSERT_BATCH):
+            batch = keys[i:i + INSERT_BATCH]
+            db.query(Mention).filter(
+                tuple_(Mention.source_type, Mention.source_id, Mention.field).in_(batch)
+            ).delete(synchronize_session=False)
+            db.query(MentionSource).filter(
+                tuple_(MentionSource.source_type, MentionSource.source_id, MentionSource.field).in_(batch)
+            ).delete(synchronize_session=False)
+
+    def refresh(self, db: Session) -> Dict:
+        """Bring the index up to date; returns how much had to be rescanned"""
+        patterns = self._patterns(db)
+        stored_patterns = {cid: names.split("\n") for cid, names in
+                           db.query(MentionPattern.character_id, MentionPattern.names)}
+        sources = self._sources(db)
+        stored_sources = {(r.source_type, r.source_id, r.field): r.digest for r in db.query(MentionSource)}
+
+        changed_characters = [cid for cid, names in patterns.items() if stored_patterns.get(cid) != names]
+        removed_characters = [cid for cid in stored_patterns if cid not in patterns]
+        changed_sources = [k for k, d in sources.items() if stored_sources.get(k) != d]
+        removed_sources = [k for k in stored_sources if k not in sources]
+        if not (changed_characters or removed_characters or changed_sources or removed_sources):
+            return {"sources_scanned": 0, "characters_rescanned": 0, "mentions_written": 0}
+
+        all_names: Dict[str, Set[int]] = {}
+        for cid, names in patterns.items():
+            for name in names:
+                all_names.setdefault(name, set()).add(cid)
+        stale = set(changed_characters) | set(removed_characters)
+        changed_names = {name for cid in changed_characters for name in patterns[cid]}
+        touched_names = changed_names.union(*(stored_patterns.get(cid, ()) for cid in stale))
+        other_names = set(all_names) - touched_names
+        # Names sharing a word can overlap in the text, and which one wins there
+        # depends on both; a scan for the changed names alone can't see that
+        touched_words = {word for name in touched_names for word in _WORD.findall(name)}
+        overlapping = any(word in touched_words for name in other_names for word in _WORD.findall(name))
+        if overlapping:
+            changed_sources = list(sources)
+            removed_sources = list(stored_sources)
+            stale = set(stored_patterns) | set(patterns)
+            changed_characters = list(patterns)
+        if stale:
+            ids = sorted(stale)
+            for i in range(0, len(ids), INSERT_BATCH):
+                batch = ids[i:i + INSERT_BATCH]
+                db.query(Mention).filter(Mention.character_id.in_(batch)).delete(synchronize_session=False)
+                db.query(MentionPattern).filter(MentionPattern.character_id.in_(batch)).delete(
+                    synchronize_session=False)
+        self._delete_sources(db, sorted(set(changed_sources) | set(removed_sources)))
+
+        written = 0
+        if all_names and changed_sources:
+            written += self._scan(db, NameAutomaton(all_names), changed_sources)
+        unchanged = set(sources) - set(changed_sources)
+        if changed_names and unchanged:
+            # Only the stale characters' mentions were deleted; another owner
+            # of a shared name still has its rows for the unchanged text
+            changed_only = {name: all_names[name] & stale for name in changed_names}
+            written += self._scan(db, NameAutomaton(changed_only), sorted(unchanged))
+
+        if changed_sources:
+            db.execute(insert(MentionSource), [
+                {"source_type": k[0], "source_id": k[1], "field": k[2], "digest": sources[k]}
+                for k in changed_sources
+            ])
+        if changed_characters:
+            db.execute(insert(MentionPattern), [
+                {"character_id": cid, "names": "\n".join(patterns[cid])} for cid in changed_characters
+            ])
+        return {"sources_scanned": len(changed_sources), "characters_rescanned": len(changed_characters),
+                "mentions_written": written}
+
+    def mentions(self, db: Session, character_id: int) -> List[Mention]:
+        return (db.query(Mention)
+                .filter(Mention.character_id == character_id)
+                .order_by(Mention.source_type, Mention.source_id, Mention.field, Mention.paragraph, Mention.start)
+                .all())
+
+    def counts(self, db: Session) -> Dict[int, int]:
+        """Number of mentions per character id"""
+        return dict(db.query(Mention.character_id, func.count(Mention.id)).group_by(Mention.character_id))
@@ -0,0 +1,241 @@
+# bookwright/utils/near_duplicates.py
+import hashlib
+import re
+import threading
+import zlib
+from itertools import combinations
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from ..models.models import DraftChunk, MinHashSignature, Scene
+from .change_feed import ChangeEvent
+from .draft_store import DraftStore
+
+NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 Jaccard similarity almost always share a band
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+DEFAULT_THRESHOLD = 0.8
+# Texts with fewer shingles (about 8 words) are stored but never reported
+MIN_SHINGLES = 4
+
+_PRIME = (1 << 31) - 1
+_SEED = 20240601  # Fixed, so signatures stored by earlier runs stay comparable
+_PARAMS = f"{NUM_PERM}:{SHINGLE_WORDS}:{_SEED}"
+_rng = np.random.default_rng(_SEED)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.int64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.int64)
+_BLOCK = 4096  # Shingles hashed per step, bounding the NUM_PERM x block array
+
+_WORD_RE = re.compile(r"\w+")
+
+# (owner type, owner id, part, seq)
+SignatureKey = Tuple[str, int, str, int]
+
+
+def shingles(text: str) -> np.ndarray:
+    """Distinct hashes of every run of SHINGLE_WORDS words, case-folded"""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.int64)
+    hashes = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint64, count=len(words))
+    width = min(SHINGLE_WORDS, len(words))
+    count = len(words) - width + 1
+    combined = np.zeros(count, dtype=np.uint64)
+    for offset in range(width):
+        combined = (combined * np.uint64(1000003) + hashes[offset:offset + count]) & np.uint64(0xFFFFFFFF)
+    return np.unique(combined).astype(np.int64)
+
+
+def minhash(values: np.ndarray) -> np.ndarray:
+    """NUM_PERM minimums of (a * x + b) mod p over the shingle hashes"""
+    signature = np.full(NUM_PERM, _PRIME, dtype=np.int64)
+    for start in range(0, len(values), _BLOCK):
+        block = values[start:start + _BLOCK] % _PRIME
+        hashed = (np.outer(_A, block) + _B[:, None]) % _PRIME
+        np.minimum(signature, hashed.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def _outline(description: Optional[str], notes: Optional[str]) -> str:
+    return "\n\n".join(t for t in (description, notes) if t)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(f"{_PARAMS}\n{text}".encode("utf-8")).hexdigest()
+
+
+class NearDuplicateIndex:
+    """MinHash signatures of scene outlines and draft passages, banded for LSH.
+
+    Each scene's description and notes form one document and each draft
+    chunk another. Signatures are stored with the digest of their text, so
+    a save recomputes only what changed; the LSH buckets live in memory and
+    are patched on the same saves. Candidate pairs come only from shared
+    buckets, so finding near-duplicates never compares every pair.
+    """
+
+    def __init__(self, drafts: DraftStore):
+        self.drafts = drafts
+        self._lock = threading.RLock()
+        self._signatures: Optional[Dict[SignatureKey, np.ndarray]] = None
+        self._buckets: Dict[Tuple[int, bytes], Set[SignatureKey]] = {}
+
+    def apply(self, event: ChangeEvent) -> None:
+        if event.op == "reset":
+            self.clear()
+
+    def clear(self) -> None:
+        """Forget the in-memory buckets; the next query reloads them"""
+        with self._lock:
+            self._signatures = None
+            self._buckets = {}
+
+    def _outlines(self, db: Session) -> Dict[SignatureKey, str]:
+        current = {}
+        for row_id, description, notes in db.query(Scene.id, Scene.description, Scene.notes):
+            text = _outline(description, notes)
+            if text:
+                current[("scene", row_id, "outline", 0)] = _digest(text)
+        return current
+
+    def _drafts(self, db: Session, owner_type: Optional[str] = None,
+                owner_id: Optional[int] = None) -> Dict[SignatureKey, str]:
+        """Digests of draft chunks, taken from the chunk digests without reading prose"""
+        query = db.query(DraftChunk.owner_type, DraftChunk.owner_id, DraftChunk.seq, DraftChunk.digest)
+        if owner_type is not None:
+            query = query.filter(DraftChunk.owner_type == owner_type, DraftChunk.owner_id == owner_id)
+        return {(t, o, "draft", seq): _digest(digest) for t, o, seq, digest in query}
+
+    def _stored(self, db: Session, part: Optional[str] = None, owner_type: Optional[str] = None,
+                owner_id: Optional[int] = None) -> Dict[SignatureKey, Tuple[int, str]]:
+        query = db.query(MinHashSignature.id, MinHashSignature.owner_type, MinHashSignature.owner_id,
+                         MinHashSignature.part, MinHashSignature.seq, MinHashSignature.digest)
+        if part is not None:
+            query = query.filter(MinHashSignature.part == part)
+        if owner_type is not None:
+            query = query.filter(MinHashSignature.owner_type == owner_type, MinHashSignature.owner_id == owner_id)
+        return {(t, o, p, seq): (row_id, digest) for row_id, t, o, p, seq, digest in query}
+
+    def _texts(self, db: Session, keys: List[SignatureKey]) -> Dict[SignatureKey, str]:
+        texts = {}
+        outlines = [k[1] for k in keys if k[2] == "outline"]
+        for i in range(0, len(outlines), 500):
+            for scene_id, description, notes in db.query(Scene.id, Scene.description, Scene.notes).filter(
+                    Scene.id.in_(outlines[i:i + 500])):
+                texts[("scene", scene_id, "outline", 0)] = _outline(description, notes)
+        chunks: Dict[Tuple[str, int], Set[int]] = {}
+        for owner_type, owner_id, part, seq in keys:
+            if part == "draft":
+                chunks.setdefault((owner_type, owner_id), set()).add(seq)
+        for (owner_type, owner_id), seqs in chunks.items():
+            for seq, _, paragraphs in self.drafts.iter_chunks(db, owner_type, owner_id, seqs):
+                texts[(owner_type, owner_id, "draft", seq)] = "\n\n".join(paragraphs)
+        return texts
+
+    def _sync(self, db: Session, current: Dict[SignatureKey, str], stored: Dict[SignatureKey, Tuple[int, str]],
+              texts: Optional[Dict[SignatureKey, str]] = None) -> int:
+        """Recompute signatures whose text changed; returns how many were computed"""
+        changed = [k for k, digest in current.items() if stored.get(k, (None, None))[1] != digest]
+        stale = [k for k, (_, digest) in stored.items() if current.get(k) != digest]
+        if not changed and not stale:
+            return 0
+        stale_ids = [stored[k][0] for k in stale]
+        for i in range(0, len(stale_ids), 500):
+            db.query(MinHashSignature).filter(MinHashSignature.id.in_(stale_ids[i:i + 500])).delete(
+                synchronize_session=False)
+        if texts is None:
+            texts = self._texts(db, changed)
+        rows = []
+        fresh = {}
+        for key in changed:
+            values = shingles(texts[key])
+            signature = minhash(values)
+            rows.append({"owner_type": key[0], "owner_id": key[1], "part": key[2], "seq": key[3],
+                         "digest": current[key], "shingle_count": len(values),
+                         "signature": signature.tobytes()})
+            if len(values) >= MIN_SHINGLES:
+                fresh[key] = signature
+        if rows:
+            db.execute(insert(MinHashSignature), rows)
+        with self._lock:
+            if self._signatures is not None:
+                for key in stale:
+                    self._unbucket(key)
+                for key, signature in fresh.items():
+                    self._bucket(key, signature)
+        return len(rows)
+
+    def _bucket(self, key: SignatureKey, signature: np.ndarray) -> None:
+        self._signatures[key] = signature
+        for band in range(BANDS):
+            self._buckets.setdefault((band, signature[band * ROWS:(band + 1) * ROWS].tobytes()), set()).add(key)
+
+    def _unbucket(self, key: SignatureKey) -> None:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band in range(BANDS):
+            bucket_key = (band, signature[band * ROWS:(band + 1) * ROWS].tobytes())
+            bucket = self._buckets.get(bucket_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[bucket_key]
+
+    def update_outline(self, db: Session, scene_id: int, description: Optional[str],
+                       notes: Optional[str]) -> int:
+        """Bring a scene's outline signature up to date; called on save with the saved text"""
+        key = ("scene", scene_id, "outline", 0)
+        text = _outline(description, notes)
+        current = {key: _digest(text)} if text else {}
+        return self._sync(db, current, self._stored(db, "outline", "scene", scene_id), {key: text})
+
+    def update_drafts(self, db: Session, owner_type: str, owner_id: int) -> int:
+        """Bring the passage signatures of one draft up to date; only changed chunks are read"""
+        return self._sync(db, self._drafts(db, owner_type, owner_id), self._stored(db, "draft", owner_type, owner_id))
+
+    def remove_owner(self, db: Session, owner_type: str, owner_id: int) -> int:
+        return self._sync(db, {}, self._stored(db, None, owner_type, owner_id))
+
+    def refresh(self, db: Session) -> int:
+        """Bring every signature up to date, e.g. after an import or restore"""
+        current = self._outlines(db)
+        current.update(self._drafts(db))
+        return self._sync(db, current, self._stored(db))
+
+    def _ensure_loaded(self, db: Session) -> None:
+        with self._lock:
+            if self._signatures is not None:
+                return
+        self.refresh(db)
+        rows = (db.query(MinHashSignature.owner_type, MinHashSignature.owner_id, MinHashSignature.part,
+                         MinHashSignature.seq, MinHashSignature.signature)
+                .filter(MinHashSignature.shingle_count >= MIN_SHINGLES))
+        with self._lock:
+            self._signatures, self._buckets = {}, {}
+            for owner_type, owner_id, part, seq, signature in rows:
+                self._bucket((owner_type, owner_id, part, seq), np.frombuffer(signature, dtype=np.uint32))
+
+    def pairs(self, db: Session, threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[SignatureKey, SignatureKey, float]]:
+        """Pairs whose estimated Jaccard similarity is at least threshold, most similar first"""
+        self._ensure_loaded(db)
+        with self._lock:
+            candidates = set()
+            for members in self._buckets.values():
+                if len(members) > 1:
+                    candidates.update(combinations(sorted(members), 2))
+            if not candidates:
+                return []
+            candidates = sorted(candidates)
+            keys = sorted({k for pair in candidates for k in pair})
+            matrix = np.stack([self._signatures[k] for k in keys])
+        position = {k: i for i, k in enumerate(keys)}
+        left = np.fromiter((position[a] for a, _ in candidates), dtype=np.int64, count=len(candidates))
+        right = np.fromiter((position[b] for _, b in candidates), dtype=np.int64, count=len(candidates))
+        similarity = (matrix[left] == matrix[right]).mean(axis=1)
+        found = np.flatnonzero(similarity >= threshold)
+        found = found[np.argsort(-similarity[found], kind="stable")]
+        return [(candidates[i][0], candidates[i][1], round(float(similarity[i]), 3)) for i in found]
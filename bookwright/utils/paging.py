@@ -0,0 +1,95 @@
+# bookwright/utils/paging.py
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+from ..models.models import sort_key
+
+# Rows per page of the entity tables
+PAGE_SIZE = 50
+
+# Largest page a caller may ask for
+MAX_PAGE_SIZE = 500
+
+
+class Listing:
+    """A sortable, searchable, filterable list of one table's rows.
+
+    Pages are read by keyset: a cursor holds the sort value and id of the
+    last row shown and the next page starts just past it. Every sort column
+    needs an index on (sort_key(column), id), as do the filter fields, and
+    each filter field one on (sort_key(filter), sort_key(sort), id) for
+    each other sort. With those, a page sorted one way and filtered on at
+    most one field is an index seek however deep it is.
+
+    Not covered: a second filter is checked row by row within the first
+    one's rows, and search is a LIKE '%term%' scan of the rows left.
+    """
+
+    def __init__(self, model, columns: Dict[str, object], sorts: Sequence[str],
+                 search: Sequence[str] = (), filters: Sequence[str] = ()):
+        self.model = model
+        self.columns = columns  # Field name -> column or expression shown
+        self.sorts = list(sorts)  # Fields that can be sorted on; "id" is creation order
+        self.search = list(search)  # Fields matched by the search text
+        self.filters = list(filters)  # Fields that can be filtered to one value
+
+    def _sort(self, sort: str):
+        if sort == "id":
+            return None
+        if sort not in self.sorts:
+            raise ValueError(f"Can't sort by {sort}")
+        return sort_key(getattr(self.model, sort))
+
+    def _where(self, search: str, filters: Optional[Dict[str, str]]) -> List:
+        clauses = []
+        for field, value in (filters or {}).items():
+            if field not in self.filters:
+                raise ValueError(f"Can't filter by {field}")
+            if value:
+                # Through sort_key so the filter can use the field's index
+                clauses.append(sort_key(getattr(self.model, field)) == value)
+        if search and search.strip():
+            term = search.strip()
+            clauses.append(or_(*(getattr(self.model, f).contains(term, autoescape=True) for f in self.search)))
+        return clauses
+
+    def page(self, db: Session, sort: str = "id", descending: bool = False, search: str = "",
+             filters: Optional[Dict[str, str]] = None, after: Optional[List] = None,
+             limit: int = PAGE_SIZE) -> Dict:
+        """One page of rows and the cursor of the next page (None on the last)"""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        model_id = self.model.id
+        key = self._sort(sort)
+        query = select(model_id, *self.columns.values(), *([key] if key is not None else []))
+        clauses = self._where(search, filters)
+        if after is not None:
+            value, last_id = after
+            if key is None:
+                clauses.append(model_id < last_id if descending else model_id > last_id)
+            elif descending:
+                clauses.append(and_(key <= value, or_(key < value, model_id < last_id)))
+            else:
+                clauses.append(and_(key >= value, or_(key > value, model_id > last_id)))
+        if clauses:
+            query = query.where(*clauses)
+        order = [model_id] if key is None else [key, model_id]
+        query = query.order_by(*(o.desc() for o in order) if descending else order).limit(limit + 1)
+        rows = db.execute(query).all()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        fields = list(self.columns)
+        next_cursor = None
+        if more:
+            last = rows[-1]
+            next_cursor = [last[-1] if key is not None else None, last[0]]
+        return {
+            "rows": [dict(zip(fields, row[1:len(fields) + 1])) for row in rows],
+            "next": next_cursor
+        }
+
+    def values(self, db: Session, field: str) -> List[str]:
+        """Distinct non-empty values of a filter field, for its choices"""
+        if field not in self.filters:
+            raise ValueError(f"Can't filter by {field}")
+        key = sort_key(getattr(self.model, field))
+        return [v for (v,) in db.execute(select(key).distinct().where(key != "").order_by(key))]
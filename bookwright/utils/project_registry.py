@@ -0,0 +1,87 @@
+# bookwright/utils/project_registry.py
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from ..models.base import BOOKWRIGHT_HOME
+
+
+def _slugify(title: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+    return slug or "book"
+
+
+class ProjectRegistry:
+    """Maps each book to its own SQLite file under BOOKWRIGHT_HOME/books.
+
+    The registry itself is a small JSON file, rewritten atomically.
+    """
+
+    def __init__(self, home: Optional[Path] = None):
+        self.home = Path(home or BOOKWRIGHT_HOME)
+        self.books_dir = self.home / "books"
+        self.registry_path = self.home / "projects.json"
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.registry_path.exists():
+            return {}
+        with open(self.registry_path, "r") as f:
+            return json.load(f).get("books", {})
+
+    def _save(self, books: Dict[str, Dict]) -> None:
+        self.home.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.registry_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"books": books}, f, indent=2)
+        os.replace(tmp_path, self.registry_path)
+
+    def create_book(self, title: str) -> str:
+        """Register a new book and return its id"""
+        with self._lock:
+            books = self._load()
+            book_id = base = _slugify(title)
+            suffix = 2
+            while book_id in books:
+                book_id = f"{base}-{suffix}"
+                suffix += 1
+            self.books_dir.mkdir(parents=True, exist_ok=True)
+            books[book_id] = {
+                "title": title,
+                "path": str(self.books_dir / f"{book_id}.db"),
+                "created_at": datetime.now().isoformat()
+            }
+            self._save(books)
+            return book_id
+
+    def path_for(self, book_id: str) -> str:
+        """Return the SQLite file of a book"""
+        books = self._load()
+        if book_id not in books:
+            raise ValueError(f"Unknown book: {book_id}")
+        return books[book_id]["path"]
+
+    def list_books(self) -> List[Dict]:
+        return [{"id": book_id, **info} for book_id, info in sorted(self._load().items())]
+
+    def remove_book(self, book_id: str, delete_file: bool = False) -> None:
+        """Unregister a book, optionally deleting its database"""
+        # database_manager imports this module
+        from .database_manager import close_story_database
+
+        # Pending writes land (or the file goes) with no connection left open on it
+        close_story_database(book_id, registry=self)
+        with self._lock:
+            books = self._load()
+            info = books.pop(book_id, None)
+            if info is None:
+                raise ValueError(f"Unknown book: {book_id}")
+            self._save(books)
+        if delete_file:
+            for suffix in ("", "-wal", "-shm"):
+                path = info["path"] + suffix
+                if os.path.exists(path):
+                    os.remove(path)
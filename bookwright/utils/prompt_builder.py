@@ -1,9 +1,16 @@
 # bookwright/utils/prompt_builder.py
+from .tracing import tracer
 
 def build_chapter_prompt(title, outline, character_info):
     """
     Combine chapter outline and characters to generate a rich prompt.
     """
+    with tracer.span("render_prompt.chapter", characters=len(character_info or ())) as span:
+        prompt = _chapter_prompt(title, outline, character_info)
+        span.set(prompt_chars=len(prompt))
+        return prompt
+
+def _chapter_prompt(title, outline, character_info):
     prompt = f"Write the first draft of a book chapter titled '{title}'.\n\n"
     prompt += f"Chapter Outline:\n{outline}\n\n"
 
@@ -0,0 +1,144 @@
+# bookwright/utils/query_guard.py
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Set to "log" or "raise" to guard every Gradio request (see ui/stats.py)
+GUARD_MODE = os.environ.get("BOOKWRIGHT_QUERY_GUARD", "").lower()
+# Statements allowed per guarded request; unset for no limit
+REQUEST_BUDGET = int(os.environ["BOOKWRIGHT_QUERY_BUDGET"]) if os.environ.get("BOOKWRIGHT_QUERY_BUDGET") else None
+
+# The same SELECT shape run this many times in one request looks like N+1
+N_PLUS_ONE_THRESHOLD = 10
+
+# Call sites listed per repeated query in a report
+CALL_SITES_SHOWN = 3
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Frames in these files are plumbing, never the call site to blame
+_SKIPPED_FILES = {os.path.abspath(__file__), os.path.join(_PACKAGE_DIR, "models", "base.py")}
+
+_IN_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACE = re.compile(r"\s+")
+
+# The active guards, innermost last. A ContextVar rather than a thread local:
+# async handlers share the event loop's thread, but each task has its own context
+_guards: ContextVar[Tuple["QueryGuard", ...]] = ContextVar("bookwright_query_guards", default=())
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A guarded block ran more statements than its budget, or an N+1 pattern"""
+
+
+def query_shape(statement: str) -> str:
+    """The statement with IN lists, numbers and whitespace collapsed"""
+    shape = _IN_LIST.sub("(?)", statement)
+    shape = _NUMBER.sub("N", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+def _call_site() -> str:
+    """The innermost bookwright frame outside the database plumbing"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_PACKAGE_DIR) and filename not in _SKIPPED_FILES:
+            return f"{os.path.relpath(filename, os.path.dirname(_PACKAGE_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "<outside bookwright>"
+
+
+class QueryGuard:
+    """Counts the SQL statements run in this context while it is active.
+
+    Statements are grouped by shape, so the per-row lazy loads of an N+1
+    pattern show up as one shape run many times, with the lines of code
+    that ran them. On exit the guard logs a report of any problem, or
+    raises QueryBudgetExceeded if asked to:
+
+        with QueryGuard("get_scenes", budget=5, raise_on_violation=True):
+            story_db.get_scenes(db)
+
+    Guards nest; an inner guard's statements count towards the outer ones.
+    The context is the thread, or the asyncio task for async code, so
+    concurrent requests on the event loop are counted apart. Statements of
+    other threads are not counted: grouped writes committed later on the
+    unit of work's timer thread are missed unless the block calls
+    story_db.flush() itself.
+    """
+
+    def __init__(self, name: str = "block", budget: Optional[int] = None,
+                 n_plus_one: int = N_PLUS_ONE_THRESHOLD, raise_on_violation: bool = False):
+        self.name = name
+        self.budget = budget
+        self.n_plus_one = n_plus_one
+        self.raise_on_violation = raise_on_violation
+        self.statements = 0
+        self.shapes: Counter = Counter()
+        self.sites: Dict[str, Counter] = {}
+
+    def __enter__(self) -> "QueryGuard":
+        _guards.set(_guards.get() + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        _guards.set(tuple(guard for guard in _guards.get() if guard is not self))
+        if exc_type is not None:
+            return
+        problems = self.problems()
+        if not problems:
+            return
+        report = self.report()
+        if self.raise_on_violation:
+            raise QueryBudgetExceeded(report)
+        logger.warning(report)
+
+    def record(self, statement: str, site: str) -> None:
+        shape = query_shape(statement)
+        self.statements += 1
+        self.shapes[shape] += 1
+        self.sites.setdefault(shape, Counter())[site] += 1
+
+    def repeated(self) -> List[Tuple[str, int]]:
+        """SELECT shapes run at least n_plus_one times, most frequent first"""
+        return [(shape, count) for shape, count in self.shapes.most_common()
+                if count >= self.n_plus_one and shape.upper().startswith("SELECT")]
+
+    def problems(self) -> List[str]:
+        problems = []
+        if self.budget is not None and self.statements > self.budget:
+            problems.append(f"{self.statements} statements, over the budget of {self.budget}")
+        for _, count in self.repeated():
+            problems.append(f"possible N+1: the same query ran {count} times")
+        return problems
+
+    def report(self) -> str:
+        lines = [f"Query guard '{self.name}': {self.statements} statements"]
+        lines.extend(f"  {problem}" for problem in self.problems())
+        for shape, count in self.repeated():
+            lines.append(f"  {count}x {shape[:200]}")
+            for site, times in self.sites[shape].most_common(CALL_SITES_SHOWN):
+                lines.append(f"      {times}x from {site}")
+        return "\n".join(lines)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    guards = _guards.get()
+    if not guards:
+        return
+    site = _call_site()
+    for guard in guards:
+        guard.record(statement, site)
+
+
+def watch_engine(engine) -> None:
+    """Let active QueryGuards see the statements run through an engine"""
+    event.listen(engine, "before_cursor_execute", _before_execute)
@@ -0,0 +1,133 @@
+# bookwright/utils/record_cache.py
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from .metrics import CACHE_LOOKUPS
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("Cached records are read-only; copy them with dict(record) before editing")
+
+
+class FrozenRecord(dict):
+    """A dict that refuses mutation, so one instance can be shared by every reader.
+
+    It is still a dict: json.dumps, ** unpacking and dict(record) all work.
+    """
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    clear = _read_only
+    pop = _read_only
+    popitem = _read_only
+    setdefault = _read_only
+    update = _read_only
+    __ior__ = _read_only
+
+    def __reduce__(self):
+        return (FrozenRecord, (dict(self),))
+
+
+def freeze(record: Dict) -> FrozenRecord:
+    """Return an immutable copy of a record; list values become tuples"""
+    if isinstance(record, FrozenRecord):
+        return record
+    return FrozenRecord({
+        key: tuple(value) if isinstance(value, list) else value
+        for key, value in record.items()
+    })
+
+
+Snapshot = Tuple[FrozenRecord, ...]
+
+
+class EntityCache:
+    """Versioned per-entity-type snapshots of table reads.
+
+    Each entity type has a version counter that every write bumps. A snapshot
+    is only served while its version is current; writes either patch the
+    snapshot copy-on-write (upsert/remove) or drop it (invalidate).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._snapshots: Dict[str, Tuple[int, Snapshot]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, entity_type: str) -> int:
+        return self._versions.get(entity_type, 0)
+
+    def get(self, entity_type: str, loader: Callable[[], Iterable[Dict]]) -> Snapshot:
+        """Return the cached snapshot, loading it on a miss"""
+        with self._lock:
+            version = self._versions.setdefault(entity_type, 0)
+            entry = self._snapshots.get(entity_type)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                CACHE_LOOKUPS.inc(entity=entity_type, result="hit")
+                return entry[1]
+            self.misses += 1
+        CACHE_LOOKUPS.inc(entity=entity_type, result="miss")
+        snapshot = tuple(freeze(record) for record in loader())
+        with self._lock:
+            # A write that raced with the load makes this snapshot stale
+            if self._versions.get(entity_type, 0) == version:
+                self._snapshots[entity_type] = (version, snapshot)
+        return snapshot
+
+    def _bump(self, entity_type: str) -> Tuple[int, Optional[Snapshot]]:
+        """Advance the version; return it with the snapshot if that was current"""
+        version = self._versions.get(entity_type, 0)
+        entry = self._snapshots.pop(entity_type, None)
+        self._versions[entity_type] = version + 1
+        if entry is not None and entry[0] == version:
+            return version + 1, entry[1]
+        return version + 1, None
+
+    def upsert(self, entity_type: str, key_field: str, record: Dict) -> None:
+        """Replace (or append) one record in the snapshot"""
+        frozen = freeze(record)
+        with self._lock:
+            version, snapshot = self._bump(entity_type)
+            if snapshot is None:
+                return
+            key = frozen.get(key_field)
+            records: List[FrozenRecord] = list(snapshot)
+            for index, existing in enumerate(records):
+                if existing.get(key_field) == key:
+                    records[index] = frozen
+                    break
+            else:
+                records.append(frozen)
+            self._snapshots[entity_type] = (version, tuple(records))
+
+    def replace(self, entity_type: str, records: Iterable[Dict]) -> None:
+        """Swap in a whole new snapshot, e.g. for single-row tables"""
+        snapshot = tuple(freeze(record) for record in records)
+        with self._lock:
+            version, _ = self._bump(entity_type)
+            self._snapshots[entity_type] = (version, snapshot)
+
+    def remove(self, entity_type: str, key_field: str, key) -> None:
+        """Drop one record from the snapshot"""
+        with self._lock:
+            version, snapshot = self._bump(entity_type)
+            if snapshot is None:
+                return
+            records = tuple(r for r in snapshot if r.get(key_field) != key)
+            self._snapshots[entity_type] = (version, records)
+
+    def invalidate(self, *entity_types: str) -> None:
+        """Forget the snapshots of the given entity types"""
+        with self._lock:
+            for entity_type in entity_types:
+                self._bump(entity_type)
+
+    def clear(self) -> None:
+        """Forget every snapshot, e.g. after a rolled back transaction"""
+        with self._lock:
+            for entity_type in list(self._versions):
+                self._bump(entity_type)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,223 @@
+# bookwright/utils/relationship_index.py
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from .change_feed import ChangeEvent, ChangeFeed
+from .record_cache import FrozenRecord
+
+Loader = Callable[[], Tuple[List[FrozenRecord], List[FrozenRecord], List[FrozenRecord]]]
+
+
+class _Graph:
+    """The adjacency lists themselves; callers hold RelationshipIndex's lock"""
+
+    def __init__(self):
+        self.characters: Dict[int, FrozenRecord] = {}
+        self.scenes: Dict[int, FrozenRecord] = {}
+        self.chapters: Dict[int, FrozenRecord] = {}
+        # Names and titles are the keys of change events and of the UI
+        self.character_ids: Dict[str, int] = {}
+        self.scene_ids: Dict[str, int] = {}
+        self.chapter_ids: Dict[str, int] = {}
+        self.character_scenes: Dict[int, Set[int]] = {}
+        self.scene_characters: Dict[int, Set[int]] = {}
+        self.scene_chapters: Dict[int, Set[int]] = {}
+        self.chapter_scenes: Dict[int, List[int]] = {}  # In chapter order
+
+    def put_character(self, row: FrozenRecord) -> None:
+        self.characters[row["id"]] = row
+        self.character_ids[row["name"]] = row["id"]
+        self.character_scenes.setdefault(row["id"], set())
+
+    def drop_character(self, name: str) -> None:
+        character_id = self.character_ids.pop(name, None)
+        if character_id is None:
+            return
+        self.characters.pop(character_id, None)
+        for scene_id in self.character_scenes.pop(character_id, ()):
+            self.scene_characters.get(scene_id, set()).discard(character_id)
+
+    def put_scene(self, row: FrozenRecord) -> None:
+        scene_id = row["id"]
+        self.scenes[scene_id] = row
+        self.scene_ids[row["title"]] = scene_id
+        old = self.scene_characters.get(scene_id, set())
+        new = {self.character_ids[name] for name in row.get("characters", ()) if name in self.character_ids}
+        for character_id in old - new:
+            self.character_scenes.get(character_id, set()).discard(scene_id)
+        for character_id in new - old:
+            self.character_scenes.setdefault(character_id, set()).add(scene_id)
+        self.scene_characters[scene_id] = new
+        self.scene_chapters.setdefault(scene_id, set())
+
+    def drop_scene(self, title: str) -> None:
+        scene_id = self.scene_ids.pop(title, None)
+        if scene_id is None:
+            return
+        self.scenes.pop(scene_id, None)
+        for character_id in self.scene_characters.pop(scene_id, ()):
+            self.character_scenes.get(character_id, set()).discard(scene_id)
+        for chapter_id in self.scene_chapters.pop(scene_id, ()):
+            scene_ids = self.chapter_scenes.get(chapter_id)
+            if scene_ids and scene_id in scene_ids:
+                scene_ids.remove(scene_id)
+
+    def put_chapter(self, row: FrozenRecord) -> None:
+        chapter_id = row["id"]
+        self.chapters[chapter_id] = row
+        self.chapter_ids[row["title"]] = chapter_id
+        old = set(self.chapter_scenes.get(chapter_id, ()))
+        ordered = [self.scene_ids[title] for title in row.get("scenes", ()) if title in self.scene_ids]
+        new = set(ordered)
+        for scene_id in old - new:
+            self.scene_chapters.get(scene_id, set()).discard(chapter_id)
+        for scene_id in new - old:
+            self.scene_chapters.setdefault(scene_id, set()).add(chapter_id)
+        self.chapter_scenes[chapter_id] = ordered
+
+    def drop_chapter(self, title: str) -> None:
+        chapter_id = self.chapter_ids.pop(title, None)
+        if chapter_id is None:
+            return
+        self.chapters.pop(chapter_id, None)
+        for scene_id in self.chapter_scenes.pop(chapter_id, ()):
+            self.scene_chapters.get(scene_id, set()).discard(chapter_id)
+
+
+class RelationshipIndex:
+    """Character <-> scene <-> chapter adjacency, kept current by the change feed.
+
+    The first query loads all three tables once; afterwards each change
+    event updates only the edges of the row it touches, and every query
+    costs O(degree) instead of scanning the book.
+    """
+
+    def __init__(self, feed: ChangeFeed, loader: Loader):
+        self._loader = loader
+        self._lock = threading.RLock()
+        self._graph: Optional[_Graph] = None
+        self.version = 0
+        self.unsubscribe = feed.subscribe(self.apply, ["character", "scene", "chapter"])
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the tables are in memory, so queries need no database reads"""
+        return self._graph is not None
+
+    def _ensure_loaded(self) -> _Graph:
+        with self._lock:
+            if self._graph is not None:
+                return self._graph
+            version = self.version
+        # Load outside the lock, as FeedMirror does: writers publish while holding the session
+        characters, scenes, chapters = self._loader()
+        graph = _Graph()
+        for row in characters:
+            graph.put_character(row)
+        for row in scenes:
+            graph.put_scene(row)
+        for row in chapters:
+            graph.put_chapter(row)
+        with self._lock:
+            if self._graph is None and self.version == version:
+                self._graph = graph
+            elif self._graph is not None:
+                return self._graph
+        # A change raced with the load; answer from it and reload next time
+        return graph
+
+    def apply(self, event: ChangeEvent) -> None:
+        with self._lock:
+            self.version += 1
+            graph = self._graph
+            if event.op == "reset":
+                self._graph = None
+                return
+            if graph is None:
+                return  # Not loaded yet; the first query will include this change
+            if event.entity_type == "character":
+                if event.op == "delete":
+                    graph.drop_character(event.key)
+                else:
+                    graph.put_character(event.row)
+            elif event.entity_type == "scene":
+                if event.op == "delete":
+                    graph.drop_scene(event.key)
+                else:
+                    graph.put_scene(event.row)
+            elif event.entity_type == "chapter":
+                if event.op == "delete":
+                    graph.drop_chapter(event.key)
+                else:
+                    graph.put_chapter(event.row)
+
+    # Lookups
+
+    def character(self, character_id: int) -> Optional[FrozenRecord]:
+        return self._ensure_loaded().characters.get(character_id)
+
+    def scene(self, scene_id: int) -> Optional[FrozenRecord]:
+        return self._ensure_loaded().scenes.get(scene_id)
+
+    def chapter(self, chapter_id: int) -> Optional[FrozenRecord]:
+        return self._ensure_loaded().chapters.get(chapter_id)
+
+    def character_id(self, name: str) -> Optional[int]:
+        return self._ensure_loaded().character_ids.get(name)
+
+    def scene_id(self, title: str) -> Optional[int]:
+        return self._ensure_loaded().scene_ids.get(title)
+
+    def chapter_id(self, title: str) -> Optional[int]:
+        return self._ensure_loaded().chapter_ids.get(title)
+
+    # Graph queries; results are records, in id order unless stated otherwise
+
+    def scenes_of_character(self, character_id: int) -> List[FrozenRecord]:
+        graph = self._ensure_loaded()
+        with self._lock:
+            return [graph.scenes[s] for s in sorted(graph.character_scenes.get(character_id, ()))]
+
+    def characters_in_scene(self, scene_id: int) -> List[FrozenRecord]:
+        graph = self._ensure_loaded()
+        with self._lock:
+            return [graph.characters[c] for c in sorted(graph.scene_characters.get(scene_id, ()))]
+
+    def chapters_of_scene(self, scene_id: int) -> List[FrozenRecord]:
+        graph = self._ensure_loaded()
+        with self._lock:
+            return [graph.chapters[c] for c in sorted(graph.scene_chapters.get(scene_id, ()))]
+
+    def scenes_in_chapter(self, chapter_id: int) -> List[FrozenRecord]:
+        """Scenes of a chapter in chapter order"""
+        graph = self._ensure_loaded()
+        with self._lock:
+            return [graph.scenes[s] for s in graph.chapter_scenes.get(chapter_id, ())]
+
+    def chapters_of_character(self, character_id: int) -> List[FrozenRecord]:
+        """Chapters containing any scene the character appears in"""
+        graph = self._ensure_loaded()
+        with self._lock:
+            chapter_ids: Set[int] = set()
+            for scene_id in graph.character_scenes.get(character_id, ()):
+                chapter_ids.update(graph.scene_chapters.get(scene_id, ()))
+            return [graph.chapters[c] for c in sorted(chapter_ids)]
+
+    def characters_in_chapter(self, chapter_id: int) -> List[FrozenRecord]:
+        graph = self._ensure_loaded()
+        with self._lock:
+            character_ids: Set[int] = set()
+            for scene_id in graph.chapter_scenes.get(chapter_id, ()):
+                character_ids.update(graph.scene_characters.get(scene_id, ()))
+            return [graph.characters[c] for c in sorted(character_ids)]
+
+    def co_characters(self, character_id: int) -> List[Tuple[FrozenRecord, int]]:
+        """Characters sharing scenes with this one, with the number shared, most first"""
+        graph = self._ensure_loaded()
+        with self._lock:
+            shared: Dict[int, int] = {}
+            for scene_id in graph.character_scenes.get(character_id, ()):
+                for other_id in graph.scene_characters.get(scene_id, ()):
+                    if other_id != character_id:
+                        shared[other_id] = shared.get(other_id, 0) + 1
+            ranked = sorted(shared.items(), key=lambda item: (-item[1], item[0]))
+            return [(graph.characters[c], count) for c, count in ranked]
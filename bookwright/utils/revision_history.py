@@ -0,0 +1,206 @@
+# bookwright/utils/revision_history.py
+import json
+import re
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..models.models import Revision
+
+# A full snapshot is written every SNAPSHOT_INTERVAL revisions of an entity, so
+# restoring any point in time never applies more than SNAPSHOT_INTERVAL - 1 deltas.
+SNAPSHOT_INTERVAL = 16
+
+# Text fields shorter than this are stored whole; longer ones as token patches.
+PATCH_MIN_LENGTH = 200
+
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text)
+
+
+def _encode(data) -> bytes:
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def _decode(payload: Optional[bytes]):
+    if not payload:
+        return None
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+def make_text_patch(old: str, new: str) -> List[List]:
+    """Return token-level edit operations turning old into new"""
+    old_tokens = _tokenize(old)
+    new_tokens = _tokenize(new)
+    ops = []
+    matcher = SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            ops.append([i1, i2, "".join(new_tokens[j1:j2])])
+    return ops
+
+
+def apply_text_patch(old: str, ops: List[List]) -> str:
+    """Apply operations produced by make_text_patch"""
+    tokens = _tokenize(old)
+    parts = []
+    position = 0
+    for start, end, replacement in ops:
+        parts.extend(tokens[position:start])
+        parts.append(replacement)
+        position = end
+    parts.extend(tokens[position:])
+    return "".join(parts)
+
+
+def make_delta(old: Dict, new: Dict) -> Dict:
+    """Describe the field-level changes between two entity states"""
+    delta: Dict = {}
+    for field, value in new.items():
+        previous = old.get(field)
+        if field in old and previous == value:
+            continue
+        if (isinstance(previous, str) and isinstance(value, str)
+                and len(value) >= PATCH_MIN_LENGTH):
+            ops = make_text_patch(previous, value)
+            if len(json.dumps(ops)) < len(json.dumps(value)):
+                delta.setdefault("patch", {})[field] = ops
+                continue
+        delta.setdefault("set", {})[field] = value
+    removed = [field for field in old if field not in new]
+    if removed:
+        delta["unset"] = removed
+    return delta
+
+
+def apply_delta(state: Dict, delta: Dict) -> Dict:
+    """Return a new state with the delta applied"""
+    result = dict(state)
+    result.update(delta.get("set", {}))
+    for field, ops in delta.get("patch", {}).items():
+        result[field] = apply_text_patch(result.get(field) or "", ops)
+    for field in delta.get("unset", []):
+        result.pop(field, None)
+    return result
+
+
+class RevisionLog:
+    """Append-only history of entity states stored as snapshots plus deltas"""
+
+    def __init__(self, snapshot_interval: int = SNAPSHOT_INTERVAL, head_cache_size: int = 256):
+        self.snapshot_interval = snapshot_interval
+        self.head_cache_size = head_cache_size
+        # (entity_type, key) -> (seq, state) of the latest revision
+        self._heads: "OrderedDict[Tuple[str, str], Tuple[int, Optional[Dict]]]" = OrderedDict()
+
+    def _remember(self, entity_type: str, key: str, seq: int, state: Optional[Dict]) -> None:
+        self._heads[(entity_type, key)] = (seq, state)
+        self._heads.move_to_end((entity_type, key))
+        while len(self._heads) > self.head_cache_size:
+            self._heads.popitem(last=False)
+
+    def _head(self, db: Session, entity_type: str, key: str) -> Tuple[int, Optional[Dict]]:
+        """Return (seq, state) of the latest revision, (0, None) if there is none"""
+        # Always check the stored head: other StoryDatabase instances may have
+        # written revisions since this log last saw the entity.
+        latest = (db.query(Revision.seq)
+                  .filter(Revision.entity_type == entity_type, Revision.entity_key == key)
+                  .order_by(Revision.seq.desc())
+                  .first())
+        if latest is None:
+            return 0, None
+        cached = self._heads.get((entity_type, key))
+        if cached is not None and cached[0] == latest.seq:
+            self._heads.move_to_end((entity_type, key))
+            return cached
+        state = self._replay(db, entity_type, key, max_seq=latest.seq)
+        self._remember(entity_type, key, latest.seq, state)
+        return latest.seq, state
+
+    def _replay(self, db: Session, entity_type: str, key: str,
+                max_seq: Optional[int] = None, until: Optional[datetime] = None) -> Optional[Dict]:
+        """Rebuild a state from the nearest base revision and the deltas after it"""
+        filters = [Revision.entity_type == entity_type, Revision.entity_key == key]
+        if max_seq is not None:
+            filters.append(Revision.seq <= max_seq)
+        if until is not None:
+            filters.append(Revision.created_at <= until)
+        base = (db.query(Revision)
+                .filter(*filters, Revision.kind.in_(("snapshot", "delete")))
+                .order_by(Revision.seq.desc())
+                .first())
+        if base is None or base.kind == "delete":
+            return None
+        state = _decode(base.payload)
+        # Everything after the latest base revision is a delta
+        deltas = (db.query(Revision.payload)
+                  .filter(*filters, Revision.seq > base.seq)
+                  .order_by(Revision.seq)
+                  .all())
+        for revision in deltas:
+            state = apply_delta(state, _decode(revision.payload))
+        return state
+
+    def record(self, db: Session, entity_type: str, key: str, state: Optional[Dict]) -> Optional[Revision]:
+        """Record the new state of an entity (None for a deletion) in the current transaction.
+
+        Returns the new revision, or None when nothing changed.
+        """
+        if state is not None and "id" in state:
+            # Row ids are not history: a restore may recreate a row under a new id
+            state = {k: v for k, v in state.items() if k != "id"}
+        seq, previous = self._head(db, entity_type, key)
+        if state is None:
+            if previous is None:
+                return None
+            kind, payload = "delete", None
+        elif previous is None or seq % self.snapshot_interval == 0:
+            if previous == state:
+                return None
+            kind, payload = "snapshot", _encode(state)
+        else:
+            delta = make_delta(previous, state)
+            if not delta:
+                return None
+            kind, payload = "delta", _encode(delta)
+        revision = Revision(
+            entity_type=entity_type,
+            entity_key=key,
+            seq=seq + 1,
+            kind=kind,
+            payload=payload,
+            created_at=datetime.utcnow()
+        )
+        db.add(revision)
+        self._remember(entity_type, key, seq + 1, dict(state) if state is not None else None)
+        return revision
+
+    def forget(self) -> None:
+        """Drop cached head states, e.g. after a rolled back transaction"""
+        self._heads.clear()
+
+    def state_at(self, db: Session, entity_type: str, key: str, when: datetime) -> Optional[Dict]:
+        """Return the state of an entity at a point in time, None if it did not exist"""
+        return self._replay(db, entity_type, key, until=when)
+
+    def history(self, db: Session, entity_type: str, key: str) -> List[Dict]:
+        """List the revisions of an entity, newest first"""
+        revisions = (db.query(Revision.seq, Revision.kind, Revision.created_at)
+                     .filter(Revision.entity_type == entity_type, Revision.entity_key == key)
+                     .order_by(Revision.seq.desc())
+                     .all())
+        return [{
+            "seq": r.seq,
+            "kind": r.kind,
+            "created_at": r.created_at.isoformat()
+        } for r in revisions]
+
+    def tracked_entities(self, db: Session) -> List[Tuple[str, str]]:
+        """Return every (entity_type, key) pair that has revisions"""
+        return [(r.entity_type, r.entity_key) for r in
+                db.query(Revision.entity_type, Revision.entity_key).distinct().all()]
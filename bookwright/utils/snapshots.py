@@ -0,0 +1,198 @@
+# bookwright/utils/snapshots.py
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from ..models.base import Base, BOOKWRIGHT_HOME
+from ..models.migrations import ensure_schema
+from .change_feed import RESET
+
+SNAPSHOTS_DIR = BOOKWRIGHT_HOME / "snapshots"
+
+# Snapshots are taken before risky operations, so favour speed over ratio
+COMPRESS_LEVEL = 1
+
+_LABEL_RE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def snapshot_dir(story_db) -> Path:
+    """Directory holding the snapshots of one book"""
+    return SNAPSHOTS_DIR / Path(story_db.path).stem
+
+
+def create_snapshot(story_db, label: Optional[str] = None, compress: bool = False,
+                    dest: Optional[str] = None) -> str:
+    """Copy the book's database with SQLite's online backup API and return the path.
+
+    The backup reads one consistent version of the database. In WAL mode it
+    does not block other readers or writers, so the app keeps serving. The file
+    appears only once it is complete.
+    """
+    story_db.flush()
+    if dest is None:
+        name = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        if label:
+            name += "-" + _LABEL_RE.sub("-", label).strip("-")
+        dest = str(snapshot_dir(story_db) / (name + (".db.gz" if compress else ".db")))
+    Path(dest).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{dest}.tmp"
+    raw = story_db.engine.raw_connection()
+    try:
+        target = sqlite3.connect(tmp_path)
+        try:
+            raw.driver_connection.backup(target)
+            # A self-contained single file, without -wal/-shm companions
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+    finally:
+        raw.close()
+    if compress:
+        with open(tmp_path, "rb") as src, gzip.open(f"{tmp_path}.gz", "wb", compresslevel=COMPRESS_LEVEL) as out:
+            shutil.copyfileobj(src, out)
+        os.remove(tmp_path)
+        tmp_path = f"{tmp_path}.gz"
+    os.replace(tmp_path, dest)
+    return dest
+
+
+def list_snapshots(story_db) -> List[Dict]:
+    """Snapshots of a book, newest first"""
+    directory = snapshot_dir(story_db)
+    if not directory.exists():
+        return []
+    snapshots = []
+    for path in directory.iterdir():
+        if path.name.endswith((".db", ".db.gz")):
+            stat = path.stat()
+            snapshots.append({
+                "path": str(path),
+                "name": path.name,
+                "size": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat()
+            })
+    return sorted(snapshots, key=lambda s: s["name"], reverse=True)
+
+
+@contextmanager
+def _snapshot_file(path: str) -> Iterator[str]:
+    """Yield a plain database file for a snapshot, decompressing if needed"""
+    if not path.endswith(".gz"):
+        yield path
+        return
+    fd, tmp_path = tempfile.mkstemp(suffix=".db")
+    try:
+        with os.fdopen(fd, "wb") as out, gzip.open(path, "rb") as src:
+            shutil.copyfileobj(src, out)
+        yield tmp_path
+    finally:
+        os.remove(tmp_path)
+
+
+def _carry_over_jobs(live: sqlite3.Connection, restored: sqlite3.Connection) -> None:
+    """Give the restored copy the live database's jobs table.
+
+    Jobs are the queue's state, not book content: the snapshot's would rerun
+    jobs long finished and lose the ones queued or running now.
+    """
+    # The table before its indexes
+    schema = [sql for (sql,) in live.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'jobs' AND sql IS NOT NULL ORDER BY type DESC")]
+    restored.execute("DROP TABLE IF EXISTS jobs")
+    for sql in schema:
+        restored.execute(sql)
+    rows = live.execute("SELECT * FROM jobs").fetchall() if schema else []
+    if rows:
+        restored.executemany(f"INSERT INTO jobs VALUES ({', '.join('?' * len(rows[0]))})", rows)
+    restored.commit()
+
+
+def restore_snapshot(story_db, path: str, keep_backup: bool = True) -> Optional[str]:
+    """Replace the book's contents with a snapshot in one transaction.
+
+    The snapshot is checked before anything is touched, and unless
+    keep_backup is False the current state is snapshotted first; that
+    snapshot's path is returned. Readers see either the old or the restored
+    database, never a mix. A snapshot from an older version is migrated to
+    the current schema, and caches and mirrors reload afterwards. The jobs
+    table is kept as it is, so queues carry on with their current jobs.
+    """
+    if not os.path.exists(path):
+        raise ValueError(f"Snapshot not found: {path}")
+    backup_path = None
+    with _snapshot_file(path) as source_path:
+        source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+        try:
+            try:
+                check = source.execute("PRAGMA quick_check").fetchone()[0]
+            except sqlite3.DatabaseError as e:
+                raise ValueError(f"Not a valid snapshot: {e}")
+            if check != "ok":
+                raise ValueError(f"Snapshot is damaged: {check}")
+            if keep_backup:
+                backup_path = create_snapshot(story_db, label="before-restore")
+            # Holding the shared session keeps grouped writers out meanwhile
+            with story_db.session() as db:
+                story_db.flush()
+                db.close()  # Its open read transaction would block the restore
+                raw = story_db.engine.raw_connection()
+                restored = sqlite3.connect(":memory:")
+                try:
+                    # Swap in the live jobs on a copy: the snapshot file is left untouched
+                    source.backup(restored)
+                    _carry_over_jobs(raw.driver_connection, restored)
+                    restored.backup(raw.driver_connection)
+                finally:
+                    restored.close()
+                    raw.close()
+                # Before anyone reads it: older snapshots lack newer tables and columns
+                Base.metadata.create_all(bind=story_db.engine)
+                ensure_schema(story_db.engine)
+        finally:
+            source.close()
+    story_db.revisions.forget()
+    story_db.cache.clear()
+    # Also drops the MinHash buckets and marks the mention index stale
+    story_db.feed.publish(RESET)
+    return backup_path
+
+
+def main():
+    """Command line entry point: bookwright-snapshot"""
+    # database_manager imports this module
+    from .database_manager import get_story_database
+
+    parser = argparse.ArgumentParser(prog="bookwright-snapshot", description="Snapshot and restore BookWright books")
+    parser.add_argument("--book", help="id of the book (default: BOOKWRIGHT_HOME/bookwright.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="take a snapshot")
+    create.add_argument("--label", help="short note added to the file name")
+    create.add_argument("--gzip", action="store_true", help="compress the snapshot")
+    commands.add_parser("list", help="list snapshots, newest first")
+    restore = commands.add_parser("restore", help="restore a snapshot")
+    restore.add_argument("path", help="snapshot file")
+    restore.add_argument("--no-backup", action="store_true", help="don't snapshot the current state first")
+    args = parser.parse_args()
+
+    story_db = get_story_database(args.book)
+    if args.command == "create":
+        print(create_snapshot(story_db, label=args.label, compress=args.gzip))
+    elif args.command == "list":
+        for snapshot in list_snapshots(story_db):
+            print(f"{snapshot['created_at']}\t{snapshot['size']:>10}\t{snapshot['path']}")
+    elif args.command == "restore":
+        backup_path = restore_snapshot(story_db, args.path, keep_backup=not args.no_backup)
+        print(f"Restored {args.path}")
+        if backup_path:
+            print(f"Previous state saved to {backup_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# bookwright/utils/startup.py
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+
+class StartupTimer:
+    """Wall-clock time of each startup phase, for the report printed at launch"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def report(self) -> str:
+        parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases)
+        return f"Started in {self.total():.2f}s ({parts})"
+
+
+# Created when bookwright.ui.app is first imported, so it also times the imports
+startup = StartupTimer()
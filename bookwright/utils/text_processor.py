@@ -0,0 +1,239 @@
+# bookwright/utils/text_processor.py
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import numpy as np
+from .draft_store import split_paragraphs
+
+# Paragraph results kept in memory; a 150k-word manuscript is ~5,000 paragraphs
+CACHE_SIZE = 200_000
+
+UNATTRIBUTED = "(unattributed)"
+
+_WORD_RE = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*|\d+(?:[.,]\d+)*")
+_SENTENCE_END_RE = re.compile(r"[.!?…]+[\"'”’)\]]*(?=\s|$)")
+_QUOTE_RE = re.compile(r"“([^”]*)”?|\"([^\"]*)\"")
+_VOWEL_GROUP_RE = re.compile(r"[aeiouy]+")
+_NAME = r"[A-Z][\w’'-]*(?:\s+[A-Z][\w’'-]*)*"
+_VERBS = (r"(?:said|says|asked|asks|replied|whispered|shouted|called|answered|muttered|"
+          r"cried|added|continued|began|murmured|snapped|told|yelled|admitted|insisted)")
+# "...," Anna said / "...," said Anna
+_TAG_AFTER_RE = re.compile(rf"[\s,.!?—-]*(?:({_NAME})\s+{_VERBS}\b|{_VERBS}\s+({_NAME}))")
+# Anna said, "..."
+_TAG_BEFORE_RE = re.compile(rf"({_NAME})\s+{_VERBS}[\s,:]*$")
+_NAME_RE = re.compile(_NAME)
+
+# Columns of ParagraphStats.counts
+WORDS, SENTENCES, SYLLABLES, COMPLEX_WORDS, LETTERS, DIALOGUE_WORDS = range(6)
+
+
+@lru_cache(maxsize=65536)
+def syllables(word: str) -> int:
+    """Estimate syllables from vowel groups; a manuscript's vocabulary fits the cache"""
+    word = word.lower()
+    if not word.isalpha():
+        return 1
+    count = len(_VOWEL_GROUP_RE.findall(word))
+    if word.endswith("e") and not word.endswith(("le", "ee")) and count > 1:
+        count -= 1
+    return max(count, 1)
+
+
+def _word_arrays(words: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    count = len(words)
+    return (np.fromiter(map(syllables, words), dtype=np.int64, count=count),
+            np.fromiter(map(len, words), dtype=np.int64, count=count))
+
+
+class ParagraphStats:
+    """Counts for one paragraph; independent of the cast, so safe to cache by text"""
+
+    __slots__ = ("counts", "quotes", "names")
+
+    def __init__(self, counts: np.ndarray, quotes: Tuple[Tuple[Optional[str], int], ...],
+                 names: FrozenSet[str]):
+        self.counts = counts
+        self.quotes = quotes  # (speaker named in the dialogue tag or None, words) per quote
+        self.names = names  # Capitalized names in the narration, for untagged dialogue
+
+
+def analyze_paragraph(paragraph: str) -> ParagraphStats:
+    words = _WORD_RE.findall(paragraph)
+    syllable_counts, lengths = _word_arrays(words)
+    quotes = []
+    dialogue_words = 0
+    narration = []
+    last = 0
+    for match in _QUOTE_RE.finditer(paragraph):
+        spoken = len(_WORD_RE.findall(match.group(1) or match.group(2) or ""))
+        dialogue_words += spoken
+        before = paragraph[last:match.start()]
+        narration.append(before)
+        tag = _TAG_AFTER_RE.match(paragraph, match.end())
+        speaker = (tag.group(1) or tag.group(2)) if tag else None
+        if speaker is None:
+            tag = _TAG_BEFORE_RE.search(before)
+            speaker = tag.group(1) if tag else None
+        quotes.append((speaker, spoken))
+        last = match.end()
+    narration.append(paragraph[last:])
+    counts = np.array([
+        len(words),
+        max(len(_SENTENCE_END_RE.findall(paragraph)), 1) if words else 0,
+        syllable_counts.sum(),
+        (syllable_counts >= 3).sum(),
+        lengths.sum(),
+        dialogue_words
+    ], dtype=np.int64)
+    names = frozenset(_NAME_RE.findall(" ".join(narration))) if quotes else frozenset()
+    return ParagraphStats(counts, tuple(quotes), names)
+
+
+def readability(counts: np.ndarray) -> Dict[str, float]:
+    """Flesch reading ease, Flesch-Kincaid grade, Gunning fog and Coleman-Liau from summed counts"""
+    words, sentences = counts[WORDS], counts[SENTENCES]
+    if not words or not sentences:
+        return {"flesch_reading_ease": 0.0, "flesch_kincaid_grade": 0.0,
+                "gunning_fog": 0.0, "coleman_liau": 0.0}
+    words_per_sentence = words / sentences
+    syllables_per_word = counts[SYLLABLES] / words
+    return {
+        "flesch_reading_ease": round(float(206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word), 1),
+        "flesch_kincaid_grade": round(float(0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59), 1),
+        "gunning_fog": round(float(0.4 * (words_per_sentence + 100 * counts[COMPLEX_WORDS] / words)), 1),
+        "coleman_liau": round(float(0.0588 * 100 * counts[LETTERS] / words - 0.296 * 100 * sentences / words - 15.8), 1)
+    }
+
+
+class SpeakerResolver:
+    """Maps dialogue-tag names to characters by full name or an unambiguous first name"""
+
+    def __init__(self, characters: Iterable[str]):
+        self.names: Dict[str, str] = {}
+        first_names: Dict[str, List[str]] = {}
+        for name in characters:
+            if not name or not name.strip():
+                continue  # Older books may hold characters with blank names
+            self.names[name] = name
+            first_names.setdefault(name.split()[0], []).append(name)
+        for first, owners in first_names.items():
+            if len(owners) == 1:
+                self.names.setdefault(first, owners[0])
+
+    def resolve(self, paragraph: ParagraphStats) -> List[Tuple[str, int]]:
+        mentioned = {self.names[n] for n in paragraph.names if n in self.names}
+        resolved = []
+        for speaker, words in paragraph.quotes:
+            name = self.names.get(speaker) if speaker else None
+            if name is None and len(mentioned) == 1:
+                # Untagged line in a paragraph about one character
+                name = next(iter(mentioned))
+            resolved.append((name or UNATTRIBUTED, words))
+        return resolved
+
+
+class TextAnalyzer:
+    """Batch text statistics, cached per paragraph content hash.
+
+    Analyzing a manuscript hashes every paragraph but tokenizes only those
+    not seen before, so re-analyzing after an edit costs the changed
+    paragraphs. Counts are summed as arrays; speaker attribution, which
+    depends on the cast, runs over the cached results.
+    """
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, ParagraphStats]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def analyze(self, paragraphs: Iterable[str]) -> List[ParagraphStats]:
+        """Stats for each paragraph, computing only those not in the cache"""
+        keyed = [(hashlib.blake2b(p.encode("utf-8"), digest_size=16).digest(), p) for p in paragraphs]
+        results: List[Optional[ParagraphStats]] = []
+        missing: List[int] = []
+        with self._lock:
+            for key, _ in keyed:
+                stats = self._cache.get(key)
+                if stats is not None:
+                    self._cache.move_to_end(key)
+                else:
+                    missing.append(len(results))
+                results.append(stats)
+            self.hits += len(keyed) - len(missing)
+            self.misses += len(missing)
+        # Tokenize outside the lock; a paragraph repeated in the batch is computed once
+        fresh: Dict[bytes, ParagraphStats] = {}
+        for index in missing:
+            key, paragraph = keyed[index]
+            if key not in fresh:
+                fresh[key] = analyze_paragraph(paragraph)
+            results[index] = fresh[key]
+        if fresh:
+            with self._lock:
+                self._cache.update(fresh)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return results
+
+    def summarize(self, stats: List[ParagraphStats], resolver: Optional[SpeakerResolver] = None) -> Dict:
+        """Totals, readability, dialogue ratio and words spoken per character"""
+        counts = (np.stack([s.counts for s in stats]).sum(axis=0) if stats
+                  else np.zeros(DIALOGUE_WORDS + 1, dtype=np.int64))
+        speakers: Dict[str, int] = {}
+        if resolver is not None:
+            for paragraph in stats:
+                for name, words in resolver.resolve(paragraph):
+                    speakers[name] = speakers.get(name, 0) + words
+        words = int(counts[WORDS])
+        summary = {
+            "paragraphs": len(stats),
+            "words": words,
+            "sentences": int(counts[SENTENCES]),
+            "dialogue_words": int(counts[DIALOGUE_WORDS]),
+            "dialogue_ratio": round(float(counts[DIALOGUE_WORDS] / words), 3) if words else 0.0,
+            "speakers": dict(sorted(speakers.items(), key=lambda item: -item[1]))
+        }
+        summary.update(readability(counts))
+        return summary
+
+    def analyze_text(self, text: str, characters: Iterable[str] = ()) -> Dict:
+        """Summary of one piece of prose, e.g. a freshly generated draft"""
+        return self.summarize(self.analyze(split_paragraphs(text)), SpeakerResolver(characters))
+
+    def analyze_book(self, story_db) -> Dict:
+        """Statistics for every chapter and scene draft, plus the whole book.
+
+        A chapter's text is its own draft or, until it has one, its scenes'
+        drafts in order, as in the compiled manuscript. The book total and
+        the dialogue share cover the chapters.
+        """
+        with story_db.session() as db:
+            resolver = SpeakerResolver(c["name"] for c in story_db.get_characters(db))
+            scene_drafts = story_db.get_draft_digests(db, "scene")
+            chapter_drafts = story_db.get_draft_digests(db, "chapter")
+            scene_stats = {title: self.analyze(story_db.iter_draft(db, "scene", title))
+                           for title in scene_drafts}
+            chapters = []
+            for chapter in story_db.get_chapters(db):
+                if chapter["title"] in chapter_drafts:
+                    stats = self.analyze(story_db.iter_draft(db, "chapter", chapter["title"]))
+                else:
+                    stats = [s for title in chapter["scenes"] for s in scene_stats.get(title, ())]
+                chapters.append((chapter["title"], stats))
+        book = self.summarize([s for _, stats in chapters for s in stats], resolver)
+        spoken = sum(book["speakers"].values())
+        return {
+            "book": book,
+            "chapters": [dict(self.summarize(stats, resolver), title=title) for title, stats in chapters],
+            "scenes": [dict(self.summarize(stats, resolver), title=title) for title, stats in scene_stats.items()],
+            "dialogue_share": {name: round(words / spoken, 3) for name, words in book["speakers"].items()}
+        }
+
+
+# Shared so every view of the book reuses one paragraph cache
+text_analyzer = TextAnalyzer()
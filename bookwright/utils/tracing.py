@@ -0,0 +1,147 @@
+# bookwright/utils/tracing.py
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+from ..models.base import BOOKWRIGHT_HOME
+
+# Finished spans are appended here as JSON Lines; set BOOKWRIGHT_TRACE_FILE
+# to another file, or to an empty string to stop writing them
+TRACE_FILE = os.environ.get("BOOKWRIGHT_TRACE_FILE", str(BOOKWRIGHT_HOME / "traces" / "spans.jsonl"))
+
+# The file is moved aside to <file>.1 once it grows past this
+MAX_TRACE_BYTES = 20 * 1024 * 1024
+
+_current: ContextVar[Optional["Span"]] = ContextVar("bookwright_span", default=None)
+
+
+class Span:
+    """One timed stage; spans opened inside it in the same thread are its children"""
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "thread": threading.current_thread().name,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class Tracer:
+    """Writes a JSON line per finished span; convert with to_chrome_trace() to view them"""
+
+    def __init__(self, path: Optional[str] = TRACE_FILE, max_bytes: int = MAX_TRACE_BYTES):
+        self.path = path or None
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file = None
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        span = Span(name, _current.get(), attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - span._started
+            _current.reset(token)
+            if self.path:
+                self._write(span)
+
+    def _write(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(line)
+                self._file.flush()
+                if self._file.tell() > self.max_bytes:
+                    self._file.close()
+                    self._file = None
+                    os.replace(self.path, f"{self.path}.1")
+            except OSError:
+                # Tracing must never break what it traces
+                self._file = None
+
+
+tracer = Tracer()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def read_spans(path: str, trace_id: Optional[str] = None) -> List[Dict]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                if trace_id is None or span["trace_id"] == trace_id:
+                    spans.append(span)
+    return spans
+
+
+def to_chrome_trace(spans: List[Dict]) -> Dict:
+    """Spans in the Trace Event format read by Perfetto and chrome://tracing"""
+    threads: Dict[str, int] = {}
+    events = []
+    for span in spans:
+        tid = threads.setdefault(span["thread"], len(threads) + 1)
+        args = dict(span["attributes"], trace_id=span["trace_id"], span_id=span["span_id"])
+        if span["error"]:
+            args["error"] = span["error"]
+        events.append({"name": span["name"], "ph": "X", "ts": span["start"] * 1e6,
+                       "dur": (span["duration"] or 0) * 1e6, "pid": 1, "tid": tid, "args": args})
+    events.extend({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                  for name, tid in threads.items())
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def main():
+    """Command line entry point: bookwright-trace"""
+    parser = argparse.ArgumentParser(prog="bookwright-trace",
+                                     description="Convert BookWright spans to a trace viewer file")
+    parser.add_argument("input", nargs="?", default=TRACE_FILE, help=f"spans file (default: {TRACE_FILE})")
+    parser.add_argument("-o", "--output", help="trace file to write (default: <input>.trace.json)")
+    parser.add_argument("--trace", help="only the spans of this trace id")
+    args = parser.parse_args()
+
+    spans = read_spans(args.input, args.trace)
+    output = args.output or f"{os.path.splitext(args.input)[0]}.trace.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(to_chrome_trace(spans), f)
+    print(f"Wrote {len(spans)} spans to {output}; open it in https://ui.perfetto.dev or chrome://tracing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# bookwright/utils/unit_of_work.py
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Writes arriving within this many seconds share one commit
+DEFAULT_WINDOW = 0.05
+# A group is committed early once it holds this many writes
+DEFAULT_MAX_PENDING = 500
+
+
+class _Group:
+    """Writes committed together; waiters learn whether they made it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.error = error
+        self.done.set()
+
+
+class UnitOfWork:
+    """A shared session whose writes are group-committed.
+
+    Writers call mark_dirty() instead of commit(). The first write of a group
+    starts a timer; when it fires, every write made in the meantime is
+    committed in a single transaction (one fsync). The session autoflushes, so
+    reads through it always see pending writes. wait() blocks until the
+    writes marked so far are committed; flush() commits them immediately, for
+    exports, snapshots and shutdown.
+
+    Each borrow of the session writes inside its own savepoint, opened at its
+    first write. If the borrow raises, only its savepoint is rolled back: the
+    writes of earlier borrows stay in the group. If the group commit itself
+    fails, the whole group is rolled back. Either way the rollback listeners
+    run, so caches and views drop the lost writes.
+    """
+
+    def __init__(self, session_factory: sessionmaker, window: float = DEFAULT_WINDOW,
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_pending = max_pending
+        self._lock = threading.RLock()
+        self._session: Optional[Session] = None
+        self._pending = 0
+        self._group: Optional[_Group] = None
+        # Per open borrow, innermost last: [savepoint, pending writes before it], or None before it writes
+        self._savepoints: List[Optional[list]] = []
+        self._owner: Optional[int] = None
+        self._timer: Optional[threading.Timer] = None
+        self._rollback_listeners: List[Callable[[], None]] = []
+        atexit.register(self.close)
+
+    def _new_session(self) -> Session:
+        session = self.session_factory(autoflush=True)
+        event.listen(session, "before_flush", lambda *args: self._before_write())
+        event.listen(session, "do_orm_execute", self._on_execute)
+        return session
+
+    @contextmanager
+    def session(self) -> Iterator[Session]:
+        """Borrow the shared session; other threads wait until it is returned"""
+        with self._lock:
+            if self._session is None:
+                self._session = self._new_session()
+            self._savepoints.append(None)
+            self._owner = threading.get_ident()
+            try:
+                yield self._session
+                # Send this borrower's writes now, so a failure is its own
+                if self._unflushed():
+                    self._session.flush()
+                entry = self._savepoints[-1]
+                if entry is not None:
+                    entry[0].commit()  # Release: the writes join the group
+            except BaseException:
+                self._undo_borrow()
+                raise
+            finally:
+                self._savepoints.pop()
+                if not self._savepoints:
+                    self._owner = None
+                    self._end_idle_transaction()
+
+    def _unflushed(self) -> bool:
+        session = self._session
+        return bool(not session.is_active or session.new or session.dirty or session.deleted)
+
+    def _on_execute(self, state) -> None:
+        if state.is_insert or state.is_update or state.is_delete:
+            self._before_write()
+
+    def _before_write(self) -> None:
+        """Open the savepoints of the current borrows before their first write"""
+        if not self._savepoints or all(self._savepoints):
+            return
+        connection = self._session.connection()
+        # pysqlite only begins a transaction before DML, never before a
+        # SAVEPOINT, whose release would then commit on its own
+        if not getattr(connection.connection.dbapi_connection, "in_transaction", True):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        for index, entry in enumerate(self._savepoints):
+            if entry is None:
+                self._savepoints[index] = [self._session.begin_nested(), self._pending]
+
+    def _undo_borrow(self) -> None:
+        """Roll back what the failing borrow wrote, keeping the rest of the group"""
+        entry = self._savepoints[-1]
+        if entry is not None:
+            savepoint, pending = entry
+            self._savepoints[-1] = None
+            savepoint.rollback()
+            self._pending = pending
+            logger.warning("Rolled back a failed write; %d grouped writes kept", pending)
+            self._notify_rollback()
+        elif self._unflushed():
+            # Failed outside any savepoint, e.g. in a commit made inside the borrow
+            self._discard()
+
+    def _end_idle_transaction(self) -> None:
+        """Commit a transaction left open with no grouped writes, releasing its lock"""
+        if self._pending or not self._session.in_transaction():
+            return
+        if getattr(self._session.connection().connection.dbapi_connection, "in_transaction", False):
+            self._session.commit()
+
+    def owns(self, db: Session) -> bool:
+        return db is self._session
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def on_rollback(self, listener: Callable[[], None]) -> None:
+        """Register a callback run when writes are rolled back"""
+        self._rollback_listeners.append(listener)
+
+    def _notify_rollback(self) -> None:
+        for listener in self._rollback_listeners:
+            listener()
+
+    def mark_dirty(self) -> None:
+        """Record a write to be committed with the current group"""
+        with self._lock:
+            self._pending += 1
+            if self._group is None:
+                self._group = _Group()
+            if self.window <= 0 or self._pending >= self.max_pending:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self._commit_group)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until the writes marked so far are committed.
+
+        Raises the commit's error if their group was rolled back. Inside a
+        borrow this commits at once, as the group can't be committed while
+        the session is held.
+        """
+        if self._owner == threading.get_ident():
+            self.flush()
+            return
+        with self._lock:
+            group = self._group
+        if group is None:
+            return
+        if not group.done.wait(timeout):
+            raise TimeoutError("Grouped writes were not committed in time")
+        if group.error is not None:
+            raise group.error
+
+    def _commit_group(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            # Waiters get the error from their group; the rollback listeners have reset the views
+            logger.exception("Group commit of pending writes failed")
+
+    def flush(self) -> None:
+        """Commit all pending writes now"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending and self._session is not None:
+                count = self._pending
+                self._pending = 0
+                try:
+                    self._session.commit()
+                except Exception as e:
+                    self._discard(e)
+                    raise
+                # The commit released every savepoint of the borrows still open
+                for index in range(len(self._savepoints)):
+                    self._savepoints[index] = None
+                logger.debug("Committed %d grouped writes", count)
+            if self._group is not None:
+                self._group.finish()
+                self._group = None
+
+    def _discard(self, error: Optional[BaseException] = None) -> None:
+        """Roll back the current group and tell the listeners its writes are gone"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending:
+                logger.warning("Rolled back %d grouped writes", self._pending)
+            self._pending = 0
+            for index in range(len(self._savepoints)):
+                self._savepoints[index] = None
+            if self._session is not None:
+                self._session.rollback()
+            if self._group is not None:
+                self._group.finish(error or RuntimeError("Grouped writes were rolled back"))
+                self._group = None
+            self._notify_rollback()
+
+    def close(self) -> None:
+        """Commit outstanding writes and release the session"""
+        with self._lock:
+            try:
+                self.flush()
+            finally:
+                if self._session is not None:
+                    self._session.close()
+                    self._session = None
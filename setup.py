@@ -30,6 +30,8 @@ setup(
     entry_points={
         "console_scripts": [
             "bookwright=bookwright.ui.app:main",  # Adjust this based on your actual entry point
+            "bookwright-snapshot=bookwright.utils.snapshots:main",
+            "bookwright-trace=bookwright.utils.tracing:main",
         ],
     },
 )
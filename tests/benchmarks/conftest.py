@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+import pytest
+
+# Keep snapshots, exports and the default database out of the user's home
+os.environ.setdefault("BOOKWRIGHT_HOME", tempfile.mkdtemp(prefix="bookwright-bench-"))
+os.environ.setdefault("BOOKWRIGHT_DB", os.path.join(os.environ["BOOKWRIGHT_HOME"], "bookwright.db"))
+
+from .synthetic_book import synthetic_records, CHAPTERS, SCENES, CHARACTERS
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+
+# Share of the full synthetic book (50 chapters, 5k scenes, 1k characters) to
+# build; BOOKWRIGHT_BENCH_SCALE=1 runs at full size
+SCALE = float(os.environ.get("BOOKWRIGHT_BENCH_SCALE", "0.2"))
+
+# A timing fails once it is this many times its baseline
+TOLERANCE = float(os.environ.get("BOOKWRIGHT_BENCH_TOLERANCE", "3.0"))
+
+# Timings this short are noise, so never fail them
+MIN_FAILING_SECONDS = 0.005
+
+# BOOKWRIGHT_UPDATE_BASELINES=1 writes this run's timings as the new baselines
+UPDATE = os.environ.get("BOOKWRIGHT_UPDATE_BASELINES") == "1"
+
+
+def book_size() -> Dict[str, int]:
+    return {
+        "chapters": max(1, round(CHAPTERS * SCALE)),
+        "scenes": max(1, round(SCENES * SCALE)),
+        "characters": max(1, round(CHARACTERS * SCALE)),
+    }
+
+
+def _load_baselines() -> Dict:
+    if BASELINES_PATH.exists():
+        return json.loads(BASELINES_PATH.read_text())
+    return {}
+
+
+class Benchmark:
+    """Times named operations and checks them against the stored baselines.
+
+    Each timing is the best of a few rounds. Baselines are only compared at
+    the scale they were recorded at.
+    """
+
+    def __init__(self):
+        stored = _load_baselines()
+        self.baselines = stored.get("timings", {}) if stored.get("scale") == SCALE else {}
+        self.timings: Dict[str, float] = {}
+
+    def __call__(self, name: str, fn: Callable, rounds: int = 3, setup: Callable = None):
+        best = None
+        result = None
+        for _ in range(rounds):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        self.timings[name] = best
+        baseline = self.baselines.get(name)
+        if not UPDATE and baseline is not None and best > MIN_FAILING_SECONDS:
+            assert best <= baseline * TOLERANCE, (
+                f"{name} took {best:.4f}s, over {TOLERANCE}x its baseline of {baseline:.4f}s")
+        return result
+
+    def save(self) -> None:
+        timings = dict(self.baselines)
+        timings.update({name: round(seconds, 6) for name, seconds in self.timings.items()})
+        BASELINES_PATH.write_text(json.dumps(
+            {"scale": SCALE, "size": book_size(), "timings": dict(sorted(timings.items()))}, indent=2) + "\n")
+
+
+@pytest.fixture(scope="session")
+def benchmark():
+    bench = Benchmark()
+    yield bench
+    if UPDATE:
+        bench.save()
+    if bench.timings:
+        print("\nBenchmark timings (best of rounds):")
+        for name, seconds in sorted(bench.timings.items()):
+            baseline = bench.baselines.get(name)
+            against = f" (baseline {baseline:.4f}s)" if baseline is not None else ""
+            print(f"  {name:<32} {seconds:.4f}s{against}")
+
+
+@pytest.fixture(scope="session")
+def book_file(tmp_path_factory) -> str:
+    """The synthetic book as a JSON Lines export, written once per run"""
+    from bookwright.utils.jsonl_io import FORMAT, FORMAT_VERSION
+    path = tmp_path_factory.mktemp("book") / "synthetic.jsonl"
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(json.dumps({"type": "header", "format": FORMAT, "version": FORMAT_VERSION}) + "\n")
+        for record in synthetic_records(seed=0, **book_size()):
+            out.write(json.dumps(record) + "\n")
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def story_db(tmp_path_factory, book_file, benchmark):
+    """A StoryDatabase holding the synthetic book; tests put back what they change"""
+    from bookwright.utils.database_manager import StoryDatabase
+    from bookwright.utils.jsonl_io import import_jsonl
+    path = str(tmp_path_factory.mktemp("db") / "book.db")
+    db = StoryDatabase(path=path)
+    benchmark("import_jsonl", lambda: import_jsonl(db, book_file), rounds=1)
+    return db
@@ -0,0 +1,63 @@
+import random
+from typing import Dict, Iterator, List
+
+# Size of the book the benchmarks run on
+CHAPTERS = 50
+SCENES = 5000
+CHARACTERS = 1000
+
+ROLES = ["Protagonist", "Antagonist", "Supporting", "Minor"]
+TIMES = ["Morning", "Afternoon", "Evening", "Night"]
+WORDS = ("the a of and to in was he she they it with as at on for her his but had from not by "
+         "rain door window letter ship harbour bridge lantern road station river garden coat knife "
+         "silence storm whisper shadow morning promise secret ledger map key voice").split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    sentence = " ".join(rng.choice(WORDS) for _ in range(words))
+    return sentence[0].upper() + sentence[1:] + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_text(rng, rng.randint(6, 18)) for _ in range(rng.randint(2, 5)))
+
+
+def synthetic_records(seed: int = 0, chapters: int = CHAPTERS, scenes: int = SCENES,
+                      characters: int = CHARACTERS, cast: int = 6, drafted: float = 0.1) -> Iterator[Dict]:
+    """A reproducible book as import records, in the order import_records expects.
+
+    Every scene has up to cast characters, chosen with a skew so a few
+    characters are in many scenes, and every scene is in one chapter. A
+    share of the scenes has a draft of a few paragraphs.
+    """
+    rng = random.Random(seed)
+    yield {"type": "book", "data": {"title": f"Synthetic Book {seed}", "author": "Benchmark",
+                                    "genre": "Mystery", "summary": _paragraph(rng), "notes": ""}}
+    names = [f"Character {i:04d}" for i in range(characters)]
+    for i, name in enumerate(names):
+        yield {"type": "character", "data": {
+            "name": name, "role": ROLES[i % len(ROLES)], "aliases": f"C{i}",
+            "physical_description": _text(rng, 12), "personality_traits": _text(rng, 10),
+            "background": _paragraph(rng), "motivation": _text(rng, 8), "relationships": "",
+            "skills": _text(rng, 5), "notes": ""}}
+    titles = [f"Scene {i:05d}" for i in range(scenes)]
+    for i, title in enumerate(titles):
+        # Squaring a uniform draw favours the first characters: a dense core cast
+        scene_cast = sorted({names[int(rng.random() ** 2 * characters)] for _ in range(rng.randint(1, cast))})
+        yield {"type": "scene", "data": {
+            "title": title, "description": _paragraph(rng), "location": f"Location {rng.randint(0, 99)}",
+            "day": f"Day {i * 100 // scenes + 1}", "time": rng.choice(TIMES),
+            "characters": scene_cast, "notes": _text(rng, 8)}}
+    per_chapter = max(1, scenes // chapters)
+    for number in range(chapters):
+        yield {"type": "chapter", "data": {
+            "title": f"Chapter {number + 1:02d}", "description": _text(rng, 15), "notes": "",
+            "scenes": titles[number * per_chapter:(number + 1) * per_chapter]}}
+    for title in titles:
+        if rng.random() < drafted:
+            yield {"type": "draft", "data": {"entity_type": "scene", "key": title, "start": 0,
+                                             "paragraphs": [_paragraph(rng) for _ in range(rng.randint(3, 8))]}}
+
+
+def scene_titles(scenes: int = SCENES) -> List[str]:
+    return [f"Scene {i:05d}" for i in range(scenes)]
@@ -0,0 +1,138 @@
+import subprocess
+import sys
+
+from bookwright.llm.app_data import AppData
+from bookwright.utils.database_manager import StoryDatabase, DatabaseManager
+from bookwright.utils.jsonl_io import export_jsonl, import_jsonl
+from bookwright.core.jobs import _scene_prompt
+from .conftest import book_size
+
+
+def test_get_entities_cold(story_db, benchmark):
+    def read_all():
+        with story_db.session() as db:
+            return story_db.get_characters(db), story_db.get_scenes(db), story_db.get_chapters(db)
+    characters, scenes, chapters = benchmark("get_entities_cold", read_all, setup=story_db.cache.clear)
+    size = book_size()
+    assert (len(characters), len(scenes), len(chapters)) == (size["characters"], size["scenes"], size["chapters"])
+
+
+def test_get_entities_cached(story_db, benchmark):
+    def read_all():
+        with story_db.session() as db:
+            return story_db.get_characters(db), story_db.get_scenes(db), story_db.get_chapters(db)
+    read_all()
+    benchmark("get_entities_cached", read_all, rounds=5)
+
+
+def test_get_page(story_db, benchmark):
+    def deep_pages():
+        cursor = None
+        with story_db.session() as db:
+            for _ in range(10):
+                page = story_db.get_page(db, "scene", "location", False, "", {}, cursor)
+                cursor = page["next"]
+        return page
+    page = benchmark("get_page_x10", deep_pages, rounds=5)
+    assert page["rows"]
+
+
+def test_save_character(story_db, benchmark):
+    with story_db.session() as db:
+        character = dict(story_db.get_characters(db)[0])
+    edits = iter(range(1000))
+
+    def save():
+        with story_db.session() as db:
+            written = story_db.save_character(db, {"name": character["name"], "notes": f"Edit {next(edits)}"})
+        story_db.flush()
+        return written
+    assert benchmark("save_character", save, rounds=5)
+
+    def save_unchanged():
+        with story_db.session() as db:
+            return story_db.save_character(db, dict(character, notes=character["notes"]))
+    with story_db.session() as db:
+        story_db.save_character(db, character)
+    story_db.flush()
+    assert not benchmark("save_character_unchanged", save_unchanged, rounds=5)
+
+
+def test_save_and_delete_scene(story_db, benchmark):
+    with story_db.session() as db:
+        cast = [c["name"] for c in story_db.get_characters(db)[:5]]
+
+    def save():
+        with story_db.session() as db:
+            story_db.save_scene(db, {"title": "Benchmark Scene", "description": "A new scene.",
+                                     "location": "Nowhere", "day": "Day 1", "time": "Morning",
+                                     "characters": cast, "notes": ""})
+        story_db.flush()
+
+    def delete():
+        with story_db.session() as db:
+            story_db.delete_scene(db, "Benchmark Scene")
+        story_db.flush()
+    benchmark("save_scene_new", save, setup=delete)
+    benchmark("delete_scene", delete, setup=save)
+
+
+def test_save_chapter_scenes(story_db, benchmark):
+    with story_db.session() as db:
+        chapter = dict(story_db.get_chapters(db)[0])
+    scenes = list(chapter["scenes"])
+
+    def reorder():
+        scenes.reverse()
+        with story_db.session() as db:
+            story_db.save_chapter(db, {"title": chapter["title"], "scenes": list(scenes)})
+        story_db.flush()
+    benchmark("save_chapter_reorder", reorder, rounds=4)
+    with story_db.session() as db:
+        assert list(story_db.get_chapters(db)[0]["scenes"]) == list(chapter["scenes"])
+
+
+def test_context_building(story_db, benchmark):
+    app_data = AppData(story_db)
+    with story_db.session() as db:
+        characters = story_db.get_characters(db)[:100]
+        scenes = story_db.get_scenes(db)[:100]
+    by_name = {c["name"]: c for c in characters}
+
+    def contexts():
+        for c in characters:
+            app_data.get_character_context(c["id"])
+        for s in scenes:
+            app_data.get_scene_context(s["id"])
+    benchmark("context_x200", contexts)
+    benchmark("current_state", app_data.get_current_state)
+    benchmark("scene_prompts_x100", lambda: [_scene_prompt(s, by_name) for s in scenes])
+
+
+def test_export(story_db, benchmark, tmp_path):
+    manager = DatabaseManager(None, None, None, db=story_db)
+    text = benchmark("export_to_json", manager.export_to_json, rounds=2)
+    assert text.startswith("{")
+    counts = benchmark("export_jsonl", lambda: export_jsonl(story_db, str(tmp_path / "book.jsonl")), rounds=2)
+    assert counts["scene"] == book_size()["scenes"]
+
+
+def test_reimport(story_db, benchmark, tmp_path):
+    path = str(tmp_path / "book.jsonl")
+    export_jsonl(story_db, path)
+    # Importing a book over itself changes nothing, so every row takes the unchanged path
+    counts = benchmark("reimport_unchanged", lambda: import_jsonl(story_db, path), rounds=1)
+    assert counts["chapter"] == book_size()["chapters"]
+
+
+def test_startup(story_db, benchmark):
+    def open_book():
+        reopened = StoryDatabase(path=story_db.path)
+        with reopened.session() as db:
+            reopened.get_characters(db)
+            reopened.get_scenes(db)
+            reopened.get_chapters(db)
+        return reopened
+    benchmark("open_book", open_book, rounds=2)
+    benchmark("import_app", lambda: subprocess.run([sys.executable, "-c", "import bookwright.ui.app"], check=True),
+              rounds=1)
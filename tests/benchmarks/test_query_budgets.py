@@ -0,0 +1,68 @@
+from bookwright.llm.app_data import AppData
+from bookwright.utils.database_manager import DatabaseManager
+from bookwright.utils.query_guard import QueryGuard
+from .conftest import book_size
+
+# Statements each path may run: constant, or one per chunk of related rows,
+# never one per row. A guard that fails prints the repeated queries and the
+# lines that ran them.
+
+# selectinload fetches related rows for up to this many parents per query
+SELECTIN_CHUNK = 500
+
+
+def guarded(name: str, budget: int) -> QueryGuard:
+    return QueryGuard(name, budget=budget, raise_on_violation=True)
+
+
+def chunks(rows: int) -> int:
+    return -(-rows // SELECTIN_CHUNK)
+
+
+def test_reads(story_db):
+    story_db.cache.clear()
+    size = book_size()
+    for name, read, budget in [("get_characters", story_db.get_characters, 1),
+                               ("get_scenes", story_db.get_scenes, 1 + chunks(size["scenes"])),
+                               ("get_chapters", story_db.get_chapters, 1 + chunks(size["chapters"]))]:
+        with guarded(name, budget), story_db.session() as db:
+            assert read(db)
+
+
+def test_page(story_db):
+    with guarded("get_page", budget=1), story_db.session() as db:
+        story_db.get_page(db, "scene", "title", False, "Scene", {"day": "Day 2"})
+
+
+def test_saves(story_db):
+    with story_db.session() as db:
+        character = dict(story_db.get_characters(db)[0])
+        chapter = dict(story_db.get_chapters(db)[0])
+        cast = [c["name"] for c in story_db.get_characters(db)[:6]]
+    with guarded("save_character unchanged", budget=1), story_db.session() as db:
+        assert not story_db.save_character(db, character)
+    # Flush inside the guard: the grouped commit would otherwise run on the
+    # timer thread, where this thread's guard can't see it
+    with guarded("save_scene", budget=15), story_db.session() as db:
+        story_db.save_scene(db, {"title": "Budget Scene", "characters": cast})
+        story_db.flush()
+    with guarded("save_chapter reorder", budget=15), story_db.session() as db:
+        story_db.save_chapter(db, {"title": chapter["title"], "scenes": list(reversed(chapter["scenes"]))})
+        story_db.flush()
+    with story_db.session() as db:
+        story_db.save_chapter(db, {"title": chapter["title"], "scenes": list(chapter["scenes"])})
+        story_db.delete_scene(db, "Budget Scene")
+    story_db.flush()
+
+
+def test_export_and_context(story_db):
+    story_db.cache.clear()
+    size = book_size()
+    with guarded("export_to_json", budget=4 + chunks(size["scenes"]) + chunks(size["chapters"])):
+        DatabaseManager(None, None, None, db=story_db).export_to_json()
+    app_data = AppData(story_db)
+    with story_db.session() as db:
+        scenes = story_db.get_scenes(db)[:50]
+    with guarded("scene contexts", budget=4):
+        for scene in scenes:
+            app_data.get_scene_context(scene["id"])
@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+import pytest
+
+# Keep books, snapshots, traces and the default database out of the user's home
+os.environ.setdefault("BOOKWRIGHT_HOME", tempfile.mkdtemp(prefix="bookwright-test-"))
+os.environ.setdefault("BOOKWRIGHT_DB", os.path.join(os.environ["BOOKWRIGHT_HOME"], "bookwright.db"))
+
+
+@pytest.fixture
+def story_db(tmp_path):
+    """An empty book of its own for each test; mentions refresh only on read"""
+    from bookwright.utils.database_manager import StoryDatabase
+    db = StoryDatabase(path=str(tmp_path / "book.db"), mention_delay=None)
+    yield db
+    db.uow.close()
+
+
+@pytest.fixture
+def cast(story_db):
+    """Three characters sharing scenes and one always alone, in two chapters"""
+    with story_db.session() as db:
+        for name in ("Mara", "Tomas", "Ines", "Olek"):
+            story_db.save_character(db, {"name": name})
+        story_db.save_scene(db, {"title": "Dawn", "characters": ["Mara", "Tomas"]})
+        story_db.save_scene(db, {"title": "Dusk", "characters": ["Mara", "Tomas", "Ines"]})
+        story_db.save_scene(db, {"title": "Night", "characters": ["Olek"]})
+        story_db.save_chapter(db, {"title": "One", "scenes": ["Dusk", "Dawn"]})
+        story_db.save_chapter(db, {"title": "Two", "scenes": ["Night"]})
+    return story_db
@@ -0,0 +1,47 @@
+import asyncio
+import subprocess
+import sys
+import pytest
+from bookwright.core.llm_interface import get_llm_client
+from bookwright.ui.concurrency import CONCURRENCY_LIMITS, DB_WRITES, EXPORTS, LLM, MAX_QUEUE_SIZE
+
+
+def test_heavy_imports_are_deferred():
+    # A fresh interpreter, so other tests' imports don't count
+    code = ("import sys, bookwright.ui.app; "
+            "print(sorted(m for m in ('requests', 'langgraph', 'scipy') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_llm_clients_are_shared():
+    assert get_llm_client("deepseek") is get_llm_client("deepseek")
+    assert get_llm_client("deepseek") is not get_llm_client("llama3")
+
+
+@pytest.fixture(scope="module")
+def interface():
+    from bookwright.ui.app import create_interface
+    return create_interface()
+
+
+def test_events_are_queued_in_concurrency_groups(interface):
+    groups = {}
+    for block_fn in interface.fns.values():
+        name = getattr(block_fn.fn, "__name__", None)
+        if block_fn.concurrency_id in CONCURRENCY_LIMITS:
+            assert block_fn.concurrency_limit == CONCURRENCY_LIMITS[block_fn.concurrency_id]
+            groups.setdefault(block_fn.concurrency_id, set()).add(name)
+    assert {"save_character", "delete_scene", "save_chapter", "save_info", "flush"} <= groups[DB_WRITES]
+    assert groups[LLM] == {"respond"}
+    assert {"export_data", "import_data", "compile_book", "take_snapshot", "restore_selected"} <= groups[EXPORTS]
+    assert interface._queue.max_size == MAX_QUEUE_SIZE
+
+
+def test_handlers_are_timed(interface):
+    from bookwright.ui.stats import HANDLER_SECONDS
+    handlers = [f for f in interface.fns.values() if getattr(f.fn, "__name__", None) == "save_info"]
+    assert handlers and all(getattr(f.fn, "__wrapped__", None) for f in handlers)
+    before = sum(sum(counts) for _, counts, _ in HANDLER_SECONDS.samples())
+    assert asyncio.run(handlers[0].fn("The Long Road", "A. Writer", "", "", "")).startswith("Saved")
+    assert sum(sum(counts) for _, counts, _ in HANDLER_SECONDS.samples()) == before + 1
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+from bookwright.utils.async_database import AsyncStoryDatabase
+
+
+def test_save_reports_whether_it_wrote(story_db):
+    async_db = AsyncStoryDatabase(story_db)
+
+    async def run():
+        async with async_db.session() as db:
+            first = await async_db.save_character(db, {"name": "Ann", "role": "Lead"})
+            again = await async_db.save_character(db, {"name": "Ann", "role": "Lead"})
+            return first, again, [c["name"] for c in await async_db.get_characters(db)]
+
+    assert asyncio.run(run()) == (True, False, ["Ann"])
+
+
+def test_pending_group_is_committed_off_the_event_loop(story_db):
+    async_db = AsyncStoryDatabase(story_db)
+    with story_db.session() as db:
+        story_db.save_scene(db, {"title": "Inn"})
+    assert story_db.uow.pending
+
+    flushed_on = []
+    flush = story_db.uow.flush
+
+    def recording_flush():
+        flushed_on.append(threading.current_thread())
+        flush()
+
+    story_db.uow.flush = recording_flush
+
+    async def run():
+        async with async_db.session() as db:
+            return threading.current_thread(), [s["title"] for s in await async_db.get_scenes(db)]
+
+    loop_thread, titles = asyncio.run(run())
+    assert titles == ["Inn"]
+    assert flushed_on and loop_thread not in flushed_on
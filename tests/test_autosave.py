@@ -0,0 +1,44 @@
+import gradio as gr
+import pytest
+from bookwright.ui.autosave import Autosave
+
+
+def autosave(saved, result=True):
+    def save(key, changes):
+        saved.append((key, changes))
+        return result
+    return Autosave({"title": None, "notes": None, "day": None}, "title", save, None)
+
+
+def test_sends_only_changed_fields():
+    saved = []
+    status, baseline = autosave(saved).flush({"title": "Inn", "notes": "a", "day": "1"}, "Inn", "b", "1")
+    assert saved == [("Inn", {"notes": "b"})]
+    assert status.startswith("Autosaved Inn (notes)")
+    assert baseline == {"title": "Inn", "notes": "b", "day": "1"}
+
+
+def test_unchanged_form_is_not_sent():
+    saved = []
+    status, _ = autosave(saved).flush({"title": "Inn", "notes": "a", "day": "1"}, "Inn", "a", "1")
+    assert saved == [] and status == gr.skip()
+
+
+def test_new_or_renamed_entries_need_save():
+    saved = []
+    form = autosave(saved)
+    status, baseline = form.flush({}, "Inn", "a", "1")
+    assert saved == [] and baseline == {} and "press Save" in status
+    status, _ = form.flush({"title": "Inn", "notes": "a", "day": "1"}, "Tavern", "a", "1")
+    assert saved == [] and "press Save" in status
+
+
+def test_database_update_only(story_db):
+    with story_db.session() as db:
+        story_db.save_scene(db, {"title": "Inn", "notes": "a"})
+        assert story_db.save_scene(db, {"title": "Inn", "notes": "b"}, create=False)
+        assert not story_db.save_scene(db, {"title": "Inn", "notes": "b"}, create=False)
+        story_db.delete_scene(db, "Inn")
+        with pytest.raises(ValueError):
+            story_db.save_scene(db, {"title": "Inn", "notes": "c"}, create=False)
+        assert not story_db.get_scenes(db)
@@ -0,0 +1,25 @@
+from bookwright.models import base
+
+
+def test_default_database_path(tmp_path, monkeypatch):
+    home = tmp_path / "home"
+    monkeypatch.setattr(base, "BOOKWRIGHT_HOME", home)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("BOOKWRIGHT_DB", str(tmp_path / "chosen.db"))
+    assert base._default_database_path() == str(tmp_path / "chosen.db")
+
+    monkeypatch.delenv("BOOKWRIGHT_DB")
+    assert base._default_database_path() == str(home / "bookwright.db")
+    # A database from before BOOKWRIGHT_HOME is kept until the home one exists
+    (tmp_path / "bookwright.db").touch()
+    assert base._default_database_path() == str(tmp_path / "bookwright.db")
+    home.mkdir()
+    (home / "bookwright.db").touch()
+    assert base._default_database_path() == str(home / "bookwright.db")
+
+
+def test_engine_creates_missing_directory(tmp_path):
+    path = tmp_path / "nested" / "book.db"
+    with base.engines.engine(str(path)).connect():
+        pass
+    assert path.exists()
@@ -0,0 +1,31 @@
+from bookwright.core.cast_analytics import CastAnalytics
+
+
+def test_statistics(cast):
+    analytics = CastAnalytics(cast)
+    assert analytics.top_pairs() == [
+        {"characters": ("Mara", "Tomas"), "shared_scenes": 2},
+        {"characters": ("Mara", "Ines"), "shared_scenes": 1},
+        {"characters": ("Tomas", "Ines"), "shared_scenes": 1},
+    ]
+    ranked = analytics.centrality()
+    assert {r["name"] for r in ranked[:2]} == {"Mara", "Tomas"}
+    assert ranked[-1] == {"name": "Olek", "scenes": 1, "co_characters": 0, "shared_scenes": 0, "eigenvector": 0.0}
+    assert analytics.isolated() == [{"name": "Olek", "scenes": 1}]
+
+    names, chapters, counts = analytics.presence()
+    assert chapters == ["One", "Two"]
+    assert dict(zip(names, counts.tolist())) == {"Mara": [2, 0], "Tomas": [2, 0], "Ines": [1, 0], "Olek": [0, 1]}
+
+
+def test_follows_changes(cast):
+    analytics = CastAnalytics(cast)
+    analytics.top_pairs()
+    with cast.session() as db:
+        cast.save_scene(db, {"title": "Night", "characters": ["Olek", "Ines"]})
+        cast.delete_character(db, "Tomas")
+    assert analytics.top_pairs() == [
+        {"characters": ("Mara", "Ines"), "shared_scenes": 1},
+        {"characters": ("Ines", "Olek"), "shared_scenes": 1},
+    ]
+    assert analytics.isolated() == []
@@ -0,0 +1,61 @@
+import pytest
+from bookwright.utils.change_feed import ChangeEvent, ChangeFeed, FeedMirror, RESET
+from bookwright.utils.record_cache import freeze
+
+
+def test_subscriptions_filter_by_entity_type():
+    feed = ChangeFeed()
+    scenes, everything = [], []
+    unsubscribe = feed.subscribe(scenes.append, ["scene"])
+    feed.subscribe(everything.append)
+    feed.subscribe(lambda event: 1 / 0)  # A broken listener doesn't stop the others
+    character = ChangeEvent("character", "insert", "Mara", freeze({"name": "Mara"}))
+    feed.publish(character)
+    feed.publish(RESET)
+    unsubscribe()
+    feed.publish(ChangeEvent("scene", "delete", "Dawn", None))
+    assert scenes == [RESET]
+    assert everything == [character, RESET, ChangeEvent("scene", "delete", "Dawn", None)]
+
+
+def test_mirror_applies_events_without_reloading():
+    feed = ChangeFeed()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return [freeze({"name": "Mara"}), freeze({"name": "Tomas"})]
+
+    mirror = FeedMirror(feed, "character", "name", loader)
+    feed.publish(ChangeEvent("character", "insert", "Ines", freeze({"name": "Ines"})))
+    assert [r["name"] for r in mirror.records()] == ["Mara", "Tomas"]  # Loaded after the event
+    feed.publish(ChangeEvent("character", "update", "Mara", freeze({"name": "Mara", "role": "lead"})))
+    feed.publish(ChangeEvent("character", "delete", "Tomas", None))
+    assert mirror.records() == ({"name": "Mara", "role": "lead"},)
+    assert len(loads) == 1
+    feed.publish(RESET)
+    assert mirror.get("Tomas") == {"name": "Tomas"}
+    assert len(loads) == 2
+
+
+def test_story_database_publishes_changes(story_db):
+    events = []
+    story_db.feed.subscribe(events.append, ["character", "scene"])
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Mara"})
+        story_db.save_character(db, {"name": "Mara", "role": "lead"})
+        assert not story_db.save_character(db, {"name": "Mara", "role": "lead"})
+        story_db.save_chapter(db, {"title": "One"})
+        story_db.delete_character(db, "Mara")
+    assert [(e.entity_type, e.op, e.key) for e in events] == [
+        ("character", "insert", "Mara"), ("character", "update", "Mara"), ("character", "delete", "Mara")]
+    assert events[1].row["role"] == "lead"
+
+    mirror = story_db.mirror("character")
+    with pytest.raises(RuntimeError):
+        with story_db.session() as db:
+            story_db.save_character(db, {"name": "Ines"})
+            assert mirror.get("Ines") is not None
+            raise RuntimeError("form handler failed")
+    assert events[-1] == RESET
+    assert mirror.records() == ()
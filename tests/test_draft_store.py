@@ -0,0 +1,36 @@
+from bookwright.utils.draft_store import split_paragraphs
+
+PARAGRAPHS = [f"Paragraph {n} of the chapter, long enough to count." for n in range(30)]
+
+
+def test_split_paragraphs():
+    assert split_paragraphs("One.\r\n\r\n  \n\nTwo\nlines.\n\n") == ["One.", "Two\nlines."]
+    assert split_paragraphs(None) == []
+
+
+def test_chunked_drafts(story_db):
+    story_db.drafts.chunk_size = 200
+    with story_db.session() as db:
+        story_db.save_scene(db, {"title": "Dawn"})
+        info = story_db.save_draft(db, "scene", "Dawn", "\n\n".join(PARAGRAPHS))
+        assert info == {"paragraphs": 30, "words": 30 * 9, "chunks": 10}
+        assert story_db.get_draft_paragraphs(db, "scene", "Dawn", start=7, limit=5) == PARAGRAPHS[7:12]
+        assert list(story_db.iter_draft(db, "scene", "Dawn")) == PARAGRAPHS
+
+        # Editing one page rewrites only the chunks holding it
+        before = story_db.get_draft_digests(db, "scene")["Dawn"]
+        story_db.save_draft_paragraphs(db, "scene", "Dawn", 7, 1, "Rewritten.\n\nAnd split in two.")
+        after = story_db.get_draft_digests(db, "scene")["Dawn"]
+        assert sum(a != b for a, b in zip(before, after)) == 1
+        expected = PARAGRAPHS[:7] + ["Rewritten.", "And split in two."] + PARAGRAPHS[8:]
+        assert story_db.get_draft_paragraphs(db, "scene", "Dawn") == expected
+        assert story_db.get_draft_paragraphs(db, "scene", "Dawn", start=29, limit=2) == expected[29:31]
+
+        # Saving the same text again changes nothing
+        story_db.save_draft(db, "scene", "Dawn", "\n\n".join(expected))
+        saved = story_db.get_draft_digests(db, "scene")["Dawn"]
+        story_db.save_draft(db, "scene", "Dawn", "\n\n".join(expected))
+        assert story_db.get_draft_digests(db, "scene")["Dawn"] == saved
+
+        story_db.delete_scene(db, "Dawn")
+        assert story_db.get_draft_digests(db, "scene") == {}
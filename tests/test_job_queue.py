@@ -0,0 +1,156 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from bookwright.utils import job_queue
+from bookwright.models.models import Job
+from bookwright.utils.job_queue import JobQueue, DONE, FAILED, CANCELLED, RUNNING
+
+
+def _wait_for(queue, job_id, statuses, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {queue.get(job_id)['status']}")
+
+
+@pytest.fixture
+def queue(story_db):
+    queue = JobQueue(story_db.path, workers=1)
+    yield queue
+    queue.stop(timeout=5)
+
+
+def test_runs_jobs_and_stores_results(queue):
+    queue.register("add", lambda context, a, b: {"sum": a + b})
+    queue.register("boom", lambda context: 1 / 0)
+    queue.start()
+    done = _wait_for(queue, queue.submit("add", a=2, b=3), (DONE, FAILED))
+    assert (done["status"], done["result"], done["progress"]) == (DONE, {"sum": 5}, 1.0)
+    failed = _wait_for(queue, queue.submit("boom"), (DONE, FAILED))
+    assert failed["status"] == FAILED and "division" in failed["error"]
+    with pytest.raises(ValueError):
+        queue.submit("missing")
+
+
+def test_cancel_from_another_process(queue, story_db, monkeypatch):
+    monkeypatch.setattr(job_queue, "CANCEL_POLL_INTERVAL", 0.05)
+    started = threading.Event()
+
+    def spin(context):
+        started.set()
+        while True:
+            context.check()
+            time.sleep(0.01)
+
+    queue.register("spin", spin)
+    queue.start()
+    job_id = queue.submit("spin")
+    assert started.wait(5)
+
+    # A second queue on the same file stands in for another process: it can only set the flag
+    other = JobQueue(story_db.path)
+    other.register("spin", spin)
+    assert other.cancel(job_id)
+    assert _wait_for(queue, job_id, (DONE, FAILED, CANCELLED))["status"] == CANCELLED
+    assert not other.cancel(job_id)
+
+
+def test_second_queue_requeues_only_expired_leases(queue, story_db, monkeypatch):
+    monkeypatch.setattr(job_queue, "HEARTBEAT_INTERVAL", 0.05)
+    monkeypatch.setattr(job_queue, "LEASE_SECONDS", 0.5)
+    runs, started, release = [], threading.Event(), threading.Event()
+
+    def hold(context, name):
+        runs.append(name)
+        started.set()
+        assert release.wait(10)
+        return name
+
+    queue.register("hold", hold)
+    queue.start()
+    live = queue.submit("hold", name="live")
+    assert started.wait(5)
+    # A process that died mid-job left this one running with a stale lease
+    with queue._session() as db:
+        job = Job(kind="hold", params='{"name": "stale"}', status=RUNNING, progress=0.0, owner="gone",
+                  heartbeat_at=datetime.utcnow() - timedelta(hours=1))
+        db.add(job)
+        db.commit()
+        stale = job.id
+
+    other = JobQueue(story_db.path, workers=1)
+    other.register("hold", hold)
+    other.start()
+    try:
+        time.sleep(1.0)  # Past the lease: the live job's heartbeat keeps it with its queue
+        assert sorted(runs) == ["live", "stale"]
+        assert queue.get(live)["status"] == RUNNING
+        release.set()
+        assert _wait_for(other, stale, (DONE, FAILED))["result"] == "stale"
+        assert _wait_for(queue, live, (DONE, FAILED))["result"] == "live"
+    finally:
+        release.set()
+        other.stop(timeout=5)
+    assert sorted(runs) == ["live", "stale"]
+
+
+def test_book_jobs(cast, monkeypatch):
+    from bookwright.core import jobs
+    monkeypatch.setattr(jobs, "_queues", {})
+    queue = jobs.get_job_queue(cast)
+    try:
+        assert jobs.get_job_queue(cast) is queue
+        assert set(queue.kinds) == set(jobs.JOB_KINDS)
+        with cast.session() as db:
+            cast.save_draft(db, "scene", "Dawn", "Mara and Tomas left before sunrise.")
+        reindex = _wait_for(queue, queue.submit("reindex"), (DONE, FAILED))
+        assert reindex["status"] == DONE and reindex["result"]["signatures_computed"] == 0
+        compiled = _wait_for(queue, queue.submit("compile_manuscript", fmt="markdown"), (DONE, FAILED))
+        assert compiled["status"] == DONE and compiled["result"]["chapters"] == 2
+        assert [j["kind"] for j in queue.list()] == ["compile_manuscript", "reindex"]
+        assert queue.active() == 0
+    finally:
+        queue.stop(timeout=5)
+
+
+def test_second_queue_requeues_only_expired_leases(queue, story_db, monkeypatch):
+    monkeypatch.setattr(job_queue, "HEARTBEAT_INTERVAL", 0.05)
+    monkeypatch.setattr(job_queue, "LEASE_SECONDS", 0.5)
+    runs, started, release = [], threading.Event(), threading.Event()
+
+    def hold(context, name):
+        runs.append(name)
+        started.set()
+        assert release.wait(10)
+        return name
+
+    queue.register("hold", hold)
+    queue.start()
+    live = queue.submit("hold", name="live")
+    assert started.wait(5)
+    # A process that died mid-job left this one running with a stale lease
+    with queue._session() as db:
+        job = Job(kind="hold", params='{"name": "stale"}', status=RUNNING, progress=0.0, owner="gone",
+                  heartbeat_at=datetime.utcnow() - timedelta(hours=1))
+        db.add(job)
+        db.commit()
+        stale = job.id
+
+    other = JobQueue(story_db.path, workers=1)
+    other.register("hold", hold)
+    other.start()
+    try:
+        time.sleep(1.0)  # Past the lease: the live job's heartbeat keeps it with its queue
+        assert sorted(runs) == ["live", "stale"]
+        assert queue.get(live)["status"] == RUNNING
+        release.set()
+        assert _wait_for(other, stale, (DONE, FAILED))["result"] == "stale"
+        assert _wait_for(queue, live, (DONE, FAILED))["result"] == "live"
+    finally:
+        release.set()
+        other.stop(timeout=5)
+    assert sorted(runs) == ["live", "stale"]
@@ -0,0 +1,75 @@
+import io
+import json
+import pytest
+from bookwright.utils.database_manager import StoryDatabase
+from bookwright.utils.jsonl_io import export_jsonl, import_jsonl, read_jsonl, write_jsonl, FORMAT, FORMAT_VERSION
+
+HEADER = json.dumps({"type": "header", "format": FORMAT, "version": FORMAT_VERSION})
+
+
+def fill(story_db):
+    with story_db.session() as db:
+        story_db.save_book_info(db, "Tides", "Mara", "Fantasy", "", "")
+        story_db.save_character(db, {"name": "Ann", "role": "Lead", "age": 30})
+        story_db.save_scene(db, {"title": "Inn", "location": "Harbour", "characters": ["Ann"]})
+        story_db.save_scene(db, {"title": "Dock", "characters": []})
+        story_db.save_chapter(db, {"title": "One", "scenes": ["Inn", "Dock"]})
+        story_db.save_draft(db, "scene", "Inn", "First paragraph.\n\nSecond paragraph.")
+
+
+def contents(story_db):
+    with story_db.session() as db:
+        return ({k: v for k, v in story_db.get_book_info(db).items() if k != "id"},
+                [{k: v for k, v in c.items() if k != "id"} for c in story_db.get_characters(db)],
+                [{k: v for k, v in s.items() if k != "id"} for s in story_db.get_scenes(db)],
+                [{k: v for k, v in c.items() if k != "id"} for c in story_db.get_chapters(db)],
+                story_db.get_draft_paragraphs(db, "scene", "Inn"))
+
+
+@pytest.mark.parametrize("name", ["book.jsonl", "book.jsonl.gz"])
+def test_round_trip(story_db, tmp_path, name):
+    fill(story_db)
+    path = str(tmp_path / name)
+    counts = export_jsonl(story_db, path)
+    assert counts == {"book": 1, "character": 1, "scene": 2, "chapter": 1, "draft": 1}
+
+    copy = StoryDatabase(path=str(tmp_path / "copy.db"), mention_delay=None)
+    assert import_jsonl(copy, path, batch_size=2) == counts
+    assert contents(copy) == contents(story_db)
+    copy.uow.close()
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        list(read_jsonl(io.StringIO('{"type": "something else"}\n')))
+
+
+def test_failing_batch_is_rolled_back(story_db):
+    lines = [HEADER,
+             json.dumps({"type": "character", "data": {"name": "Ann"}}),
+             json.dumps({"type": "character", "data": {"name": "Bob"}}),
+             json.dumps({"type": "scene", "data": {"title": "Inn"}}),
+             json.dumps({"type": "draft", "data": {"entity_type": "scene", "key": "Missing",
+                                                    "start": 0, "paragraphs": ["Text"]}})]
+    with pytest.raises(ValueError):
+        import_jsonl(story_db, io.StringIO("\n".join(lines)), batch_size=2)
+    with story_db.session() as db:
+        assert [c["name"] for c in story_db.get_characters(db)] == ["Ann", "Bob"]
+        assert not story_db.get_scenes(db)
+
+
+def test_truncated_gzip(story_db, tmp_path):
+    fill(story_db)
+    path = tmp_path / "book.jsonl.gz"
+    export_jsonl(story_db, str(path))
+    path.write_bytes(path.read_bytes()[:-20])
+    with pytest.raises(EOFError):
+        import_jsonl(story_db, str(path))
+
+
+def test_write_jsonl_streams_header_first(story_db):
+    fill(story_db)
+    out = io.StringIO()
+    write_jsonl(story_db, out)
+    first = json.loads(out.getvalue().splitlines()[0])
+    assert first["type"] == "header" and first["format"] == FORMAT
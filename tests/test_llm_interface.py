@@ -0,0 +1,60 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from bookwright.core.llm_interface import OllamaClient, LLM_REQUESTS, LLM_TOKENS
+
+pytest.importorskip("requests")
+
+
+def serve(chunks):
+    """A local stand-in for Ollama's streaming /api/generate"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.end_headers()
+            for chunk in chunks:
+                self.wfile.write((json.dumps(chunk) + "\n").encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def client():
+    servers = []
+
+    def make(chunks, model):
+        server = serve(chunks)
+        servers.append(server)
+        return OllamaClient(model=model, host=f"http://127.0.0.1:{server.server_address[1]}")
+
+    yield make
+    for server in servers:
+        server.shutdown()
+
+
+def test_joins_the_stream_and_counts_tokens(client):
+    llm = client([{"response": "Hel"}, {"response": "lo "},
+                  {"done": True, "prompt_eval_count": 12, "eval_count": 2, "eval_duration": 10 ** 8}], "stream-ok")
+    assert llm.generate("Hi") == "Hello"
+    assert LLM_REQUESTS.value(model="stream-ok", outcome="ok") == 1
+    assert LLM_TOKENS.value(model="stream-ok", kind="prompt") == 12
+
+
+@pytest.mark.parametrize("chunks", [
+    [{"response": "Hel"}, {"error": "model runner has unexpectedly stopped"}],
+    [{"response": "Hel"}],
+])
+def test_failed_stream_raises(client, chunks):
+    llm = client(chunks, "stream-error")
+    before = LLM_REQUESTS.value(model="stream-error", outcome="error")
+    with pytest.raises(RuntimeError):
+        llm.generate("Hi")
+    assert LLM_REQUESTS.value(model="stream-error", outcome="error") == before + 1
+    assert LLM_REQUESTS.value(model="stream-error", outcome="ok") == 0
@@ -0,0 +1,56 @@
+import zipfile
+import pytest
+from bookwright.core import manuscript
+from bookwright.core.manuscript import compile_manuscript
+
+
+@pytest.fixture
+def book(story_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(manuscript, "BUILDS_DIR", tmp_path / "builds")
+    with story_db.session() as db:
+        story_db.save_book_info(db, "The Long Road", "A. Writer", "", "", "")
+        story_db.save_scene(db, {"title": "Dawn", "description": "Mara sets out."})
+        story_db.save_scene(db, {"title": "Dusk", "description": "Mara makes camp."})
+        story_db.save_chapter(db, {"title": "Leaving", "scenes": ["Dusk", "Dawn"]})
+        story_db.save_chapter(db, {"title": "Arriving", "scenes": []})
+        story_db.save_draft(db, "chapter", "Arriving", "The gates were open.\n\nNobody came.")
+    return story_db
+
+
+def test_markdown_follows_chapter_and_scene_order(book, tmp_path):
+    build = compile_manuscript(book, "markdown", dest=str(tmp_path / "book.md"))
+    text = open(build["path"], encoding="utf-8").read()
+    assert text.startswith("# The Long Road\n\n*by A. Writer*")
+    # Chapters in creation order; a chapter without a draft uses its scene outlines
+    order = [text.index(part) for part in
+             ("## Leaving", "Mara makes camp.", "* * *", "Mara sets out.", "## Arriving", "Nobody came.")]
+    assert order == sorted(order)
+    assert (build["chapters"], build["rendered"], build["cached"]) == (2, 2, 0)
+
+
+def test_rebuild_renders_only_edited_chapters(book, tmp_path):
+    dest = str(tmp_path / "book.md")
+    compile_manuscript(book, "markdown", dest=dest)
+    assert compile_manuscript(book, "markdown", dest=dest)["rendered"] == 0
+
+    with book.session() as db:
+        book.save_draft(db, "chapter", "Arriving", "The gates were shut.")
+    build = compile_manuscript(book, "markdown", dest=dest)
+    assert (build["rendered"], build["cached"]) == (1, 1)
+    text = open(dest, encoding="utf-8").read()
+    assert "The gates were shut." in text and "Nobody came." not in text
+
+
+@pytest.mark.parametrize("fmt, entry", [("epub", "OEBPS/chapter-002.xhtml"), ("docx", "word/document.xml")])
+def test_packaged_formats(book, tmp_path, fmt, entry):
+    build = compile_manuscript(book, fmt, dest=str(tmp_path / f"book.{fmt}"))
+    with zipfile.ZipFile(build["path"]) as package:
+        assert package.testzip() is None
+        assert "Nobody came." in package.read(entry).decode("utf-8")
+        if fmt == "epub":
+            assert package.namelist()[0] == "mimetype"
+
+
+def test_unknown_format(book):
+    with pytest.raises(ValueError):
+        compile_manuscript(book, "pdf")
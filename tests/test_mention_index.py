@@ -0,0 +1,58 @@
+import time
+from bookwright.utils.mention_index import NameAutomaton, split_aliases
+
+
+def test_automaton_finds_whole_words_leftmost_longest():
+    automaton = NameAutomaton({"Ann": {1}, "Ann Lee": {2}, "Bob": {3}})
+    text = "Ann Lee met Bob; Annie and Bobby did not."
+    assert [name for _, _, name in automaton.scan(text)] == ["Ann Lee", "Bob"]
+
+
+def test_split_aliases():
+    assert split_aliases("Annie, A.;\n Nan ") == ["Annie", "A.", "Nan"]
+    assert split_aliases(None) == []
+
+
+def write(story_db, fn, *args):
+    with story_db.session() as db:
+        fn(db, *args)
+
+
+def counts(story_db):
+    with story_db.session() as db:
+        return story_db.get_mention_counts(db)
+
+
+def test_incremental_refresh_matches_text(story_db):
+    write(story_db, story_db.save_character, {"name": "Ann"})
+    write(story_db, story_db.save_scene, {"title": "Inn", "description": "Ann waits for Bob."})
+    assert counts(story_db) == {"Ann": 1}
+    write(story_db, story_db.save_character, {"name": "Bob"})
+    assert counts(story_db) == {"Ann": 1, "Bob": 1}
+    write(story_db, story_db.save_scene, {"title": "Inn", "description": "Bob leaves."})
+    assert counts(story_db) == {"Ann": 0, "Bob": 1}
+
+
+def test_shared_name_is_not_indexed_twice(story_db):
+    write(story_db, story_db.save_character, {"name": "Ann"})
+    write(story_db, story_db.save_character, {"name": "Bob"})
+    write(story_db, story_db.save_scene, {"title": "Inn", "description": "Ann arrives."})
+    assert counts(story_db) == {"Ann": 1, "Bob": 0}
+
+    write(story_db, story_db.save_character, {"name": "Bob", "aliases": "Ann"})
+    assert counts(story_db) == {"Ann": 1, "Bob": 1}
+    with story_db.session() as db:
+        assert len(story_db.get_mentions(db, "Ann")) == 1
+
+
+def test_changes_are_indexed_in_the_background(tmp_path):
+    from bookwright.utils.database_manager import StoryDatabase
+    story_db = StoryDatabase(path=str(tmp_path / "book.db"), mention_delay=0.01)
+    write(story_db, story_db.save_character, {"name": "Ann"})
+    write(story_db, story_db.save_scene, {"title": "Inn", "description": "Ann arrives."})
+    deadline = time.time() + 5
+    while story_db._mentions_stale and time.time() < deadline:
+        time.sleep(0.01)
+    assert not story_db._mentions_stale
+    assert counts(story_db) == {"Ann": 1}
+    story_db.uow.close()
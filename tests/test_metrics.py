@@ -0,0 +1,58 @@
+import urllib.error
+import urllib.request
+import pytest
+from bookwright.utils.metrics import CONTENT_TYPE, QUERY_SECONDS, Registry, serve_metrics
+
+
+def test_prometheus_text_format():
+    registry = Registry()
+    requests = registry.counter("test_requests_total", "Requests")
+    seconds = registry.histogram("test_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.inc(model="a")
+    requests.inc(2, model="a")
+    for value in (0.05, 0.5, 0.5, 3.0):
+        seconds.observe(value, stage="call")
+    assert registry.counter("test_requests_total", "Requests") is requests
+    with pytest.raises(ValueError):
+        registry.histogram("test_requests_total", "Requests")
+
+    assert registry.render().splitlines() == [
+        "# HELP test_requests_total Requests",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{model="a"} 3',
+        "# HELP test_seconds Latency",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="call",le="0.1"} 1',
+        'test_seconds_bucket{stage="call",le="1"} 3',
+        'test_seconds_bucket{stage="call",le="+Inf"} 4',
+        'test_seconds_sum{stage="call"} 4.05',
+        'test_seconds_count{stage="call"} 4',
+    ]
+    (_, counts, _), = seconds.samples()
+    assert seconds.quantile(0.5, counts) == pytest.approx(0.55)
+    assert seconds.quantile(0.99, counts) == 1.0
+
+
+def _selects() -> int:
+    return sum(sum(counts) for key, counts, _ in QUERY_SECONDS.samples() if dict(key) == {"kind": "SELECT"})
+
+
+def test_queries_are_timed(story_db):
+    before = _selects()
+    with story_db.session() as db:
+        story_db.get_characters(db)
+    assert _selects() == before + 1
+
+
+def test_endpoint():
+    server = serve_metrics(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            assert "# TYPE bookwright_db_query_seconds histogram" in response.read().decode("utf-8")
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,34 @@
+import numpy as np
+from bookwright.utils.near_duplicates import NUM_PERM, minhash, shingles
+
+OUTLINE = ("Mara reaches the river crossing at dusk and finds the ferryman gone, "
+           "his boat drawn up on the far bank and a lantern still burning in the window of his hut.")
+
+
+def test_signatures_estimate_similarity():
+    same = minhash(shingles(OUTLINE.upper()))
+    assert np.array_equal(minhash(shingles(OUTLINE)), same)
+    assert len(same) == NUM_PERM
+    other = minhash(shingles("Tomas spends the morning arguing with the council over the grain tax."))
+    assert (same == other).mean() < 0.2
+
+
+def test_finds_near_duplicate_outlines_and_passages(story_db):
+    with story_db.session() as db:
+        story_db.save_scene(db, {"title": "Crossing", "description": OUTLINE})
+        story_db.save_scene(db, {"title": "Crossing again", "description": OUTLINE.replace("his hut", "the cabin")})
+        story_db.save_scene(db, {"title": "Council", "description": "Tomas argues with the council over the grain tax."})
+        story_db.save_draft(db, "scene", "Council", OUTLINE)
+        found = story_db.find_near_duplicates(db, threshold=0.7)
+    described = {(p["a"]["title"], p["a"]["part"], p["b"]["title"], p["b"]["part"]) for p in found}
+    assert ("Crossing", "outline", "Crossing again", "outline") in described
+    assert ("Council", "draft", "Crossing", "outline") in described or \
+        ("Crossing", "outline", "Council", "draft") in described
+    assert all(p["similarity"] >= 0.7 for p in found)
+
+    # Edits update the loaded buckets; nothing is recomputed on a refresh afterwards
+    with story_db.session() as db:
+        story_db.save_scene(db, {"title": "Crossing again", "description": "Ines sleeps through the storm."})
+        story_db.delete_scene(db, "Council")
+        assert story_db.find_near_duplicates(db, threshold=0.7) == []
+        assert story_db.refresh_duplicates(db) == 0
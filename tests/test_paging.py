@@ -0,0 +1,51 @@
+from sqlalchemy import event
+from bookwright.utils.database_manager import LISTINGS
+
+
+def pages(story_db, sort, descending=False, search="", filters=None, limit=2):
+    titles, after = [], None
+    while True:
+        with story_db.session() as db:
+            page = LISTINGS["scene"].page(db, sort, descending, search, filters, after, limit)
+        titles.append([row["title"] for row in page["rows"]])
+        after = page["next"]
+        if after is None:
+            return titles
+
+
+def seed(story_db):
+    with story_db.session() as db:
+        for title, location in [("E", "Inn"), ("B", None), ("D", "Inn"), ("A", "Dock"), ("C", "Inn")]:
+            story_db.save_scene(db, {"title": title, "location": location})
+    story_db.flush()
+
+
+def test_keyset_pages(story_db):
+    seed(story_db)
+    assert pages(story_db, "title") == [["A", "B"], ["C", "D"], ["E"]]
+    assert pages(story_db, "title", descending=True) == [["E", "D"], ["C", "B"], ["A"]]
+    assert pages(story_db, "id") == [["E", "B"], ["D", "A"], ["C"]]
+    # Empty locations sort first, ties in creation order
+    assert pages(story_db, "location", limit=10) == [["B", "A", "E", "D", "C"]]
+
+
+def test_filter_and_search(story_db):
+    seed(story_db)
+    assert pages(story_db, "title", filters={"location": "Inn"}) == [["C", "D"], ["E"]]
+    assert pages(story_db, "title", search="inn") == [["C", "D"], ["E"]]
+    with story_db.session() as db:
+        assert LISTINGS["scene"].values(db, "location") == ["Dock", "Inn"]
+
+
+def test_filtered_sorted_page_is_an_index_seek(story_db):
+    seed(story_db)
+    statements = []
+    event.listen(story_db.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, parameters, context, many: statements.append((statement, parameters)))
+    with story_db.session() as db:
+        story_db.get_page(db, "scene", "title", False, "", {"location": "Inn"})
+    statement, parameters = statements[-1]
+    with story_db.engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters))
+    assert "ix_scenes_page_location_title" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,66 @@
+import os
+import pytest
+from bookwright.models.base import engines
+from bookwright.utils import database_manager
+from bookwright.utils.project_registry import ProjectRegistry
+
+
+def test_registry(tmp_path):
+    registry = ProjectRegistry(tmp_path)
+    first = registry.create_book("The Long Road!")
+    second = registry.create_book("the long road")
+    assert (first, second) == ("the-long-road", "the-long-road-2")
+    assert registry.path_for(second) == str(tmp_path / "books" / "the-long-road-2.db")
+    # The registry is a file, so another instance sees the same books
+    assert [b["id"] for b in ProjectRegistry(tmp_path).list_books()] == [first, second]
+
+    open(registry.path_for(first), "w").close()
+    registry.remove_book(first, delete_file=True)
+    assert not os.path.exists(tmp_path / "books" / "the-long-road.db")
+    with pytest.raises(ValueError):
+        registry.path_for(first)
+    with pytest.raises(ValueError):
+        registry.remove_book(first)
+
+
+def test_each_book_has_its_own_database(tmp_path, monkeypatch):
+    registry = ProjectRegistry(tmp_path)
+    monkeypatch.setattr(database_manager, "projects", registry)
+    monkeypatch.setattr(database_manager, "_databases", {})
+    first, second = registry.create_book("First"), registry.create_book("Second")
+    first_db = database_manager.get_story_database(first)
+    second_db = database_manager.get_story_database(second)
+    try:
+        assert database_manager.get_story_database(first) is first_db
+        with first_db.session() as db:
+            first_db.save_character(db, {"name": "Mara"})
+        first_db.flush()
+        with second_db.session() as db:
+            assert not second_db.get_characters(db)
+        assert os.path.exists(registry.path_for(first))
+    finally:
+        for story_db in (first_db, second_db):
+            story_db.uow.close()
+
+
+def test_removing_a_book_closes_its_database(tmp_path, monkeypatch):
+    registry = ProjectRegistry(tmp_path)
+    monkeypatch.setattr(database_manager, "projects", registry)
+    monkeypatch.setattr(database_manager, "_databases", {})
+    book_id = registry.create_book("Doomed")
+    path = registry.path_for(book_id)
+    story_db = database_manager.get_story_database(book_id)
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Mara"})
+
+    # Closing commits the pending group; the next caller gets a fresh instance
+    database_manager.close_story_database(book_id)
+    reopened = database_manager.get_story_database(book_id)
+    assert reopened is not story_db
+    with reopened.session() as db:
+        assert [c["name"] for c in reopened.get_characters(db)] == ["Mara"]
+
+    registry.remove_book(book_id, delete_file=True)
+    assert not database_manager._databases
+    assert os.path.abspath(path) not in engines.open_paths()
+    assert not any(os.path.exists(path + suffix) for suffix in ("", "-wal", "-shm"))
@@ -0,0 +1,30 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from bookwright.models.base import async_session
+from bookwright.utils.query_guard import QueryBudgetExceeded, QueryGuard, query_shape
+
+
+def test_shapes_and_budget(story_db):
+    assert query_shape("SELECT * FROM t WHERE id IN (?, ?, ?) AND n = 42") == "SELECT * FROM t WHERE id IN (?) AND n = N"
+    with pytest.raises(QueryBudgetExceeded):
+        with story_db.session() as db, QueryGuard("reads", budget=1, raise_on_violation=True) as guard:
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+    assert guard.statements == 2
+
+
+def test_concurrent_coroutines_count_apart(story_db):
+    async def run(name, count):
+        async with async_session(story_db.path) as db:
+            with QueryGuard(name) as guard:
+                for _ in range(count):
+                    await db.execute(text("SELECT 1"))
+                    await asyncio.sleep(0)  # Let the other request run in between
+        return guard.statements
+
+    async def both():
+        return await asyncio.gather(run("a", 3), run("b", 5))
+
+    # Both run on one event loop thread, interleaved
+    assert asyncio.run(both()) == [3, 5]
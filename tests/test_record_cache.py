@@ -0,0 +1,67 @@
+import pytest
+from bookwright.utils.record_cache import EntityCache, freeze
+
+
+def test_frozen_records():
+    record = freeze({"name": "Mara", "scenes": ["Dawn"]})
+    assert record == {"name": "Mara", "scenes": ("Dawn",)}
+    with pytest.raises(TypeError):
+        record["name"] = "Tomas"
+    with pytest.raises(TypeError):
+        record.update(name="Tomas")
+    assert dict(record, name="Tomas")["name"] == "Tomas"
+
+
+def test_writes_patch_the_snapshot():
+    cache = EntityCache()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return [{"name": "Mara"}, {"name": "Tomas"}]
+
+    first = cache.get("character", loader)
+    assert cache.get("character", loader) is first
+    cache.upsert("character", "name", {"name": "Mara", "role": "lead"})
+    cache.upsert("character", "name", {"name": "Ines"})
+    cache.remove("character", "name", "Tomas")
+    assert cache.get("character", loader) == ({"name": "Mara", "role": "lead"}, {"name": "Ines"})
+    assert len(loads) == 1
+
+    cache.invalidate("character")
+    cache.get("character", loader)
+    assert len(loads) == 2
+    assert cache.stats() == {"hits": 2, "misses": 2}
+
+
+def test_load_racing_a_write_is_not_kept():
+    cache = EntityCache()
+
+    def loader():
+        # A write lands while the rows are being read
+        cache.upsert("scene", "title", {"title": "Dawn"})
+        return [{"title": "stale"}]
+
+    assert cache.get("scene", loader) == ({"title": "stale"},)
+    assert cache.get("scene", lambda: [{"title": "Dawn"}]) == ({"title": "Dawn"},)
+
+
+def test_story_database_reads_through_the_cache(story_db):
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Mara"})
+        story_db.get_characters(db)
+        misses = story_db.cache.misses
+        story_db.save_character(db, {"name": "Mara", "role": "lead"})
+        story_db.delete_character(db, "Mara")
+        story_db.save_character(db, {"name": "Tomas"})
+        assert [c["name"] for c in story_db.get_characters(db)] == ["Tomas"]
+    assert story_db.cache.misses == misses
+    story_db.flush()
+
+    # A rolled back write drops the cached rows it had patched in
+    with pytest.raises(RuntimeError):
+        with story_db.session() as db:
+            story_db.save_character(db, {"name": "Ines"})
+            raise RuntimeError("form handler failed")
+    with story_db.session() as db:
+        assert [c["name"] for c in story_db.get_characters(db)] == ["Tomas"]
@@ -0,0 +1,35 @@
+from bookwright.utils.relationship_index import RelationshipIndex
+
+
+def _names(records, field="name"):
+    return [r[field] for r in records]
+
+
+def test_queries(cast):
+    index = cast.relationships
+    mara, one = index.character_id("Mara"), index.chapter_id("One")
+    assert _names(index.scenes_of_character(mara), "title") == ["Dawn", "Dusk"]
+    assert _names(index.scenes_in_chapter(one), "title") == ["Dusk", "Dawn"]
+    assert _names(index.chapters_of_character(mara), "title") == ["One"]
+    assert _names(index.characters_in_chapter(one)) == ["Mara", "Tomas", "Ines"]
+    assert _names(index.chapters_of_scene(index.scene_id("Night")), "title") == ["Two"]
+    assert [(c["name"], n) for c, n in index.co_characters(mara)] == [("Tomas", 2), ("Ines", 1)]
+
+
+def test_changes_update_the_loaded_index(cast):
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return cast._load_relationships()
+
+    index = RelationshipIndex(cast.feed, loader)
+    mara = index.character_id("Mara")
+    with cast.session() as db:
+        cast.save_scene(db, {"title": "Night", "characters": ["Olek", "Mara"]})
+        cast.delete_character(db, "Tomas")
+        cast.save_chapter(db, {"title": "Two", "scenes": ["Night", "Dawn"]})
+    assert [(c["name"], n) for c, n in index.co_characters(mara)] == [("Ines", 1), ("Olek", 1)]
+    assert _names(index.chapters_of_character(mara), "title") == ["One", "Two"]
+    assert index.character_id("Tomas") is None
+    assert len(loads) == 1
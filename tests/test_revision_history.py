@@ -0,0 +1,54 @@
+import time
+from datetime import datetime
+from bookwright.utils.revision_history import (SNAPSHOT_INTERVAL, apply_delta, apply_text_patch,
+                                               make_delta, make_text_patch)
+
+
+def _tick() -> datetime:
+    """A moment strictly between the revisions recorded before and after it"""
+    time.sleep(0.01)
+    moment = datetime.utcnow()
+    time.sleep(0.01)
+    return moment
+
+
+def test_deltas_round_trip():
+    old = {"name": "Mara", "background": "word " * 100, "age": "30"}
+    new = {"name": "Mara", "background": "word " * 50 + "changed " + "word " * 49, "role": "lead"}
+    delta = make_delta(old, new)
+    assert set(delta) == {"set", "patch", "unset"}
+    assert "name" not in delta["set"] and delta["unset"] == ["age"]
+    assert apply_delta(old, delta) == new
+    assert apply_text_patch(old["background"], make_text_patch(old["background"], new["background"])) \
+        == new["background"]
+
+
+def test_history_and_restore_entity(story_db):
+    with story_db.session() as db:
+        for version in range(SNAPSHOT_INTERVAL + 4):
+            story_db.save_character(db, {"name": "Mara", "notes": f"version {version}"})
+            if version == 5:
+                moment = _tick()
+        history = story_db.get_revision_history(db, "character", "Mara")
+        assert [r["seq"] for r in history] == list(range(SNAPSHOT_INTERVAL + 4, 0, -1))
+        # A fresh snapshot every SNAPSHOT_INTERVAL revisions bounds the replay
+        assert [r["seq"] for r in history if r["kind"] == "snapshot"] == [SNAPSHOT_INTERVAL + 1, 1]
+
+        assert story_db.restore_entity(db, "character", "Mara", moment)["notes"] == "version 5"
+        assert [c["notes"] for c in story_db.get_characters(db)] == ["version 5"]
+        # The restore is a revision too, so it can be undone
+        assert len(story_db.get_revision_history(db, "character", "Mara")) == SNAPSHOT_INTERVAL + 5
+
+
+def test_restore_book(story_db):
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Mara", "role": "lead"})
+        story_db.save_scene(db, {"title": "Dawn", "characters": ["Mara"]})
+        moment = _tick()
+        story_db.save_character(db, {"name": "Mara", "role": "villain"})
+        story_db.save_character(db, {"name": "Tomas"})
+        story_db.delete_scene(db, "Dawn")
+
+        assert story_db.restore_book(db, moment) == {"restored": 2, "deleted": 1}
+        assert [(c["name"], c["role"]) for c in story_db.get_characters(db)] == [("Mara", "lead")]
+        assert [(s["title"], list(s["characters"])) for s in story_db.get_scenes(db)] == [("Dawn", ["Mara"])]
@@ -0,0 +1,68 @@
+import sqlite3
+import pytest
+from bookwright.utils.job_queue import JobQueue, CANCELLED, QUEUED
+from bookwright.utils.snapshots import create_snapshot, list_snapshots, restore_snapshot
+
+
+def names(story_db):
+    with story_db.session() as db:
+        return [c["name"] for c in story_db.get_characters(db)]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_restore_replaces_contents(story_db, compress):
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Ann"})
+    path = create_snapshot(story_db, label="one", compress=compress)
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Bob"})
+    assert names(story_db) == ["Ann", "Bob"]
+
+    backup = restore_snapshot(story_db, path)
+    assert names(story_db) == ["Ann"]
+    assert {path, backup} <= {s["path"] for s in list_snapshots(story_db)}
+    restore_snapshot(story_db, backup, keep_backup=False)
+    assert names(story_db) == ["Ann", "Bob"]
+
+
+def test_damaged_snapshot_is_refused(story_db, tmp_path):
+    bad = tmp_path / "bad.db"
+    bad.write_bytes(b"not a database" * 100)
+    with pytest.raises(ValueError):
+        restore_snapshot(story_db, str(bad))
+    with pytest.raises(ValueError):
+        restore_snapshot(story_db, str(tmp_path / "missing.db"))
+
+
+def test_old_snapshot_is_migrated(story_db, tmp_path):
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Ann", "age": 30})
+        story_db.save_scene(db, {"title": "Inn", "description": "Ann sleeps.", "characters": ["Ann"]})
+    path = create_snapshot(story_db, dest=str(tmp_path / "old.db"))
+    # As written by a version before aliases, age, gender and mention indexing
+    old = sqlite3.connect(path)
+    for column in ("aliases", "age", "gender"):
+        old.execute(f"ALTER TABLE characters DROP COLUMN {column}")
+    for table in ("mentions", "mention_sources", "mention_patterns"):
+        old.execute(f"DROP TABLE {table}")
+    old.commit()
+    old.close()
+
+    restore_snapshot(story_db, path, keep_backup=False)
+    with story_db.session() as db:
+        assert story_db.get_characters(db)[0]["age"] is None
+        story_db.save_character(db, {"name": "Ann", "age": 31})
+        assert story_db.get_mention_counts(db) == {"Ann": 1}
+
+
+def test_restore_keeps_current_jobs(story_db):
+    queue = JobQueue(story_db.path)  # Not started: jobs stay as submitted
+    queue.register("noop", lambda context: None)
+    earlier = queue.submit("noop")
+    path = create_snapshot(story_db)
+    queue.cancel(earlier)
+    later = queue.submit("noop")
+
+    restore_snapshot(story_db, path, keep_backup=False)
+    # Not the snapshot's copy of the jobs, which would run the cancelled one
+    assert [(j["id"], j["status"]) for j in queue.list()] == [(later, QUEUED), (earlier, CANCELLED)]
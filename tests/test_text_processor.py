@@ -0,0 +1,46 @@
+from bookwright.utils.text_processor import (TextAnalyzer, SpeakerResolver, analyze_paragraph, syllables,
+                                             UNATTRIBUTED)
+
+
+def test_syllables():
+    assert [syllables(w) for w in ["cat", "water", "beautiful"]] == [1, 2, 3]
+
+
+def test_dialogue_tags():
+    stats = analyze_paragraph('"Come here," said Ann. Bob replied, "No."')
+    assert stats.quotes == (("Ann", 2), ("Bob", 1))
+
+
+def test_speakers_by_full_or_unique_first_name():
+    resolver = SpeakerResolver(["Ann Lee", "Bob Stone", "Bob Marsh"])
+    assert resolver.resolve(analyze_paragraph('"Hi," said Ann.')) == [("Ann Lee", 1)]
+    assert resolver.resolve(analyze_paragraph('"Hi," said Bob.')) == [(UNATTRIBUTED, 1)]
+    # Untagged dialogue goes to the one character the narration names
+    assert resolver.resolve(analyze_paragraph('Bob Stone frowned. "Well then."')) == [("Bob Stone", 2)]
+
+
+def test_blank_character_names_are_skipped():
+    resolver = SpeakerResolver(["", "   ", None, "Ann"])
+    assert resolver.resolve(analyze_paragraph('"Hi," said Ann.')) == [("Ann", 1)]
+
+
+def test_summary_and_paragraph_cache():
+    analyzer = TextAnalyzer()
+    text = 'Ann walked home. "Late again," said Ann.\n\nThe rain fell.'
+    summary = analyzer.analyze_text(text, ["Ann"])
+    assert (summary["paragraphs"], summary["words"], summary["dialogue_words"]) == (2, 10, 2)
+    assert summary["speakers"] == {"Ann": 2}
+    analyzer.analyze_text(text + "\n\nA new line.", ["Ann"])
+    assert (analyzer.hits, analyzer.misses) == (2, 3)
+
+
+def test_analyze_book_with_a_blank_name(story_db):
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": " "})
+        story_db.save_character(db, {"name": "Ann"})
+        story_db.save_scene(db, {"title": "Inn"})
+        story_db.save_chapter(db, {"title": "One", "scenes": ["Inn"]})
+        story_db.save_draft(db, "scene", "Inn", '"Hello," said Ann.')
+    stats = TextAnalyzer().analyze_book(story_db)
+    assert stats["book"]["speakers"] == {"Ann": 1}
+    assert [c["title"] for c in stats["chapters"]] == ["One"]
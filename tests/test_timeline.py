@@ -0,0 +1,75 @@
+import pytest
+from datetime import date
+from bookwright.core.timeline import Calendar, Timeline, MINUTES_PER_DAY
+
+
+def test_calendar_days():
+    calendar = Calendar(day_aliases={"Prologue": 0}, days_per_year=360)
+    assert calendar.parse_day("Day 3") == 3
+    assert calendar.parse_day("7") == 7
+    assert calendar.parse_day("prologue") == 0
+    assert calendar.parse_day("Year 2, Day 40") == 400
+    assert calendar.parse_day("2024-05-01") == date(2024, 5, 1).toordinal()
+    assert calendar.parse_day("someday") is None
+
+
+def test_calendar_times():
+    calendar = Calendar()
+    assert calendar.parse_time("") == (0, MINUTES_PER_DAY)
+    assert calendar.parse_time("Evening") == (1020, 1260)
+    assert calendar.parse_time("early morning") == (360, 540)
+    assert calendar.parse_time("2:30 pm") == (870, 930)
+    assert calendar.parse_time("09:00-11:00") == (540, 660)
+    assert calendar.parse_time("9 to 11") == (540, 660)
+    assert calendar.parse_time("tonight") is None
+
+
+@pytest.fixture
+def timeline(story_db):
+    with story_db.session() as db:
+        story_db.save_scene(db, {"title": "Arrival", "day": "2024-05-01", "time": "morning",
+                                 "location": "Inn", "characters": []})
+        story_db.save_scene(db, {"title": "Market", "day": "2024-05-03", "time": "noon",
+                                 "location": "Square", "characters": []})
+        story_db.save_scene(db, {"title": "Lost", "day": "someday"})
+    return Timeline(story_db)
+
+
+def test_query_iso_dates(timeline):
+    assert [s["title"] for s in timeline.query("2024-05-01")] == ["Arrival"]
+    assert [s["title"] for s in timeline.query("2024-05-01 - 2024-05-03")] == ["Arrival", "Market"]
+    assert [s["title"] for s in timeline.query("2024-05-03 to 2024-05-01")] == ["Arrival", "Market"]
+
+
+def test_query_to_only_as_a_word(story_db):
+    timeline = Timeline(story_db, Calendar(day_aliases={"Tomorrow": 1, "Today": 0}))
+    with story_db.session() as db:
+        story_db.save_scene(db, {"title": "Later", "day": "Tomorrow", "characters": []})
+    assert [s["title"] for s in timeline.query("tomorrow")] == ["Later"]
+    assert [s["title"] for s in timeline.query("today to tomorrow")] == ["Later"]
+    with pytest.raises(ValueError):
+        timeline.query("whenever")
+
+
+def test_chronology_follows_the_feed(timeline, story_db):
+    assert [s["title"] for s in timeline.chronological()] == ["Arrival", "Market"]
+    assert [s["title"] for s in timeline.unscheduled()] == ["Lost"]
+    with story_db.session() as db:
+        story_db.save_scene(db, {"title": "Market", "day": "2024-04-30"})
+    assert [s["title"] for s in timeline.chronological()] == ["Market", "Arrival"]
+
+
+def test_conflicts(story_db):
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Ann"})
+        story_db.save_scene(db, {"title": "Inn", "day": "Day 1", "time": "10:00-12:00",
+                                 "location": "Inn", "characters": ["Ann"]})
+        story_db.save_scene(db, {"title": "Dock", "day": "Day 1", "time": "11:00",
+                                 "location": "Dock", "characters": ["Ann"]})
+        # No time only places a scene on its day: a clash with it is possible, not certain
+        story_db.save_scene(db, {"title": "Market", "day": "Day 2", "location": "Inn", "characters": ["Ann"]})
+        story_db.save_scene(db, {"title": "Quay", "day": "Day 2", "time": "Evening",
+                                 "location": "Dock", "characters": ["Ann"]})
+    conflicts = Timeline(story_db).conflicts()
+    assert [(c["character"], c["scenes"], c["overlap_minutes"], c["possible"]) for c in conflicts] == [
+        ("Ann", ("Inn", "Dock"), 60, False), ("Ann", ("Market", "Quay"), None, True)]
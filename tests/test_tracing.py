@@ -0,0 +1,46 @@
+import pytest
+from bookwright.utils.tracing import Tracer, current_span, read_spans, to_chrome_trace
+
+
+def test_nested_spans_are_written(tmp_path):
+    path = str(tmp_path / "spans.jsonl")
+    tracer = Tracer(path)
+    with tracer.span("generate", prompt="scene") as outer:
+        with tracer.span("call_llm") as inner:
+            assert current_span() is inner
+            inner.set(tokens=12)
+        with pytest.raises(RuntimeError):
+            with tracer.span("validate_output"):
+                raise RuntimeError("bad json")
+    assert current_span() is None
+    with tracer.span("other"):
+        pass
+
+    spans = read_spans(path, outer.trace_id)
+    assert [s["name"] for s in spans] == ["call_llm", "validate_output", "generate"]
+    call, validate, generate = spans
+    assert call["parent_id"] == validate["parent_id"] == generate["span_id"]
+    assert generate["parent_id"] is None
+    assert call["attributes"] == {"tokens": 12}
+    assert (validate["status"], validate["error"]) == ("error", "RuntimeError: bad json")
+    assert generate["duration"] >= call["duration"]
+    assert len(read_spans(path)) == 4
+
+    trace = to_chrome_trace(spans)
+    complete = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+    assert [e["name"] for e in complete] == ["call_llm", "validate_output", "generate"]
+    assert complete[1]["args"]["error"] == "RuntimeError: bad json"
+
+
+def test_rotation_and_disabled(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer(str(path), max_bytes=500)
+    for _ in range(5):
+        with tracer.span("stage"):
+            pass
+    assert (tmp_path / "spans.jsonl.1").exists()
+    assert path.stat().st_size <= 500
+
+    with Tracer(None).span("untraced") as span:
+        assert current_span() is span
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["spans.jsonl", "spans.jsonl.1"]
@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from bookwright.models.base import engines
+from bookwright.models.models import Character
+from bookwright.utils.change_feed import RESET
+
+
+def names(story_db):
+    with story_db.session() as db:
+        return [c["name"] for c in story_db.get_characters(db)]
+
+
+def test_writes_are_grouped_until_flush(story_db):
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Ann"})
+        story_db.save_character(db, {"name": "Bob"})
+    assert story_db.uow.pending == 2
+    story_db.flush()
+    assert story_db.uow.pending == 0
+    assert names(story_db) == ["Ann", "Bob"]
+
+
+def test_failed_write_keeps_the_rest_of_the_group(story_db):
+    events = []
+    story_db.feed.subscribe(events.append)
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Ann"})
+    with pytest.raises(SQLAlchemyError):
+        with story_db.session() as db:
+            story_db.save_character(db, {"name": "Bob", "age": object()})
+
+    # Only the failed borrow is undone; views reload to drop its writes
+    assert story_db.uow.pending == 1
+    assert RESET in events
+    assert names(story_db) == ["Ann"]
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Cy"})
+    story_db.flush()
+    assert names(story_db) == ["Ann", "Cy"]
+
+
+def test_borrows_share_one_commit(story_db):
+    other = engines.sessionmaker(story_db.path)()
+    try:
+        with story_db.session() as db:
+            story_db.save_character(db, {"name": "Ann"})
+        with story_db.session() as db:
+            story_db.save_character(db, {"name": "Bob"})
+        # Releasing a borrow's savepoint must not commit the group on its own
+        assert other.query(Character).count() == 0
+        story_db.uow.wait()
+        assert story_db.uow.pending == 0
+        assert [c.name for c in other.query(Character)] == ["Ann", "Bob"]
+    finally:
+        other.close()
+
+
+def test_wait_reports_a_failed_group(story_db, monkeypatch):
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Ann"})
+
+    def fail():
+        raise OperationalError("COMMIT", None, Exception("disk I/O error"))
+    monkeypatch.setattr(story_db.uow._session, "commit", fail)
+
+    # The timer thread commits the group and fails; the waiter hears about it
+    with pytest.raises(OperationalError):
+        story_db.uow.wait(timeout=5)
+    monkeypatch.undo()
+    story_db.uow.wait()  # Nothing left to wait for
+    assert names(story_db) == []
+
+
+def test_error_without_writes_keeps_the_group(story_db):
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Ann"})
+    with pytest.raises(KeyError):
+        with story_db.session():
+            raise KeyError("not a database error")
+    story_db.flush()
+    assert names(story_db) == ["Ann"]
+
+
+def test_error_after_a_write_discards_it(story_db):
+    with story_db.session() as db:
+        story_db.save_character(db, {"name": "Ann"})
+    story_db.flush()
+    with pytest.raises(ValueError):
+        with story_db.session() as db:
+            story_db.save_scene(db, {"title": "Inn"})  # Flushed at once for its id
+            story_db.save_draft(db, "scene", "Missing", "Text")
+    story_db.flush()
+    with story_db.session() as db:
+        assert not story_db.get_scenes(db)
+    assert names(story_db) == ["Ann"]